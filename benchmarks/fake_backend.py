@@ -0,0 +1,176 @@
+"""
+In-memory Supabase stand-in for benchmarks, with injected network latency.
+
+Builds on database.fake_client and adds what large synthetic tables need to be
+measured rather than the fake itself: a per-column hash index for eq/in_ filters
+and a sorted view for keyset-paged, ordered selects (as the database's indexes
+would serve them). Indexes are rebuilt lazily after any write to their table.
+"""
+import bisect
+import itertools
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from database.fake_client import FakeQuery, FakeSupabaseClient
+from database.historical_loader import keyset_condition
+
+# Last term of a keyset condition written by fetch_historical_data: and(a.eq.X,b.eq.Y,c.gt.Z)
+_KEYSET_LAST_TERM = re.compile(r'.*,and\(([^()]*)\)')
+
+
+def _keyset_bound(expression: str) -> Optional[Tuple[Tuple[str, ...], List[str]]]:
+    """Columns and last key of a keyset condition (see keyset_condition), or None for any other expression."""
+    last_term = _KEYSET_LAST_TERM.fullmatch(expression)
+    if not last_term:
+        return None
+    leaves = [leaf.split('.', 2) for leaf in last_term.group(1).split(',')]
+    if any(len(leaf) != 3 for leaf in leaves):
+        return None
+    columns, values = tuple(leaf[0] for leaf in leaves), [leaf[2] for leaf in leaves]
+    return (columns, values) if keyset_condition(columns, values) == expression else None
+
+
+class BenchmarkQuery(FakeQuery):
+    presorted = False
+
+    def _select_matches(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        client: 'BenchmarkSupabaseClient' = self.client
+
+        # A selective indexed filter first, then the sorted view for ordered (keyset) pages
+        for condition in self.filters:
+            if condition[0] != 'or' and condition[1] in ('eq', 'in') \
+                    and condition[0] in client.indexes.get(self.table_name, ()):
+                values = condition[2] if condition[1] == 'in' else [condition[2]]
+                return super()._select_matches(client.index_lookup(self.table_name, condition[0], values))
+
+        sort_key = client.sort_keys.get(self.table_name)
+        if sort_key and self.ordering == [(column, False) for column in sort_key] \
+                and self.count_method is None and self.row_range is None:
+            return self._sorted_matches(client, sort_key)
+        return super()._select_matches(rows)
+
+    def _sorted_matches(self, client: 'BenchmarkSupabaseClient', sort_key: Sequence[str]):
+        """Matches in sort-key order, starting at the keyset/lower bound and stopping at the limit."""
+        sorted_rows, keys = client.sorted_view(self.table_name)
+        start = 0
+        # Bounds served by the bisection need no per-row check
+        served = set()
+
+        for position, condition in enumerate(self.filters):
+            if condition[0] == 'or':
+                keyset = _keyset_bound(condition[1])
+                if keyset and keyset[0] == tuple(sort_key[:len(keyset[0])]):
+                    width = len(keyset[0])
+                    last = tuple(_typed_like(keys, i, value) for i, value in enumerate(keyset[1]))
+                    start = max(start, bisect.bisect_right(keys, last, key=lambda k: k[:width]))
+                    served.add(position)
+            elif condition[0] == sort_key[0] and condition[1] in ('gte', 'gt'):
+                finder = bisect.bisect_left if condition[1] == 'gte' else bisect.bisect_right
+                start = max(start, finder(keys, condition[2], key=lambda k: k[0]))
+                served.add(position)
+
+        self.presorted = True
+        matches = (
+            sorted_rows[i] for i in range(start, len(sorted_rows)) if self._row_matches(sorted_rows[i], served)
+        )
+        return list(itertools.islice(matches, self.row_limit) if self.row_limit is not None else matches)
+
+    def _order_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return rows if self.presorted else super()._order_rows(rows)
+
+    def execute(self):
+        client: 'BenchmarkSupabaseClient' = self.client
+        start, slept = time.perf_counter(), client.simulated_latency_seconds
+
+        response = super().execute()
+        if self.operation != 'select':
+            client.invalidate(self.table_name)
+        client.transfer_delay(response.data)
+
+        # Time the stand-in itself spent serving the query, i.e. what the database would spend
+        client.backend_seconds += time.perf_counter() - start - (client.simulated_latency_seconds - slept)
+        return response
+
+
+def _typed_like(keys: List[Tuple], position: int, value: str):
+    """Parses a keyset value from a filter string into the type stored at `position` of the keys."""
+    sample = keys[0][position] if keys else None
+    return type(sample)(value) if isinstance(sample, (int, float)) else value
+
+
+class BenchmarkSupabaseClient(FakeSupabaseClient):
+    """
+    FakeSupabaseClient with latency injection and indexes. `backend_seconds` adds up
+    the time spent answering queries, so callers can separate it from their own.
+
+    `latency_ms` is slept once per round trip and `per_row_latency_us` per returned
+    row (serialization and transfer). `indexes` maps a table to columns with a hash
+    index; `sort_keys` maps a table to the columns its ordered, keyset-paged selects
+    use (e.g. ('history_date', 'product_id', 'history_id')).
+    """
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        max_rows: Optional[int] = None,
+        latency_ms: float = 0.0,
+        per_row_latency_us: float = 0.0,
+        indexes: Optional[Dict[str, Sequence[str]]] = None,
+        sort_keys: Optional[Dict[str, Sequence[str]]] = None
+    ):
+        super().__init__(tables, max_rows)
+        self.latency_ms = latency_ms
+        self.per_row_latency_us = per_row_latency_us
+        self.indexes = {table: tuple(columns) for table, columns in (indexes or {}).items()}
+        self.sort_keys = {table: tuple(columns) for table, columns in (sort_keys or {}).items()}
+        self.simulated_latency_seconds = 0.0
+        self.backend_seconds = 0.0
+        self._hash_indexes: Dict[Tuple[str, str], Dict[Any, List[int]]] = {}
+        self._sorted_views: Dict[str, Tuple[List[Dict[str, Any]], List[Tuple]]] = {}
+
+    def table(self, name: str) -> BenchmarkQuery:
+        return BenchmarkQuery(self, name)
+
+    def _record(self, query: FakeQuery):
+        super()._record(query)
+        self._sleep(self.latency_ms / 1000)
+
+    def transfer_delay(self, data: Any):
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        self._sleep(rows * self.per_row_latency_us / 1e6)
+
+    def _sleep(self, seconds: float):
+        if seconds > 0:
+            self.simulated_latency_seconds += seconds
+            time.sleep(seconds)
+
+    def invalidate(self, table: str):
+        self._sorted_views.pop(table, None)
+        for key in [key for key in self._hash_indexes if key[0] == table]:
+            del self._hash_indexes[key]
+
+    def index_lookup(self, table: str, column: str, values: Sequence[Any]) -> List[Dict[str, Any]]:
+        """Rows whose `column` is one of `values`, in table order."""
+        index = self._hash_indexes.get((table, column))
+        rows = self.tables.setdefault(table, [])
+        if index is None:
+            index = {}
+            for position, row in enumerate(rows):
+                index.setdefault(row.get(column), []).append(position)
+            self._hash_indexes[(table, column)] = index
+
+        positions = sorted(itertools.chain.from_iterable(index.get(value, ()) for value in set(values)))
+        return [rows[position] for position in positions]
+
+    def sorted_view(self, table: str) -> Tuple[List[Dict[str, Any]], List[Tuple]]:
+        """The table's rows sorted by its sort key, with the key tuple of every row."""
+        if table not in self._sorted_views:
+            columns = self.sort_keys[table]
+            rows = sorted(self.tables.setdefault(table, []), key=lambda row: tuple(row.get(c) for c in columns))
+            self._sorted_views[table] = (rows, [tuple(row.get(c) for c in columns) for row in rows])
+        return self._sorted_views[table]
+
+    def reset_calls(self):
+        super().reset_calls()
+        self.simulated_latency_seconds = 0.0
+        self.backend_seconds = 0.0
@@ -0,0 +1,219 @@
+"""
+End-to-end benchmark of the forecasting path against an in-memory Supabase.
+
+For every catalog size it generates synthetic products/historical_data, serves
+them from BenchmarkSupabaseClient (with optional injected latency) and times:
+
+  load_prediction_assets      cold load of model and context (no local snapshot)
+  forecast_single_product     per call, on a sample of products, cache cleared
+  forecast_batch              every product, cache cleared, best of --repeats
+  save_forecasts_to_database  the batch's final forecasts with explanations
+
+Backend measurements split their time into simulated latency, the stand-in's
+own query evaluation (backend_seconds) and the rest (client_seconds). Results
+are written as JSON; pass a previous file as --baseline to get the time ratio
+of every measurement against it.
+
+    python -m benchmarks.forecasting --sizes 100 1000 10000 --latency-ms 20 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+from datetime import datetime
+import numpy as np
+
+import models.prediction_model as prediction_model
+from benchmarks.fake_backend import BenchmarkSupabaseClient
+from benchmarks.synthetic import synthetic_tables
+from database.supabase_client import set_supabase
+from routes.forecasting import save_forecasts_to_database
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _backend_stats(client: BenchmarkSupabaseClient, seconds: float) -> dict:
+    return {
+        'seconds': round(seconds, 4),
+        'round_trips': len(client.calls),
+        'simulated_latency_seconds': round(client.simulated_latency_seconds, 4),
+        # In-memory query evaluation, standing in for database time
+        'backend_seconds': round(client.backend_seconds, 4),
+        'client_seconds': round(seconds - client.backend_seconds - client.simulated_latency_seconds, 4),
+    }
+
+
+def benchmark_size(
+    n_products: int,
+    n_days: int,
+    noise: float,
+    horizon_days: int,
+    latency_ms: float,
+    per_row_latency_us: float,
+    single_samples: int,
+    repeats: int,
+    seed: int = 0
+) -> dict:
+    client = BenchmarkSupabaseClient(
+        synthetic_tables(n_products, n_days, noise, seed),
+        latency_ms=latency_ms,
+        per_row_latency_us=per_row_latency_us,
+        indexes={'products': ['product_id'], 'historical_data': ['product_id']},
+        sort_keys={'historical_data': ['history_date', 'product_id', 'history_id']}
+    )
+    previous_client = set_supabase(client)
+    try:
+        result = {'products': n_products, 'history_rows': len(client.tables['historical_data'])}
+
+        # load_prediction_assets
+        client.reset_calls()
+        _, seconds = _timed(prediction_model.load_prediction_assets)
+        result['load_prediction_assets'] = _backend_stats(client, seconds)
+
+        forecaster, seconds = _timed(
+            prediction_model.ForecastingManager,
+            model=prediction_model.BEST_LGB_MODEL,
+            le_product=prediction_model.LE_PRODUCT,
+            le_category=prediction_model.LE_CATEGORY,
+            historical_df=prediction_model.HISTORICAL_CONTEXT_DF,
+            quantile_models=prediction_model.QUANTILE_MODELS,
+            conformal_offsets=prediction_model.CONFORMAL_OFFSETS,
+            model_version=prediction_model.MODEL_VERSION,
+            feature_columns=prediction_model.MODEL_FEATURE_COLUMNS
+        )
+        prediction_model.FORECASTER = forecaster
+        result['forecaster_init'] = {'seconds': round(seconds, 4)}
+
+        # forecast_single_product on products spread over the catalog
+        product_ids = forecaster.state.index.product_ids
+        sample = product_ids[np.linspace(0, len(product_ids) - 1, min(single_samples, len(product_ids))).astype(int)]
+        single_ms = []
+        for product_id in sample.tolist():
+            forecaster.cache.clear()
+            _, seconds = _timed(forecaster.forecast_single_product, str(product_id), horizon_days)
+            single_ms.append(seconds * 1000)
+        result['forecast_single_product'] = {
+            'calls': len(single_ms),
+            'median_ms': round(float(np.median(single_ms)), 3),
+            'p95_ms': round(float(np.percentile(single_ms, 95)), 3),
+        }
+
+        # forecast_batch
+        batch_seconds = []
+        for _ in range(repeats):
+            forecaster.cache.clear()
+            predictions, seconds = _timed(forecaster.forecast_batch, horizon_days)
+            batch_seconds.append(seconds)
+        best = min(batch_seconds)
+        result['forecast_batch'] = {
+            'seconds': round(best, 4),
+            'products_per_second': round(len(product_ids) / best, 1),
+            'rows': len(predictions),
+        }
+
+        # save_forecasts_to_database
+        client.reset_calls()
+        save_result, seconds = _timed(save_forecasts_to_database, predictions, horizon_days, state=forecaster.state)
+        result['save_forecasts_to_database'] = {
+            **_backend_stats(client, seconds),
+            'records_saved': save_result.get('records_saved', 0),
+        }
+    finally:
+        prediction_model.FORECASTER = None
+        set_supabase(previous_client)
+
+    return result
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """Time ratio (current / baseline) of every measurement present in both reports."""
+    baseline_sizes = {result['products']: result for result in baseline.get('results', [])}
+    ratios = []
+    for result in report['results']:
+        previous = baseline_sizes.get(result['products'])
+        if previous is None:
+            continue
+        for name, metric in result.items():
+            if not isinstance(metric, dict) or name not in previous:
+                continue
+            key = 'median_ms' if 'median_ms' in metric else 'seconds'
+            if previous[name].get(key):
+                ratios.append({
+                    'products': result['products'],
+                    'measurement': name,
+                    'ratio': round(metric[key] / previous[name][key], 3),
+                })
+    return ratios
+
+
+def run(args) -> dict:
+    # Benchmarks measure a cold load from the backend, never a local snapshot
+    prediction_model.CONTEXT_SNAPSHOT_ENABLED = False
+    # Unpickling the model imports LightGBM and sklearn; keep that one-off cost out of the first size
+    _timed(prediction_model.load_model_assets)
+
+    results = []
+    for n_products in args.sizes:
+        result = benchmark_size(
+            n_products, args.days, args.noise, args.horizon, args.latency_ms,
+            args.per_row_latency_us, args.single_samples, args.repeats, args.seed
+        )
+        results.append(result)
+        print(
+            f"{n_products:>6} products: load {result['load_prediction_assets']['seconds']:.2f}s, "
+            f"single {result['forecast_single_product']['median_ms']:.1f}ms, "
+            f"batch {result['forecast_batch']['seconds']:.2f}s, "
+            f"save {result['save_forecasts_to_database']['seconds']:.2f}s"
+        )
+
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'days': args.days,
+            'noise': args.noise,
+            'horizon_days': args.horizon,
+            'latency_ms': args.latency_ms,
+            'per_row_latency_us': args.per_row_latency_us,
+            'single_samples': args.single_samples,
+            'repeats': args.repeats,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--noise', type=float, default=0.3)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Injected latency per round trip')
+    parser.add_argument('--per-row-latency-us', type=float, default=0.0, help='Injected latency per returned row')
+    parser.add_argument('--single-samples', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', help='Previous JSON report to compare against')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['vs_baseline'] = compare(report, json.load(f))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
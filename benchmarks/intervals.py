@@ -0,0 +1,97 @@
+"""
+Latency benchmark for prediction intervals.
+
+Times a batch forecast on a synthetic catalog without intervals, with conformal
+offsets and with a pair of quantile boosters shaped like the point model.
+
+    python -m benchmarks.intervals --products 2000 --horizon 30
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+import joblib
+import numpy as np
+from lightgbm import LGBMRegressor
+
+from benchmarks.synthetic import synthetic_context
+from models.intervals import ConformalOffsets
+from models.prediction_model import ForecastingManager, MODEL_PATH, ENCODER_PRODUCT_PATH, ENCODER_CATEGORY_PATH
+
+
+def synthetic_quantile_models(point_model, seed: int = 0) -> dict:
+    """Quantile boosters with the point model's feature count and tree budget, fit on random data."""
+    rng = np.random.default_rng(seed)
+    n_features = point_model.booster_.num_feature()
+    X = rng.normal(size=(5000, n_features))
+    y = np.maximum(X[:, 0] * 5 + rng.normal(10, 4, len(X)), 0)
+
+    params = {
+        'n_estimators': point_model.booster_.num_trees(),
+        'num_leaves': point_model.get_params()['num_leaves'],
+        'verbose': -1,
+    }
+    return {
+        name: LGBMRegressor(objective='quantile', alpha=alpha, **params).fit(X, y)
+        for name, alpha in (('lower', 0.1), ('upper', 0.9))
+    }
+
+
+def time_batch(forecaster, horizon_days: int, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            forecaster.forecast_batch(horizon_days, workers=1)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(n_products: int, horizon_days: int, repeats: int) -> dict:
+    model = joblib.load(MODEL_PATH)
+    le_product, le_category = joblib.load(ENCODER_PRODUCT_PATH), joblib.load(ENCODER_CATEGORY_PATH)
+    context_df = synthetic_context(n_products)
+
+    variants = {
+        'point_only': {},
+        'conformal': {'conformal_offsets': ConformalOffsets(lower=np.linspace(2, 6, 30), upper=np.linspace(3, 9, 30))},
+        'quantile_models': {'quantile_models': synthetic_quantile_models(model)},
+    }
+
+    results = {}
+    for name, interval_assets in variants.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            forecaster = ForecastingManager(model, le_product, le_category, context_df, **interval_assets)
+        forecaster.cache.max_bytes = 0  # Measure the engine, not the cache
+        results[name] = time_batch(forecaster, horizon_days, repeats)
+
+    baseline = results['point_only']
+    report = {
+        'products': n_products,
+        'horizon_days': horizon_days,
+        'variants': {
+            name: {
+                'seconds': round(seconds, 3),
+                'added_ms': round((seconds - baseline) * 1000, 1),
+                'relative': round(seconds / baseline, 2),
+            }
+            for name, seconds in results.items()
+        },
+    }
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    report = run(args.products, args.horizon, args.repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
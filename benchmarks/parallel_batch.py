@@ -0,0 +1,77 @@
+"""
+Scaling benchmark for the multi-process batch forecast.
+
+Builds a synthetic catalog, then times forecast_batch with 1..N worker processes
+and checks every run returns exactly the single-process output.
+
+    python -m benchmarks.parallel_batch --products 5000 --horizon 30 --max-workers 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+import joblib
+
+from benchmarks.synthetic import synthetic_context
+from models.parallel_batch import shutdown_shard_pool
+from models.prediction_model import ForecastingManager, MODEL_PATH, ENCODER_PRODUCT_PATH, ENCODER_CATEGORY_PATH
+
+
+def run(n_products: int, horizon_days: int, max_workers: int, repeats: int) -> dict:
+    model = joblib.load(MODEL_PATH)
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecaster = ForecastingManager(
+            model, joblib.load(ENCODER_PRODUCT_PATH), joblib.load(ENCODER_CATEGORY_PATH),
+            synthetic_context(n_products)
+        )
+
+    results = []
+    reference = None
+    for workers in range(1, max_workers + 1):
+        # Untimed run: starts the shard pool, which later batches reuse
+        forecaster.forecast_batch(horizon_days, workers=workers)
+        timings = []
+        for _ in range(repeats):
+            # Time the forecast itself, not a cache hit left by the previous run
+            forecaster.cache.clear()
+            start = time.perf_counter()
+            predictions = forecaster.forecast_batch(horizon_days, workers=workers)
+            timings.append(time.perf_counter() - start)
+
+        if reference is None:
+            reference = predictions
+        best = min(timings)
+        results.append({
+            'workers': workers,
+            'seconds': round(best, 3),
+            'products_per_second': round(n_products / best, 1),
+            'speedup': round(results[0]['seconds'] / best, 2) if results else 1.0,
+            'matches_single_process': predictions == reference,
+        })
+        print(f"{workers} worker(s): {best:.3f}s  ({results[-1]['speedup']}x)")
+    shutdown_shard_pool()
+
+    return {
+        'products': n_products,
+        'horizon_days': horizon_days,
+        'cpu_count': os.cpu_count(),
+        'runs': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    report = run(args.products, args.horizon, args.max_workers, args.repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
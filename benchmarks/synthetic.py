@@ -0,0 +1,85 @@
+"""
+Synthetic catalogs for benchmarks: `products` and daily `historical_data` rows
+shaped like the Supabase tables, sized by products, days and noise.
+"""
+import contextlib
+import io
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from models.context_layout import compact_context
+from models.prediction_model import _prepare_historical_rows, _encode_categoricals
+
+
+def synthetic_frames(
+    n_products: int, n_days: int = 120, noise: float = 0.3, seed: int = 0, n_categories: int = 5
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (products, historical_data) frames for a random catalog ending today.
+
+    Each product has a log-normal base demand with a weekly cycle; `noise` is the
+    coefficient of variation of the daily multiplicative noise. Inventory is drawn per
+    day and sales never exceed it.
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+    product_ids = np.arange(1, n_products + 1)
+    unit_price = rng.uniform(5, 800, n_products).round(2)
+
+    products_df = pd.DataFrame({
+        'product_id': product_ids,
+        'sku': [f"SKU-{product_id:06d}" for product_id in product_ids],
+        'product_name': [f"Product {product_id}" for product_id in product_ids],
+        'category_id': rng.integers(1, n_categories + 1, n_products),
+        'supplier_id': rng.integers(1, 21, n_products),
+        'unit_price': unit_price,
+        'cost_price': (unit_price * rng.uniform(0.4, 0.8, n_products)).round(2),
+        'reorder_level': rng.integers(10, 100, n_products),
+        'reorder_quantity': rng.integers(50, 500, n_products),
+        'unit_of_measure': 'unit',
+        'is_active': True,
+    })
+
+    dates = pd.date_range(end=today, periods=n_days, freq='D')
+    base_demand = rng.lognormal(np.log(10), 0.8, n_products)
+    weekly = 1 + 0.2 * np.sin(2 * np.pi * dates.dayofweek.to_numpy() / 7)
+    expected = base_demand[:, None] * weekly[None, :]
+    demand = expected * np.maximum(1 + noise * rng.standard_normal((n_products, n_days)), 0)
+
+    inventory_start = rng.integers(0, 400, (n_products, n_days))
+    units = np.minimum(np.rint(demand), inventory_start).astype(np.int64)
+
+    historical_df = pd.DataFrame({
+        'history_id': np.arange(1, n_products * n_days + 1),
+        'history_date': np.tile(dates.strftime('%Y-%m-%d').to_numpy(), n_products),
+        'product_id': np.repeat(product_ids, n_days),
+        'period_type': 'daily',
+        'units_sold': units.ravel(),
+        'sales_revenue': (units * unit_price[:, None]).round(2).ravel(),
+        'inventory_start': inventory_start.ravel(),
+        'inventory_end': (inventory_start - units).ravel(),
+    })
+    return products_df, historical_df
+
+
+def synthetic_tables(
+    n_products: int, n_days: int = 120, noise: float = 0.3, seed: int = 0
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Row dicts per table, ready for an in-memory Supabase stand-in."""
+    products_df, historical_df = synthetic_frames(n_products, n_days, noise, seed)
+    return {
+        'products': products_df.to_dict('records'),
+        'historical_data': historical_df.to_dict('records'),
+        'forecasts': [],
+    }
+
+
+def synthetic_context(n_products: int, n_days: int = 120, noise: float = 0.3, seed: int = 0) -> pd.DataFrame:
+    """Prepared forecasting context for a random catalog, built with the loader's own steps."""
+    products_df, historical_df = synthetic_frames(n_products, n_days, noise, seed)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        context_df = _encode_categoricals(_prepare_historical_rows(historical_df, products_df))
+        context_df = context_df.sort_values('Date', kind='stable').reset_index(drop=True)
+        return compact_context(context_df)
@@ -4,4 +4,67 @@ from dotenv import load_dotenv
 load_dotenv()
 
 VITE_SUPABASE_URL = os.getenv("VITE_SUPABASE_URL")
-VITE_SUPABASE_PUBLISHABLE_KEY = os.getenv("VITE_SUPABASE_PUBLISHABLE_KEY")
\ No newline at end of file
+VITE_SUPABASE_PUBLISHABLE_KEY = os.getenv("VITE_SUPABASE_PUBLISHABLE_KEY")
+
+# Rows requested per page when paging through historical_data
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "1000"))
+
+# Local snapshot of the prepared forecasting context used for warm starts
+CONTEXT_SNAPSHOT_DIR = os.getenv("CONTEXT_SNAPSHOT_DIR", "context_snapshot")
+CONTEXT_SNAPSHOT_ENABLED = os.getenv("CONTEXT_SNAPSHOT_ENABLED", "true").lower() == "true"
+
+# Shared secret required by admin endpoints (sent as the X-Admin-Token header); unset disables them
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+# Minutes between scheduled forecaster context refreshes; 0 disables the schedule
+CONTEXT_REFRESH_INTERVAL_MINUTES = float(os.getenv("CONTEXT_REFRESH_INTERVAL_MINUTES", "0"))
+
+# Shared Supabase HTTP connection pool
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_KEEPALIVE_CONNECTIONS", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "30"))
+
+# Forecasts computed at once in the dedicated inference executor, and the per-request deadline
+FORECAST_MAX_CONCURRENCY = int(os.getenv("FORECAST_MAX_CONCURRENCY", "2"))
+FORECAST_REQUEST_TIMEOUT_SECONDS = float(os.getenv("FORECAST_REQUEST_TIMEOUT_SECONDS", "120"))
+
+# Background batch forecast jobs: SQLite job table, worker threads and products per saved chunk
+FORECAST_JOBS_DB = os.getenv("FORECAST_JOBS_DB", "forecast_jobs.sqlite3")
+FORECAST_JOB_WORKERS = int(os.getenv("FORECAST_JOB_WORKERS", "1"))
+FORECAST_JOB_CHUNK_SIZE = int(os.getenv("FORECAST_JOB_CHUNK_SIZE", "200"))
+
+# Processes a batch forecast is sharded across (1 = run in-process); smaller batches stay in-process
+FORECAST_BATCH_WORKERS = int(os.getenv("FORECAST_BATCH_WORKERS", "1"))
+FORECAST_BATCH_MIN_SHARD_SIZE = int(os.getenv("FORECAST_BATCH_MIN_SHARD_SIZE", "100"))
+# Seconds a sharded batch may run before its worker pool is terminated
+FORECAST_BATCH_TIMEOUT_SECONDS = float(os.getenv("FORECAST_BATCH_TIMEOUT_SECONDS", "300"))
+
+# Memory bound of the per-product forecast cache (horizon prefixes); 0 disables it
+FORECAST_CACHE_MAX_MB = float(os.getenv("FORECAST_CACHE_MAX_MB", "64"))
+
+# Model registry: directory holding manifest.json and the versioned model files
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "model_registry")
+# Products forecast to validate a model version before it is swapped in or shadowed
+MODEL_VALIDATION_SAMPLE_PRODUCTS = int(os.getenv("MODEL_VALIDATION_SAMPLE_PRODUCTS", "50"))
+
+# Minutes between upserts of the daily metrics rollup into system_metrics; 0 disables them
+METRICS_FLUSH_INTERVAL_MINUTES = float(os.getenv("METRICS_FLUSH_INTERVAL_MINUTES", "15"))
+
+# Opt-in request profiling (admin only): output directory for reports and collapsed stacks, functions listed
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+
+# Alert engine: minutes between scheduled runs (0 disables the schedule) and the forecast horizon it evaluates
+ALERT_INTERVAL_MINUTES = float(os.getenv("ALERT_INTERVAL_MINUTES", "0"))
+ALERT_HORIZON_DAYS = int(os.getenv("ALERT_HORIZON_DAYS", "30"))
+# Rule thresholds: projected stock-out within N days, |forecast vs history| deviation (%), sales decline (%)
+ALERT_STOCKOUT_DAYS = int(os.getenv("ALERT_STOCKOUT_DAYS", "7"))
+ALERT_DEVIATION_PERCENT = float(os.getenv("ALERT_DEVIATION_PERCENT", "50"))
+ALERT_DECLINE_PERCENT = float(os.getenv("ALERT_DECLINE_PERCENT", "15"))
+
+# Bulk sales CSV ingest: rows parsed per chunk, historical_data rows per upsert, upload MB kept in memory before spooling to disk
+SALES_INGEST_CHUNK_ROWS = int(os.getenv("SALES_INGEST_CHUNK_ROWS", "50000"))
+SALES_INGEST_BATCH_SIZE = int(os.getenv("SALES_INGEST_BATCH_SIZE", "1000"))
+SALES_INGEST_SPOOL_MB = float(os.getenv("SALES_INGEST_SPOOL_MB", "16"))
@@ -0,0 +1,359 @@
+import copy
+import re
+from functools import lru_cache
+from typing import Any, Collection, Dict, List, Optional, Tuple, Union
+
+
+class FakeResponse:
+    """Mimics postgrest's APIResponse (`data` and `count`)."""
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _coerce(row_value: Any, filter_value: Any) -> Any:
+    """Converts a filter value (often a string from a PostgREST expression) to the row value's type."""
+    if isinstance(row_value, bool) and isinstance(filter_value, str):
+        return filter_value.lower() == 'true'
+    if isinstance(row_value, (int, float)) and isinstance(filter_value, str):
+        return float(filter_value)
+    return filter_value
+
+
+_OPERATORS = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a > b,
+    'gte': lambda a, b: a >= b,
+    'lt': lambda a, b: a < b,
+    'lte': lambda a, b: a <= b,
+}
+
+
+def _matches(row: Dict[str, Any], column: str, operator: str, value: Any) -> bool:
+    row_value = row.get(column)
+    if operator == 'in':
+        return row_value in {_coerce(row_value, v) for v in value}
+    if operator == 'is':
+        return row_value is None if value in (None, 'null') else row_value == value
+    if row_value is None:
+        return False
+    return _OPERATORS[operator](row_value, _coerce(row_value, value))
+
+
+def _split_top_level(expression: str) -> List[str]:
+    """Splits a PostgREST logic expression on commas that are not inside parentheses."""
+    parts, depth, current = [], 0, ''
+    for char in expression:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    parts.append(current)
+    return parts
+
+
+@lru_cache(maxsize=256)
+def _parse_logic(expression: str) -> Tuple[Any, ...]:
+    """Parses an or_() expression once into (column, operator, value) leaves and ('and'|'or', parts) nodes."""
+    parsed = []
+    for part in _split_top_level(expression):
+        nested = re.fullmatch(r'(and|or)\((.*)\)', part)
+        if nested:
+            parsed.append((nested.group(1), _parse_logic(nested.group(2))))
+        else:
+            parsed.append(tuple(part.split('.', 2)))
+    return tuple(parsed)
+
+
+def _matches_parsed(row: Dict[str, Any], parsed: Tuple[Any, ...], combine) -> bool:
+    return combine(
+        _matches_parsed(row, part[1], all if part[0] == 'and' else any) if len(part) == 2 else _matches(row, *part)
+        for part in parsed
+    )
+
+
+def _matches_logic(row: Dict[str, Any], expression: str, combine=any) -> bool:
+    """Evaluates an or_() expression such as `a.gt.1,and(a.eq.1,b.gt.2)`."""
+    return _matches_parsed(row, _parse_logic(expression), combine)
+
+
+# Serial primary key per table, filled in on insert when a row does not set it (as the database does)
+SERIAL_KEYS = {
+    'alerts': 'alert_id',
+    'forecasts': 'forecast_id',
+    'historical_data': 'history_id',
+    'model_metrics': 'metric_id',
+    'sales_uploads': 'upload_id',
+    'system_metrics': 'metric_id',
+}
+
+
+def _assign_serial_keys(table: str, rows: List[Dict[str, Any]], records: List[Dict[str, Any]]):
+    """Numbers `records` after the table's highest key; `rows` are the rows already stored."""
+    key = SERIAL_KEYS.get(table)
+    if key is None:
+        return
+    next_value = max((row[key] for row in rows if row.get(key) is not None), default=0) + 1
+    for record in records:
+        if record.get(key) is None:
+            record[key] = next_value
+            next_value += 1
+
+
+class FakeQuery:
+    """Chainable query builder over an in-memory table; execute() records one round trip."""
+    def __init__(self, client: 'FakeSupabaseClient', table: str):
+        self.client = client
+        self.table_name = table
+        self.operation = 'select'
+        self.columns: Optional[List[str]] = None
+        self.count_method: Optional[str] = None
+        self.filters: List[Any] = []
+        self.ordering: List[Any] = []
+        self.row_limit: Optional[int] = None
+        self.row_range: Optional[Any] = None
+        self.single_row = False
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self._in_sets: Dict[Any, set] = {}
+
+    # --- Operations ---
+    def select(self, *columns: str, count: Optional[str] = None, **kwargs):
+        names = [c.strip() for column in columns for c in column.split(',') if c.strip()]
+        self.columns = None if not names or names == ['*'] else names
+        self.count_method = count
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.operation, self.payload = 'insert', payload
+        return self
+
+    def upsert(self, payload, on_conflict: Optional[str] = None, **kwargs):
+        self.operation, self.payload, self.on_conflict = 'upsert', payload, on_conflict
+        return self
+
+    def update(self, payload, **kwargs):
+        self.operation, self.payload = 'update', payload
+        return self
+
+    def delete(self, **kwargs):
+        self.operation = 'delete'
+        return self
+
+    # --- Filters and modifiers ---
+    def _filter(self, column: str, operator: str, value: Any):
+        self.filters.append((column, operator, value))
+        return self
+
+    def eq(self, column, value): return self._filter(column, 'eq', value)
+    def neq(self, column, value): return self._filter(column, 'neq', value)
+    def gt(self, column, value): return self._filter(column, 'gt', value)
+    def gte(self, column, value): return self._filter(column, 'gte', value)
+    def lt(self, column, value): return self._filter(column, 'lt', value)
+    def lte(self, column, value): return self._filter(column, 'lte', value)
+    def in_(self, column, values): return self._filter(column, 'in', list(values))
+    def is_(self, column, value): return self._filter(column, 'is', value)
+
+    def or_(self, expression: str, **kwargs):
+        self.filters.append(('or', expression))
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self.row_range = (start, end)
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def maybe_single(self):
+        return self.single()
+
+    # --- Execution ---
+    def _in_values(self, position: int, row_value: Any, values: List[Any]) -> set:
+        # Coerced once per filter and row value type instead of once per row
+        key = (position, type(row_value))
+        if key not in self._in_sets:
+            self._in_sets[key] = {_coerce(row_value, v) for v in values}
+        return self._in_sets[key]
+
+    def _row_matches(self, row: Dict[str, Any], skip: Collection[int] = ()) -> bool:
+        """Whether a row passes every filter except those at the `skip` positions."""
+        for position, condition in enumerate(self.filters):
+            if position in skip:
+                continue
+            if condition[0] == 'or' and len(condition) == 2:
+                if not _matches_logic(row, condition[1]):
+                    return False
+            elif condition[1] == 'in':
+                row_value = row.get(condition[0])
+                if row_value not in self._in_values(position, row_value, condition[2]):
+                    return False
+            elif not _matches(row, *condition):
+                return False
+        return True
+
+    def _select_matches(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows a select matches, in table order; subclasses may serve them from an index."""
+        return [row for row in rows if self._row_matches(row)]
+
+    def _order_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for column, desc in reversed(self.ordering):
+            rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        return rows
+
+    def execute(self) -> FakeResponse:
+        self.client._record(self)
+        rows = self.client.tables.setdefault(self.table_name, [])
+
+        if self.operation in ('insert', 'upsert'):
+            records = self.payload if isinstance(self.payload, list) else [self.payload]
+            records = [copy.deepcopy(record) for record in records]
+            if self.operation == 'upsert' and self.on_conflict:
+                # Like PostgREST's merge-duplicates: a conflicting row only gets the columns sent
+                keys = [k.strip() for k in self.on_conflict.split(',')]
+                stored = {tuple(r.get(k) for k in keys): r for r in rows}
+                written, added = [], []
+                for record in records:
+                    existing = stored.get(tuple(record.get(k) for k in keys))
+                    if existing is None:
+                        rows.append(record)
+                        stored[tuple(record.get(k) for k in keys)] = record
+                        written.append(record)
+                        added.append(record)
+                    else:
+                        existing.update(record)
+                        written.append(existing)
+                _assign_serial_keys(self.table_name, rows, added)
+                return FakeResponse(copy.deepcopy(written))
+            _assign_serial_keys(self.table_name, rows, records)
+            rows.extend(records)
+            return FakeResponse(copy.deepcopy(records))
+
+        if self.operation == 'delete':
+            matched = [row for row in rows if self._row_matches(row)]
+            rows[:] = [row for row in rows if not self._row_matches(row)]
+            return FakeResponse(matched)
+
+        if self.operation == 'update':
+            matched = [row for row in rows if self._row_matches(row)]
+            for row in matched:
+                row.update(self.payload)
+            return FakeResponse(copy.deepcopy(matched))
+
+        matched = self._select_matches(rows)
+
+        total = len(matched)
+        matched = self._order_rows(matched)
+        if self.row_range is not None:
+            matched = matched[self.row_range[0]:self.row_range[1] + 1]
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        if self.client.max_rows is not None:
+            matched = matched[:self.client.max_rows]
+        if self.columns is not None:
+            matched = [{column: row.get(column) for column in self.columns} for row in matched]
+        else:
+            matched = [dict(row) for row in matched]
+
+        count = total if self.count_method else None
+        if self.single_row:
+            if len(matched) != 1:
+                raise ValueError(f"Expected a single row from '{self.table_name}', got {len(matched)}")
+            return FakeResponse(matched[0], count)
+        return FakeResponse(matched, count)
+
+
+def _add_system_metrics(tables: Dict[str, List[Dict[str, Any]]], params: Dict[str, Any]) -> None:
+    """In-memory version of the add_system_metrics SQL function (see supabase/migrations)."""
+    rows = tables.setdefault('system_metrics', [])
+    stored = next((row for row in rows if row.get('metric_date') == params['p_metric_date']), None)
+    if stored is None:
+        rows.append({
+            'metric_id': max((row.get('metric_id') or 0 for row in rows), default=0) + 1,
+            'metric_date': params['p_metric_date'],
+            'total_forecasts_generated': params['p_forecasts'],
+            'errors_logged': params['p_errors'],
+            'peak_memory_usage_mb': params['p_peak_memory_mb'],
+            'avg_response_time_ms': params['p_avg_response_time_ms'],
+        })
+        return None
+
+    stored['total_forecasts_generated'] = (stored.get('total_forecasts_generated') or 0) + params['p_forecasts']
+    stored['errors_logged'] = (stored.get('errors_logged') or 0) + params['p_errors']
+    peaks = [value for value in (stored.get('peak_memory_usage_mb'), params['p_peak_memory_mb']) if value is not None]
+    stored['peak_memory_usage_mb'] = max(peaks) if peaks else None
+    if params['p_avg_response_time_ms'] is not None:
+        stored['avg_response_time_ms'] = params['p_avg_response_time_ms']
+    return None
+
+
+# SQL functions the app calls through rpc(), emulated over the in-memory tables
+_FUNCTIONS = {
+    'add_system_metrics': _add_system_metrics,
+}
+
+
+class FakeRpc:
+    """A pending rpc() call; execute() runs the emulated function and records one round trip."""
+    def __init__(self, client: 'FakeSupabaseClient', function: str, params: Dict[str, Any]):
+        self.client = client
+        self.table_name = function
+        self.operation = 'rpc'
+        self.filters: List[Any] = []
+        self.params = params
+
+    def execute(self) -> FakeResponse:
+        self.client._record(self)
+        if self.table_name not in _FUNCTIONS:
+            raise ValueError(f"Function '{self.table_name}' is not emulated by the fake client")
+        return FakeResponse(_FUNCTIONS[self.table_name](self.client.tables, copy.deepcopy(self.params)))
+
+
+class FakeSupabaseClient:
+    """
+    In-memory stand-in for the Supabase client.
+
+    Tables are lists of row dicts. Every execute() is recorded in `calls`, so tests can
+    assert how many round trips a code path makes. `max_rows` mimics the PostgREST
+    per-request row cap.
+    """
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None, max_rows: Optional[int] = None):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.max_rows = max_rows
+        self.calls: List[Dict[str, Any]] = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, function: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, function, params or {})
+
+    def _record(self, query: Union[FakeQuery, FakeRpc]):
+        self.calls.append({
+            'table': query.table_name,
+            'operation': query.operation,
+            'filters': list(query.filters),
+        })
+
+    def call_count(self, table: Optional[str] = None, operation: Optional[str] = None) -> int:
+        """Number of round trips, optionally restricted to a table and/or operation."""
+        return sum(
+            1 for call in self.calls
+            if (table is None or call['table'] == table) and (operation is None or call['operation'] == operation)
+        )
+
+    def reset_calls(self):
+        self.calls = []
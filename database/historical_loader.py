@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import HISTORY_PAGE_SIZE
+from utils.metrics import timed
+
+HISTORY_COLUMNS = 'history_date, product_id, units_sold, sales_revenue, inventory_start, inventory_end'
+
+# Keyset the loader pages by; the primary key last, so the order is total even with duplicate days
+KEYSET_COLUMNS = ('history_date', 'product_id', 'history_id')
+
+# Compact dtype each column is converted to as pages arrive (NaN/NaT marks NULL)
+HISTORY_DTYPES = {
+    'history_date': 'datetime64[D]',
+    'product_id': np.int32,
+    'units_sold': np.float32,
+    'sales_revenue': np.float64,
+    'inventory_start': np.float32,
+    'inventory_end': np.float32,
+}
+
+
+class HistoryColumnBuffer:
+    """Preallocated typed arrays for historical_data, grown geometrically if needed."""
+    def __init__(self, capacity: int):
+        self.size = 0
+        self.arrays = {
+            column: np.empty(max(capacity, 1), dtype=dtype)
+            for column, dtype in HISTORY_DTYPES.items()
+        }
+
+    def _reserve(self, capacity: int):
+        current = len(self.arrays['product_id'])
+        if capacity <= current:
+            return
+        new_capacity = max(capacity, current * 2)
+        for column, array in self.arrays.items():
+            grown = np.empty(new_capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.arrays[column] = grown
+
+    def append(self, rows: List[Dict[str, Any]]):
+        """Converts one page of JSON rows into the typed arrays."""
+        n_rows = len(rows)
+        self._reserve(self.size + n_rows)
+        for column, dtype in HISTORY_DTYPES.items():
+            values = [row.get(column) for row in rows]
+            if np.dtype(dtype).kind == 'f':
+                values = [np.nan if value is None else value for value in values]
+            self.arrays[column][self.size:self.size + n_rows] = np.array(values, dtype=dtype)
+        self.size += n_rows
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array[:self.size].nbytes for array in self.arrays.values())
+
+    def to_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame({column: array[:self.size] for column, array in self.arrays.items()})
+        frame['history_date'] = frame['history_date'].astype('datetime64[ns]')
+        return frame
+
+
+def keyset_condition(columns, last_key) -> str:
+    """
+    PostgREST or_() condition for rows strictly after `last_key` in `columns` order,
+    e.g. `a.gt.1,and(a.eq.1,b.gt.2)`.
+    """
+    conditions = []
+    for position, column in enumerate(columns):
+        leaves = [f"{prefix}.eq.{value}" for prefix, value in zip(columns[:position], last_key)]
+        leaves.append(f"{column}.gt.{last_key[position]}")
+        conditions.append(leaves[0] if position == 0 else f"and({','.join(leaves)})")
+    return ','.join(conditions)
+
+
+def _daily_rows_query(
+    supabase, columns: str, since_date: Optional[str], product_ids: Optional[List[int]], **select_options
+):
+    query = supabase.table('historical_data').select(columns, **select_options).eq('period_type', 'daily')
+    if since_date is not None:
+        query = query.gte('history_date', since_date)
+    if product_ids is not None:
+        query = query.in_('product_id', product_ids)
+    return query
+
+
+def _count_daily_rows(
+    supabase, since_date: Optional[str] = None, product_ids: Optional[List[int]] = None
+) -> Optional[int]:
+    """Exact row count used to size the buffers; None if the server does not report it."""
+    try:
+        response = _daily_rows_query(
+            supabase, 'product_id', since_date, product_ids, count='exact'
+        ).limit(1).execute()
+        return response.count
+    except Exception as e:
+        print(f" Warning: could not count historical_data rows: {e}")
+        return None
+
+
+@timed('supabase_fetch.historical_data')
+def fetch_historical_data(
+    supabase,
+    page_size: int = HISTORY_PAGE_SIZE,
+    since_date: Optional[str] = None,
+    product_ids: Optional[List[int]] = None
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Pages through daily historical_data by keyset (history_date, product_id, history_id),
+    optionally restricted to rows on or after `since_date` (YYYY-MM-DD) and
+    to the given `product_ids`.
+
+    Each page is converted to compact typed columns as it arrives, so peak memory
+    stays close to the final arrays. A page shorter than requested that is not
+    the end of the table means the server capped the page size: it is flagged
+    and the loader continues with the smaller page size.
+    """
+    expected_rows = _count_daily_rows(supabase, since_date, product_ids)
+    buffer = HistoryColumnBuffer(expected_rows if expected_rows else page_size)
+
+    stats = {
+        'pages': 0,
+        'rows': 0,
+        'bytes': 0,
+        'page_size': page_size,
+        'expected_rows': expected_rows,
+        'short_pages': 0,
+        'complete': True,
+    }
+
+    last_key = None
+    request_size = page_size
+    previous_short = False
+
+    while True:
+        query = _daily_rows_query(supabase, f"{HISTORY_COLUMNS}, history_id", since_date, product_ids)
+        if last_key is not None:
+            query = query.or_(keyset_condition(KEYSET_COLUMNS, last_key))
+        for column in KEYSET_COLUMNS:
+            query = query.order(column)
+        page = query.limit(request_size).execute().data or []
+        stats['pages'] += 1
+
+        if not page:
+            break
+
+        if previous_short:
+            # The previous short page was not the end: the server caps pages below request_size
+            stats['short_pages'] += 1
+            print(
+                f" Warning: historical_data page truncated to {request_size} rows by the server "
+                f"(requested {page_size}); continuing with the smaller page size"
+            )
+
+        buffer.append(page)
+        last_key = tuple(page[-1][column] for column in KEYSET_COLUMNS)
+
+        previous_short = len(page) < request_size
+        if previous_short:
+            request_size = len(page)
+
+        # The exact count tells us when we are done without an extra empty request
+        if expected_rows is not None and buffer.size >= expected_rows:
+            break
+
+    stats['rows'] = buffer.size
+    stats['bytes'] = buffer.nbytes
+
+    if expected_rows is not None and buffer.size != expected_rows:
+        stats['complete'] = False
+        print(f" Warning: loaded {buffer.size} historical rows but the table reports {expected_rows}")
+
+    print(
+        f" Paged historical_data: {stats['pages']} page(s), {stats['rows']} rows, "
+        f"{stats['bytes'] / 1024 / 1024:.2f} MB typed"
+    )
+    return buffer.to_frame(), stats
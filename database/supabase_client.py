@@ -1,5 +1,60 @@
-from supabase import create_client, Client
-from config import VITE_SUPABASE_PUBLISHABLE_KEY, VITE_SUPABASE_URL
+import threading
+import httpx
+from typing import Optional
+from supabase import create_client, Client, ClientOptions
+from config import (
+    VITE_SUPABASE_PUBLISHABLE_KEY, VITE_SUPABASE_URL,
+    SUPABASE_POOL_SIZE, SUPABASE_KEEPALIVE_CONNECTIONS, SUPABASE_KEEPALIVE_EXPIRY,
+    SUPABASE_CONNECT_TIMEOUT, SUPABASE_READ_TIMEOUT
+)
+
+# Process-wide client; every caller shares its pooled keep-alive HTTP session
+_CLIENT: Optional[Client] = None
+_HTTP_CLIENT: Optional[httpx.Client] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def init_supabase() -> Client:
+    """Creates the shared client (once) with a bounded, keep-alive connection pool."""
+    global _CLIENT, _HTTP_CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            timeout = httpx.Timeout(SUPABASE_READ_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT)
+            _HTTP_CLIENT = httpx.Client(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=SUPABASE_POOL_SIZE,
+                    max_keepalive_connections=SUPABASE_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+                ),
+                follow_redirects=True,
+            )
+            _CLIENT = create_client(
+                VITE_SUPABASE_URL,
+                VITE_SUPABASE_PUBLISHABLE_KEY,
+                options=ClientOptions(httpx_client=_HTTP_CLIENT),
+            )
+    return _CLIENT
+
+
+def close_supabase():
+    """Closes the pooled connections; the next get_supabase() call creates a new client."""
+    global _CLIENT, _HTTP_CLIENT
+    with _CLIENT_LOCK:
+        if _HTTP_CLIENT is not None:
+            _HTTP_CLIENT.close()
+        _CLIENT = None
+        _HTTP_CLIENT = None
+
+
+def set_supabase(client) -> Optional[Client]:
+    """Replaces the shared client (e.g. with a FakeSupabaseClient in tests); returns the previous one."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        previous = _CLIENT
+        _CLIENT = client
+    return previous
+
 
 def get_supabase() -> Client:
- return create_client(VITE_SUPABASE_URL, VITE_SUPABASE_PUBLISHABLE_KEY)   
+    return _CLIENT if _CLIENT is not None else init_supabase()
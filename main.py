@@ -1,13 +1,96 @@
-
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import products, users, forecasting
+from routes import products, users, forecasting, sales
+from config import CONTEXT_REFRESH_INTERVAL_MINUTES, METRICS_FLUSH_INTERVAL_MINUTES, ALERT_INTERVAL_MINUTES
+from models.prediction_model import refresh_forecaster_context
+from models.parallel_batch import shutdown_shard_pool
+from models.forecast_executor import run_in_forecast_executor, shutdown_forecast_executor
+from database.supabase_client import init_supabase, close_supabase, get_supabase
+from utils.metrics import METRICS, RequestMetricsMiddleware, flush_daily_rollups
+
+
+async def scheduled_context_refresh(interval_seconds: float):
+    """Periodically pulls new historical data into the forecaster."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await asyncio.to_thread(refresh_forecaster_context)
+            print(f"Scheduled context refresh: {result}")
+        except Exception as e:
+            METRICS.record_error()
+            print(f"Scheduled context refresh failed: {e}")
+
+
+async def scheduled_alert_run(interval_seconds: float):
+    """Periodically evaluates the alert rules over the whole catalog."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_forecast_executor(forecasting.run_alerts)
+        except Exception as e:
+            METRICS.record_error()
+            print(f"Scheduled alert run failed: {e}")
+
+
+def flush_metrics():
+    """Upserts the daily metrics rollup into system_metrics; failures are only logged."""
+    try:
+        flush_daily_rollups(get_supabase(), METRICS)
+    except Exception as e:
+        print(f"Metrics flush failed: {e}")
+
+
+async def scheduled_metrics_flush(interval_seconds: float):
+    """Periodically writes the daily rollup to system_metrics."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        await asyncio.to_thread(flush_metrics)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        # One pooled client for the whole process; requests reuse its keep-alive connections
+        init_supabase()
+    except Exception as e:
+        print(f"Warning: could not initialise the Supabase client at startup: {e}")
+
+    refresh_task = None
+    if CONTEXT_REFRESH_INTERVAL_MINUTES > 0:
+        refresh_task = asyncio.create_task(scheduled_context_refresh(CONTEXT_REFRESH_INTERVAL_MINUTES * 60))
+
+    alert_task = None
+    if ALERT_INTERVAL_MINUTES > 0:
+        alert_task = asyncio.create_task(scheduled_alert_run(ALERT_INTERVAL_MINUTES * 60))
+
+    flush_task = None
+    if METRICS_FLUSH_INTERVAL_MINUTES > 0:
+        flush_task = asyncio.create_task(scheduled_metrics_flush(METRICS_FLUSH_INTERVAL_MINUTES * 60))
+
+    yield
+
+    if refresh_task is not None:
+        refresh_task.cancel()
+    if alert_task is not None:
+        alert_task.cancel()
+    if flush_task is not None:
+        flush_task.cancel()
+        # Counts since the last scheduled flush are written before the client closes
+        await asyncio.to_thread(flush_metrics)
+    forecasting.JOB_RUNNER.shutdown()
+    forecasting.SHADOW.shutdown()
+    shutdown_forecast_executor()
+    shutdown_shard_pool()
+    close_supabase()
 
 
 app = FastAPI(
     title="SmartStock API",
     version="1.0.0",
-    description="Backend API for SmartStock Inventory Forecasting System"
+    description="Backend API for SmartStock Inventory Forecasting System",
+    lifespan=lifespan
 )
 
 # Allow CORS for all origins (adjust as needed for production)
@@ -19,10 +102,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms and the daily response-time/error rollup
+app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(products.router)
 app.include_router(users.router)
 app.include_router(forecasting.router)
+app.include_router(sales.router)
 
 @app.get("/")
 def root():
     return {"message": "SmartStock API is running"}
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Request and named-timer histograms, counters and today's system_metrics rollup"""
+    return METRICS.snapshot()
@@ -0,0 +1,266 @@
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, List
+
+from config import ALERT_STOCKOUT_DAYS, ALERT_DEVIATION_PERCENT, ALERT_DECLINE_PERCENT
+from utils.metrics import timed
+from .reorder import fetch_reorder_inputs, reorder_plan
+
+# alert_type of each rule; open alerts of the same type and product are not repeated
+ALERT_TYPE_STOCKOUT = 'stockout_risk'
+ALERT_TYPE_DEVIATION = 'forecast_deviation'
+ALERT_TYPE_DECLINING = 'declining_trend'
+ALERT_TYPES = (ALERT_TYPE_STOCKOUT, ALERT_TYPE_DEVIATION, ALERT_TYPE_DECLINING)
+
+# Severities understood by the Alerts page
+SEVERITY_CRITICAL = 'critical'
+SEVERITY_HIGH = 'high'
+SEVERITY_MEDIUM = 'medium'
+
+# History rows behind the forecast deviation (as in the explanation) and the trend (30 recent vs 30 older)
+DEVIATION_HISTORY_ROWS = 90
+TREND_WINDOW_ROWS = 30
+
+# Declines beyond this are high severity, as trend_from_history rates them high confidence
+TREND_HIGH_DECLINE_PERCENT = 25
+
+# Rows per alerts insert and per page of open alerts
+ALERT_INSERT_CHUNK_SIZE = 1000
+OPEN_ALERTS_PAGE_SIZE = 1000
+
+
+def history_statistics(index, positions: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per product, from the in-memory context: average daily units over the last
+    DEVIATION_HISTORY_ROWS rows, and the percent change of the last TREND_WINDOW_ROWS rows
+    against the TREND_WINDOW_ROWS before them (0 with fewer than TREND_WINDOW_ROWS rows,
+    like trend_from_history).
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    n_products = len(positions)
+    starts, ends = index.offsets[positions], index.offsets[positions + 1]
+
+    rows, sales = index.sales_between(starts, ends, DEVIATION_HISTORY_ROWS)
+    counts = np.bincount(rows, minlength=n_products)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average_daily = np.nan_to_num(np.bincount(rows, weights=sales, minlength=n_products) / counts)
+
+    # Rank of every value from the newest row (0) backwards
+    rows, sales = index.sales_between(starts, ends, 2 * TREND_WINDOW_ROWS)
+    counts = np.bincount(rows, minlength=n_products)
+    group_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    from_newest = np.repeat(counts, counts) - 1 - (np.arange(len(rows)) - group_starts)
+    is_recent = from_newest < TREND_WINDOW_ROWS
+    recent = np.bincount(rows, weights=np.where(is_recent, sales, 0), minlength=n_products) / TREND_WINDOW_ROWS
+    older = np.bincount(rows, weights=np.where(is_recent, 0, sales), minlength=n_products) / TREND_WINDOW_ROWS
+    older = np.where(counts >= 2 * TREND_WINDOW_ROWS, older, recent)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        trend_percent = np.where((counts >= TREND_WINDOW_ROWS) & (older > 0), (recent - older) / older * 100, 0.0)
+
+    return {'average_daily': average_daily, 'trend_percent': trend_percent}
+
+
+def evaluate_alert_rules(
+    product_ids: np.ndarray,
+    predictions: np.ndarray,
+    days_of_cover: np.ndarray,
+    average_daily: np.ndarray,
+    trend_percent: np.ndarray,
+    stockout_days: int = ALERT_STOCKOUT_DAYS,
+    deviation_percent: float = ALERT_DEVIATION_PERCENT,
+    decline_percent: float = ALERT_DECLINE_PERCENT
+) -> pd.DataFrame:
+    """
+    Evaluates every rule on all products at once. Returns one row per triggered
+    (product, rule) with product_id, alert_type, severity, current_value and threshold_value.
+
+    - stock-out: days of cover <= stockout_days; critical below one day, high within half of it
+    - deviation: horizon forecast vs the historical daily average over the same horizon, by at
+      least deviation_percent in either direction; high at twice the threshold
+    - declining trend: recent sales down by at least decline_percent; high beyond
+      TREND_HIGH_DECLINE_PERCENT
+    """
+    horizon_days = predictions.shape[1]
+    forecast_total = predictions.sum(axis=1)
+    history_total = average_daily * horizon_days
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percent_change = np.where(history_total > 0, (forecast_total - history_total) / history_total * 100, 0.0)
+
+    cover = np.nan_to_num(days_of_cover, nan=np.inf)
+    rules = [
+        (
+            ALERT_TYPE_STOCKOUT, cover <= stockout_days, cover, stockout_days,
+            np.where(cover < 1, SEVERITY_CRITICAL, np.where(cover <= stockout_days / 2, SEVERITY_HIGH, SEVERITY_MEDIUM)),
+        ),
+        (
+            ALERT_TYPE_DEVIATION, np.abs(percent_change) >= deviation_percent, percent_change, deviation_percent,
+            np.where(np.abs(percent_change) >= 2 * deviation_percent, SEVERITY_HIGH, SEVERITY_MEDIUM),
+        ),
+        (
+            ALERT_TYPE_DECLINING, trend_percent <= -decline_percent, trend_percent, -decline_percent,
+            np.where(trend_percent <= -TREND_HIGH_DECLINE_PERCENT, SEVERITY_HIGH, SEVERITY_MEDIUM),
+        ),
+    ]
+
+    frames = []
+    for alert_type, triggered, current_value, threshold_value, severity in rules:
+        frames.append(pd.DataFrame({
+            'product_id': product_ids[triggered],
+            'alert_type': alert_type,
+            'severity': severity[triggered],
+            'current_value': np.round(current_value[triggered], 2),
+            'threshold_value': float(threshold_value),
+            'forecast_total': forecast_total[triggered],
+            'history_total': history_total[triggered],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _alert_text(alert: Dict[str, Any], product: str, horizon_days: int) -> tuple:
+    """(alert_title, alert_message) of one triggered rule"""
+    value = alert['current_value']
+    if alert['alert_type'] == ALERT_TYPE_STOCKOUT:
+        when = "now" if value < 1 else f"in about {value:.1f} days"
+        return (
+            f"Projected Stock-out: {product}",
+            f"{product} is projected to run out of stock {when} at the forecast demand "
+            f"(threshold: {alert['threshold_value']:.0f} days)."
+        )
+    if alert['alert_type'] == ALERT_TYPE_DEVIATION:
+        direction = 'above' if value > 0 else 'below'
+        return (
+            f"Forecast Deviation: {product}",
+            f"The {horizon_days}-day forecast of {alert['forecast_total']:.0f} units is {abs(value):.1f}% {direction} "
+            f"the historical average of {alert['history_total']:.0f} units."
+        )
+    return (
+        f"Declining Sales: {product}",
+        f"Sales of {product} over the last {TREND_WINDOW_ROWS} days are down {abs(value):.1f}% "
+        f"on the {TREND_WINDOW_ROWS} days before."
+    )
+
+
+def _fetch_open_alert_keys(supabase) -> pd.DataFrame:
+    """
+    (product_id, alert_type) of the unresolved alerts of the engine's types, paged.
+    is_resolved is nullable: alerts created by hand or by older code that left it unset are open too.
+    """
+    rows, start = [], 0
+    while True:
+        page = supabase.table('alerts').select('product_id, alert_type').in_(
+            'alert_type', list(ALERT_TYPES)
+        ).or_(
+            'is_resolved.is.null,is_resolved.eq.false'
+        ).order('alert_id').range(start, start + OPEN_ALERTS_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < OPEN_ALERTS_PAGE_SIZE:
+            # Alerts without a product (e.g. created by hand) never block a product's alert
+            keys = pd.DataFrame(rows, columns=['product_id', 'alert_type']).dropna(subset=['product_id'])
+            return keys.astype({'product_id': np.int64}).drop_duplicates()
+        start += OPEN_ALERTS_PAGE_SIZE
+
+
+@timed('db_save.alerts')
+def _insert_alerts(supabase, records: List[Dict[str, Any]]) -> int:
+    inserted = 0
+    for start in range(0, len(records), ALERT_INSERT_CHUNK_SIZE):
+        result = supabase.table('alerts').insert(records[start:start + ALERT_INSERT_CHUNK_SIZE]).execute()
+        inserted += len(result.data) if result.data else 0
+    return inserted
+
+
+def run_alert_engine(
+    forecaster,
+    supabase,
+    horizon_days: int,
+    stockout_days: int = ALERT_STOCKOUT_DAYS,
+    deviation_percent: float = ALERT_DEVIATION_PERCENT,
+    decline_percent: float = ALERT_DECLINE_PERCENT,
+    state=None
+) -> Dict[str, Any]:
+    """
+    Forecasts every product (reusing cached forecasts, e.g. those of the job that just
+    finished), evaluates the rules across the catalog with columnar operations and
+    bulk-inserts the alerts that are not already open for the same product and type.
+    Reads are one bulk read of stock/settings and one of the open alerts; nothing is
+    queried per product.
+    """
+    timings = {}
+    start = time.perf_counter()
+    state = state or forecaster.state
+
+    forecast = forecaster.forecast_matrix(state.index.product_ids.tolist(), horizon_days, state)
+    timings['forecast_ms'] = (time.perf_counter() - start) * 1000
+
+    step = time.perf_counter()
+    product_ids = forecast['product_ids']
+    inputs = fetch_reorder_inputs(supabase).reindex(pd.Index(product_ids))
+    open_alerts = _fetch_open_alert_keys(supabase)
+    timings['read_ms'] = (time.perf_counter() - step) * 1000
+
+    step = time.perf_counter()
+    plan = reorder_plan(
+        forecast['predictions'],
+        inputs['quantity_available'].to_numpy(dtype=np.float64),
+        np.zeros(len(product_ids)),
+        inputs['lead_time_days'].to_numpy(dtype=np.float64),
+        inputs['reorder_level'].to_numpy(dtype=np.float64),
+        inputs['reorder_quantity'].to_numpy(dtype=np.float64)
+    )
+    history = history_statistics(state.index, forecast['positions'])
+    candidates = evaluate_alert_rules(
+        product_ids, forecast['predictions'], plan['days_of_cover'], history['average_daily'], history['trend_percent'],
+        stockout_days, deviation_percent, decline_percent
+    )
+
+    # Open alerts of the same product and type are not repeated
+    candidates['product_id'] = candidates['product_id'].astype(np.int64)
+    open_keys = pd.MultiIndex.from_frame(open_alerts)
+    duplicate = pd.MultiIndex.from_frame(candidates[['product_id', 'alert_type']]).isin(open_keys)
+    new_alerts = candidates[~duplicate]
+
+    names = inputs['product_name'].reindex(new_alerts['product_id'].to_numpy()).tolist()
+    created_at = datetime.utcnow().isoformat()
+    records = []
+    for alert, name in zip(new_alerts.to_dict('records'), names):
+        product = name if isinstance(name, str) else f"Product {alert['product_id']}"
+        title, message = _alert_text(alert, product, horizon_days)
+        records.append({
+            'product_id': int(alert['product_id']),
+            'alert_type': alert['alert_type'],
+            'severity': alert['severity'],
+            'alert_title': title,
+            'alert_message': message,
+            'current_value': float(alert['current_value']),
+            'threshold_value': alert['threshold_value'],
+            'is_read': False,
+            'is_resolved': False,
+            'created_at': created_at,
+        })
+    timings['evaluate_ms'] = (time.perf_counter() - step) * 1000
+
+    step = time.perf_counter()
+    inserted = _insert_alerts(supabase, records) if records else 0
+    timings['insert_ms'] = (time.perf_counter() - step) * 1000
+    timings['total_ms'] = (time.perf_counter() - start) * 1000
+
+    by_type = new_alerts.groupby(['alert_type', 'severity']).size()
+    summary = {
+        'horizon_days': horizon_days,
+        'products_evaluated': len(product_ids),
+        'alerts_triggered': len(candidates),
+        'already_open': int(duplicate.sum()),
+        'alerts_inserted': inserted,
+        'new_alerts': {
+            alert_type: {severity: int(count) for severity, count in counts.droplevel(0).items()}
+            for alert_type, counts in by_type.groupby(level=0)
+        },
+        'timings_ms': {name: round(ms, 1) for name, ms in timings.items()},
+    }
+    print(
+        f" Alert engine: {len(candidates)} triggered, {summary['already_open']} already open, "
+        f"{inserted} inserted ({timings['total_ms']:.0f}ms)"
+    )
+    return summary
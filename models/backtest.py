@@ -0,0 +1,281 @@
+import json
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+from .batch_engine import SalesRingBuffer, stock_category_codes, run_recursive_forecast
+from .product_index import LOOKBACK_DAYS
+
+BACKTEST_HORIZONS = (7, 14, 30)
+BACKTEST_ORIGINS = 8
+BACKTEST_ORIGIN_STEP_DAYS = 7
+
+# (product, origin) pairs forecast per vectorized run, and model_metrics rows per insert
+BACKTEST_CHUNK_SIZE = 5000
+METRICS_INSERT_CHUNK_SIZE = 1000
+
+_STATIC_COLUMNS = ['Price', 'Inventory Level', 'Store ID_encoded', 'Product ID_encoded', 'Category_encoded', 'Discount']
+_STATS = ['count', 'abs_error', 'squared_error', 'error', 'pct_error', 'pct_count']
+
+
+def backtest_origins(latest_history_date: pd.Timestamp, max_horizon: int, n_origins: int, step_days: int) -> pd.DatetimeIndex:
+    """Anchor dates, oldest first; the newest leaves a full `max_horizon` of actuals after it."""
+    newest = pd.Timestamp(latest_history_date).normalize() - pd.Timedelta(days=max_horizon)
+    return pd.DatetimeIndex([newest - pd.Timedelta(days=step_days * k) for k in reversed(range(n_origins))])
+
+
+class _ErrorAccumulator:
+    """Per-group error sums for every horizon, added up chunk by chunk with bincount."""
+    def __init__(self, n_groups: int, horizons: Sequence[int]):
+        self.n_groups = n_groups
+        self.sums = {h: {stat: np.zeros(n_groups) for stat in _STATS} for h in horizons}
+
+    def add(self, groups: np.ndarray, predictions: np.ndarray, actuals: np.ndarray):
+        observed = ~np.isnan(actuals)
+        errors = np.where(observed, predictions - np.nan_to_num(actuals), 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct_errors = np.where(observed & (actuals > 0), np.abs(errors) / actuals * 100, 0.0)
+
+        for h, sums in self.sums.items():
+            per_pair = {
+                'count': observed[:, :h].sum(axis=1),
+                'abs_error': np.abs(errors[:, :h]).sum(axis=1),
+                'squared_error': (errors[:, :h] ** 2).sum(axis=1),
+                'error': errors[:, :h].sum(axis=1),
+                'pct_error': pct_errors[:, :h].sum(axis=1),
+                'pct_count': (observed[:, :h] & (actuals[:, :h] > 0)).sum(axis=1),
+            }
+            for stat, values in per_pair.items():
+                sums[stat] += np.bincount(groups, weights=values, minlength=self.n_groups)
+
+    def metrics(self, h: int) -> Dict[str, np.ndarray]:
+        sums = self.sums[h]
+        count = sums['count']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'observations': count.astype(np.int64),
+                'mae': sums['abs_error'] / count,
+                'rmse': np.sqrt(sums['squared_error'] / count),
+                'bias': sums['error'] / count,
+                'mape': np.where(sums['pct_count'] > 0, sums['pct_error'] / sums['pct_count'], np.nan),
+            }
+
+
+def _round(value: float, digits: int = 4) -> Optional[float]:
+    return None if not np.isfinite(value) else round(float(value), digits)
+
+
+def run_backtest(
+    forecaster,
+    horizons: Sequence[int] = BACKTEST_HORIZONS,
+    n_origins: int = BACKTEST_ORIGINS,
+    origin_step_days: int = BACKTEST_ORIGIN_STEP_DAYS,
+    chunk_size: int = BACKTEST_CHUNK_SIZE,
+    state=None
+) -> Dict[str, Any]:
+    """
+    Rolling-origin backtest of the recursive forecaster over its own context.
+
+    Every (product, origin) pair is replayed as if the origin were today: the last row on
+    or before the origin is the fixed context and the sales of the LOOKBACK_DAYS before it
+    seed the lags. All pairs, across products and origins, advance together in vectorized
+    runs of `chunk_size` rows with per-row calendar features. Daily predictions are compared
+    with actual sales; days without a history row are left out.
+
+    Returns MAE, RMSE, MAPE and bias per product, per category and overall for each horizon
+    (errors over forecast days 1..h), plus timings.
+    """
+    total_start = time.perf_counter()
+    state = state or forecaster.state
+    index = state.index
+    horizons = sorted(set(horizons))
+    max_horizon = horizons[-1]
+
+    latest_history_date = index.frame['Date'].max()
+    origins = backtest_origins(latest_history_date, max_horizon, n_origins, origin_step_days)
+    origin_days = origins.to_numpy().astype('datetime64[D]')
+
+    # Every product at every origin; keep pairs with history on or before the origin
+    n_products = len(index)
+    pair_positions = np.tile(np.arange(n_products, dtype=np.int64), len(origins))
+    pair_origins = np.repeat(origin_days, n_products)
+    ends = index.rows_through(pair_positions, pair_origins)
+    has_history = ends > index.offsets[pair_positions]
+    pair_positions, pair_origins, ends = pair_positions[has_history], pair_origins[has_history], ends[has_history]
+
+    contexts = index.frame.iloc[ends - 1]
+    valid = stock_category_codes(contexts['Inventory Level'].to_numpy(dtype=np.float64)) >= 0
+    pair_positions, pair_origins, ends = pair_positions[valid], pair_origins[valid], ends[valid]
+    contexts = contexts[valid]
+
+    static = {column: contexts[column].to_numpy(dtype=np.float64) for column in _STATIC_COLUMNS}
+    categories, category_codes = np.unique(contexts['Category'].to_numpy(dtype=np.int64), return_inverse=True)
+
+    by_product = _ErrorAccumulator(n_products, horizons)
+    by_category = _ErrorAccumulator(len(categories), horizons)
+    overall = _ErrorAccumulator(1, horizons)
+    prepare_ms = (time.perf_counter() - total_start) * 1000
+
+    forecast_seconds, metrics_seconds = 0.0, 0.0
+    n_pairs = len(pair_positions)
+    steps = np.arange(1, max_horizon + 1)
+
+    for start in range(0, n_pairs, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        positions, chunk_origins = pair_positions[chunk], pair_origins[chunk]
+
+        forecast_start = time.perf_counter()
+        window_starts = index.rows_from(positions, chunk_origins - np.timedelta64(LOOKBACK_DAYS, 'D'))
+        ring_rows, ring_sales = index.sales_between(window_starts, ends[chunk])
+        ring = SalesRingBuffer.from_grouped_sales(ring_rows, ring_sales, len(positions))
+
+        predictions, _ = run_recursive_forecast(
+            forecaster.predictor,
+            {column: values[chunk] for column, values in static.items()},
+            ring,
+            chunk_origins + np.timedelta64(1, 'D'),
+            max_horizon
+        )
+        forecast_seconds += time.perf_counter() - forecast_start
+
+        metrics_start = time.perf_counter()
+        actuals = index.sales_on(
+            np.repeat(positions, max_horizon),
+            (chunk_origins[:, None] + steps.astype('timedelta64[D]')).ravel()
+        ).reshape(len(positions), max_horizon)
+
+        by_product.add(positions, predictions, actuals)
+        by_category.add(category_codes[chunk], predictions, actuals)
+        overall.add(np.zeros(len(positions), dtype=np.int64), predictions, actuals)
+        metrics_seconds += time.perf_counter() - metrics_start
+
+        done = min(start + chunk_size, n_pairs)
+        elapsed = time.perf_counter() - total_start
+        print(f" Backtest: {done}/{n_pairs} product-origins ({done / elapsed:.0f}/s)")
+
+    products_per_category = np.bincount(
+        np.unique(np.column_stack([category_codes, pair_positions]), axis=0)[:, 0], minlength=len(categories)
+    ) if n_pairs else np.zeros(len(categories), dtype=np.int64)
+    products_evaluated = len(np.unique(pair_positions))
+
+    results = []
+    for h in horizons:
+        scopes = [
+            ('overall', overall.metrics(h), [None], [products_evaluated]),
+            ('category', by_category.metrics(h), categories.tolist(), products_per_category.tolist()),
+            ('product', by_product.metrics(h), index.product_ids.tolist(), [1] * n_products),
+        ]
+        for scope, metrics, keys, product_counts in scopes:
+            for i, key in enumerate(keys):
+                if metrics['observations'][i] == 0:
+                    continue
+                results.append({
+                    'scope': scope,
+                    'key': key,
+                    'horizon_days': h,
+                    'observations': int(metrics['observations'][i]),
+                    'products': int(product_counts[i]),
+                    'mae': _round(metrics['mae'][i]),
+                    'rmse': _round(metrics['rmse'][i]),
+                    'mape': _round(metrics['mape'][i]),
+                    'bias': _round(metrics['bias'][i]),
+                })
+
+    total_ms = (time.perf_counter() - total_start) * 1000
+    print(f" Backtest finished: {n_pairs} product-origins, {len(results)} metric rows in {total_ms / 1000:.2f}s")
+
+    return {
+        'origins': [origin.strftime('%Y-%m-%d') for origin in origins],
+        'horizons': horizons,
+        'product_origins': n_pairs,
+        'products_evaluated': products_evaluated,
+        'context_version': state.version,
+        'results': results,
+        'timings_ms': {
+            'prepare': round(prepare_ms, 1),
+            'forecast': round(forecast_seconds * 1000, 1),
+            'metrics': round(metrics_seconds * 1000, 1),
+            'total': round(total_ms, 1),
+        },
+    }
+
+
+def model_metrics_rows(backtest: Dict[str, Any], model_version: str, evaluation_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    model_metrics rows for a backtest. The table has no scope columns, so the scope
+    (overall/category/product), its key, MAPE and bias are kept as JSON in `notes`;
+    `overall_accuracy` is 100 - MAPE, floored at 0.
+    """
+    evaluation_date = evaluation_date or date.today().isoformat()
+    rows = []
+    for result in backtest['results']:
+        notes = {
+            'scope': result['scope'],
+            'mape': result['mape'],
+            'bias': result['bias'],
+            'observations': result['observations'],
+            'origins': len(backtest['origins']),
+            'first_origin': backtest['origins'][0],
+            'last_origin': backtest['origins'][-1],
+        }
+        if result['scope'] == 'product':
+            notes['product_id'] = int(result['key'])
+        elif result['scope'] == 'category':
+            notes['category_id'] = int(result['key'])
+
+        rows.append({
+            'evaluation_date': evaluation_date,
+            'evaluation_period': f"{result['horizon_days']} Days",
+            'mean_absolute_error': result['mae'],
+            'root_mean_square_error': result['rmse'],
+            'overall_accuracy': None if result['mape'] is None else round(max(0.0, 100 - result['mape']), 2),
+            'products_evaluated': result['products'],
+            'model_version': model_version,
+            'notes': json.dumps(notes),
+        })
+    return rows
+
+
+def write_backtest_metrics(supabase, backtest: Dict[str, Any], model_version: str) -> Dict[str, Any]:
+    """Replaces today's model_metrics rows of this model version with the backtest, in bulk inserts."""
+    write_start = time.perf_counter()
+    rows = model_metrics_rows(backtest, model_version)
+    if not rows:
+        return {'rows_written': 0, 'write_ms': 0.0}
+
+    # A rerun on the same day replaces that day's results instead of duplicating them
+    supabase.table('model_metrics').delete().eq(
+        'evaluation_date', rows[0]['evaluation_date']
+    ).eq(
+        'model_version', model_version
+    ).execute()
+
+    written = 0
+    for start in range(0, len(rows), METRICS_INSERT_CHUNK_SIZE):
+        result = supabase.table('model_metrics').insert(rows[start:start + METRICS_INSERT_CHUNK_SIZE]).execute()
+        written += len(result.data) if result.data else 0
+
+    write_ms = (time.perf_counter() - write_start) * 1000
+    print(f" Wrote {written} model_metrics row(s) in {write_ms:.0f}ms")
+    return {'rows_written': written, 'write_ms': round(write_ms, 1)}
+
+
+def backtest_summary(backtest: Dict[str, Any]) -> Dict[str, Any]:
+    """The backtest without per-product and per-category rows, for API responses and logs."""
+    summary = {key: value for key, value in backtest.items() if key != 'results'}
+    summary['overall'] = [result for result in backtest['results'] if result['scope'] == 'overall']
+    summary['metric_rows'] = len(backtest['results'])
+    return summary
+
+
+if __name__ == '__main__':
+    # Nightly entry point: python -m models.backtest
+    from database.supabase_client import get_supabase
+    from .prediction_model import get_forecaster
+
+    forecaster = get_forecaster()
+    result = run_backtest(forecaster)
+    write_result = write_backtest_metrics(get_supabase(), result, forecaster.model_version)
+    print(json.dumps({**backtest_summary(result), **write_result}, indent=2))
@@ -0,0 +1,218 @@
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple, Union
+
+from utils.metrics import METRICS
+
+# Width of the lag/rolling window (sales_lag_30 / sales_rolling_mean_30)
+LAG_WINDOW = 30
+
+# Stock category bins used at training time: [0, 50) critical_low, [50, 200) medium, [200, inf) high
+STOCK_CATEGORY_EDGES = np.array([0.0, 50.0, 200.0])
+
+# Features run_recursive_forecast fills by name, in the bundled model's training order.
+# The model registry requires every version to list all of them, and the manager uses
+# this order when no feature list is given.
+FEATURE_COLUMNS = [
+    'Price', 'Inventory Level', 'Store ID_encoded',
+    'Product ID_encoded', 'Category_encoded', 'day_of_week', 'is_weekend',
+    'month', 'year', 'month_sin', 'month_cos', 'effective_price',
+    'discount_active', 'stock_category_simple_encoded',
+    'sales_lag_1', 'sales_lag_7', 'sales_lag_30', 'sales_rolling_mean_30'
+]
+# Features it also fills when a model lists them; any other name would stay 0
+OPTIONAL_FEATURES = ['Discount']
+
+
+class SalesRingBuffer:
+    """
+    Holds the last LAG_WINDOW daily sales of every product in a batch.
+
+    All products advance together, so a single head pointer is shared by
+    every row. Histories shorter than the window are right-aligned and
+    `counts` tracks how many slots of each row hold real values.
+    """
+    def __init__(self, n_products: int, width: int = LAG_WINDOW):
+        self.width = width
+        self.values = np.zeros((n_products, width), dtype=np.float64)
+        self.counts = np.zeros(n_products, dtype=np.int64)
+        self.head = 0  # Slot the next push writes to (oldest value once full)
+
+    @classmethod
+    def from_grouped_sales(cls, rows: np.ndarray, sales: np.ndarray, n_products: int, width: int = LAG_WINDOW):
+        """
+        Builds the buffer from flat sales values in chronological order.
+        `rows[i]` is the batch row (product position) that `sales[i]` belongs to.
+        """
+        ring = cls(n_products, width)
+        rows = np.asarray(rows, dtype=np.int64)
+        sales = np.asarray(sales, dtype=np.float64)
+        if len(rows) == 0:
+            return ring
+
+        # Position of every value counted from the newest one of its product
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        totals = np.bincount(sorted_rows, minlength=n_products)
+        group_end = np.cumsum(totals)[sorted_rows]
+        from_end = group_end - 1 - np.arange(len(sorted_rows))
+
+        keep = from_end < width
+        ring.values[sorted_rows[keep], width - 1 - from_end[keep]] = sales[order][keep]
+        ring.counts = np.minimum(totals, width)
+        return ring
+
+    @classmethod
+    def from_windows(cls, windows: np.ndarray, counts: np.ndarray):
+        """Rebuilds a buffer from chronological, right-aligned windows (see `windows()`)."""
+        windows = np.asarray(windows, dtype=np.float64)
+        ring = cls(len(windows), windows.shape[1])
+        ring.values[:] = windows
+        ring.counts = np.asarray(counts, dtype=np.int64).copy()
+        return ring
+
+    def windows(self) -> np.ndarray:
+        """Every row's window in chronological order, oldest first (a copy)."""
+        return self.values[:, (self.head + np.arange(self.width)) % self.width]
+
+    def lag(self, k: int) -> np.ndarray:
+        """Sales k days back, falling back to the latest sale (or 0) for short histories."""
+        latest = self.values[:, (self.head - 1) % self.width]
+        lagged = self.values[:, (self.head - k) % self.width]
+        return np.where(self.counts >= k, lagged, latest)
+
+    def rolling_mean(self) -> np.ndarray:
+        """Mean of the available sales in the window (0 for products without history)."""
+        window = self.windows()
+        means = np.zeros(len(self.counts), dtype=np.float64)
+
+        full = self.counts == self.width
+        if full.any():
+            means[full] = window[full].mean(axis=1)
+
+        # Rows still filling up only average their newest `count` values
+        for count in np.unique(self.counts[~full]):
+            if count == 0:
+                continue
+            rows = self.counts == count
+            means[rows] = window[rows, self.width - count:].mean(axis=1)
+        return means
+
+    def push(self, sales: np.ndarray):
+        """Appends one day of sales for every product."""
+        self.values[:, self.head] = sales
+        self.head = (self.head + 1) % self.width
+        np.minimum(self.counts + 1, self.width, out=self.counts)
+
+
+def stock_category_codes(inventory: np.ndarray) -> np.ndarray:
+    """Encodes inventory levels into stock categories; -1 where no category applies."""
+    inventory = np.asarray(inventory, dtype=np.float64)
+    valid = np.isfinite(inventory) & (inventory >= 0)
+    codes = np.searchsorted(STOCK_CATEGORY_EDGES, np.where(valid, inventory, 0.0), side='right') - 1
+    return np.where(valid, codes, -1)
+
+
+def run_recursive_forecast(
+    predictor,
+    context: Dict[str, np.ndarray],
+    ring: SalesRingBuffer,
+    start_date: Union[pd.Timestamp, np.ndarray],
+    horizon_days: int,
+    quantile_predictors: Optional[Dict[str, object]] = None
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Forecasts every product in `context` day by day, one predict call per day.
+
+    `predictor` is a NativePredictor. `context` maps the static feature inputs
+    ('Price', 'Discount', 'Inventory Level', 'Store ID_encoded', 'Product ID_encoded',
+    'Category_encoded') to per-product arrays. Predictions are clipped at zero,
+    pushed into `ring` and returned as a (n_products, horizon_days) array.
+
+    `start_date` is the first forecast day of every product, or an array with one
+    start date per product (e.g. backtest origins), in which case the calendar
+    features are filled per row.
+
+    Each of `quantile_predictors` (name -> NativePredictor) is evaluated on the same
+    feature matrix at every step; only the point forecast feeds the recursion.
+    Returns (predictions, {name: quantile predictions}).
+    """
+    n_products = len(context['Price'])
+    col = predictor.column_index
+    quantile_predictors = quantile_predictors or {}
+    predictions = np.zeros((n_products, horizon_days), dtype=np.float64)
+    quantiles = {name: np.zeros((n_products, horizon_days), dtype=np.float64) for name in quantile_predictors}
+    if n_products == 0:
+        return predictions, quantiles
+
+    # Feature filling and predict calls are timed separately, recorded once per run
+    feature_seconds, predict_seconds = 0.0, 0.0
+    start = time.perf_counter()
+
+    # Static features are filled once; only date and lag columns change per step
+    X = predictor.new_buffer(n_products)
+    price = np.asarray(context['Price'], dtype=np.float64)
+    discount = np.asarray(context['Discount'], dtype=np.float64)
+    inventory = np.asarray(context['Inventory Level'], dtype=np.float64)
+
+    X[:, col['Price']] = price
+    if 'Discount' in col:
+        X[:, col['Discount']] = discount
+    X[:, col['Inventory Level']] = inventory
+    X[:, col['Store ID_encoded']] = context['Store ID_encoded']
+    X[:, col['Product ID_encoded']] = context['Product ID_encoded']
+    X[:, col['Category_encoded']] = context['Category_encoded']
+    X[:, col['effective_price']] = price * (1 - discount / 100)
+    X[:, col['discount_active']] = (discount > 0).astype(np.float64)
+    X[:, col['stock_category_simple_encoded']] = stock_category_codes(inventory)
+
+    per_row_dates = np.ndim(start_date) > 0
+    if per_row_dates:
+        start_days = np.asarray(start_date, dtype='datetime64[D]')
+    else:
+        date_range = pd.date_range(start=start_date, periods=horizon_days, freq='D')
+
+    for step in range(horizon_days):
+        if per_row_dates:
+            dates = pd.DatetimeIndex(start_days + step)
+            day_of_week = dates.dayofweek.to_numpy()
+            month = dates.month.to_numpy()
+            X[:, col['day_of_week']] = day_of_week
+            X[:, col['is_weekend']] = day_of_week >= 5
+            X[:, col['month']] = month
+            X[:, col['year']] = dates.year.to_numpy()
+            X[:, col['month_sin']] = np.sin(2 * np.pi * month / 12)
+            X[:, col['month_cos']] = np.cos(2 * np.pi * month / 12)
+        else:
+            date = date_range[step]
+            X[:, col['day_of_week']] = date.dayofweek
+            X[:, col['is_weekend']] = int(date.dayofweek >= 5)
+            X[:, col['month']] = date.month
+            X[:, col['year']] = date.year
+            X[:, col['month_sin']] = np.sin(2 * np.pi * date.month / 12)
+            X[:, col['month_cos']] = np.cos(2 * np.pi * date.month / 12)
+
+        X[:, col['sales_lag_1']] = ring.lag(1)
+        X[:, col['sales_lag_7']] = ring.lag(7)
+        X[:, col['sales_lag_30']] = ring.lag(30)
+        X[:, col['sales_rolling_mean_30']] = ring.rolling_mean()
+
+        features_done = time.perf_counter()
+        feature_seconds += features_done - start
+
+        pred_units = predictor.predict(X)
+        pred_units = np.where(pred_units > 0, pred_units, 0.0)
+
+        ring.push(pred_units)
+        predictions[:, step] = pred_units
+
+        for name, quantile_predictor in quantile_predictors.items():
+            quantiles[name][:, step] = quantile_predictor.predict(X)
+
+        start = time.perf_counter()
+        predict_seconds += start - features_done
+
+    METRICS.observe('feature_build', feature_seconds)
+    METRICS.observe('model_predict', predict_seconds)
+    return predictions, quantiles
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict
+
+# The only context columns inference reads, with the compact dtype each is stored in.
+# Price stays float64: it is a model feature and must not move across split thresholds.
+# Store, product and category are held as small integer codes.
+CONTEXT_DTYPES = {
+    'Date': 'datetime64[ns]',
+    'Product ID': np.int32,
+    'Units Sold': np.float32,
+    'Price': np.float64,
+    'Discount': np.float32,
+    'Inventory Level': np.float32,
+    'Store ID': np.int16,
+    'Category': np.int16,
+    'Store ID_encoded': np.int16,
+    'Product ID_encoded': np.int32,
+    'Category_encoded': np.int16,
+}
+
+
+def compact_context(context_df: pd.DataFrame) -> pd.DataFrame:
+    """Keeps only the columns in CONTEXT_DTYPES, downcast to their compact dtypes."""
+    return context_df[list(CONTEXT_DTYPES)].astype(CONTEXT_DTYPES)
+
+
+def context_memory_report(before_df: pd.DataFrame, after_df: pd.DataFrame) -> Dict[str, Any]:
+    """Bytes and dtype per column before and after compaction (0 bytes once a column is dropped)."""
+    before = before_df.memory_usage(index=False, deep=True)
+    after = after_df.memory_usage(index=False, deep=True)
+
+    columns = []
+    for column in before_df.columns:
+        columns.append({
+            'column': column,
+            'dtype_before': str(before_df[column].dtype),
+            'dtype_after': str(after_df[column].dtype) if column in after_df else None,
+            'bytes_before': int(before[column]),
+            'bytes_after': int(after[column]) if column in after_df else 0,
+        })
+
+    total_before, total_after = int(before.sum()), int(after.sum())
+    return {
+        'rows': len(after_df),
+        'columns': columns,
+        'total_bytes_before': total_before,
+        'total_bytes_after': total_after,
+        'saved_percent': round((1 - total_after / total_before) * 100, 1) if total_before else 0.0,
+    }
+
+
+def print_memory_report(report: Dict[str, Any]):
+    print(f" Context memory: {report['rows']} rows")
+    for column in report['columns']:
+        after = f"{column['dtype_after']:>14} {column['bytes_after'] / 1024:>10.1f} KB" if column['dtype_after'] else f"{'dropped':>14}"
+        print(f"   {column['column']:<24} {column['dtype_before']:>14} {column['bytes_before'] / 1024:>10.1f} KB -> {after}")
+    print(
+        f" Context memory total: {report['total_bytes_before'] / 1024 / 1024:.2f} MB -> "
+        f"{report['total_bytes_after'] / 1024 / 1024:.2f} MB ({report['saved_percent']}% saved)"
+    )
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from config import CONTEXT_SNAPSHOT_DIR
+
+# Bump when the context preparation pipeline changes so old snapshots are rebuilt
+SNAPSHOT_FORMAT_VERSION = 2
+MANIFEST_FILE = 'manifest.json'
+
+
+def context_schema_hash(context_df: pd.DataFrame) -> str:
+    """Hash of the column names, dtypes and snapshot format version."""
+    schema = [SNAPSHOT_FORMAT_VERSION] + [[column, str(dtype)] for column, dtype in context_df.dtypes.items()]
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()[:16]
+
+
+def save_context_snapshot(context_df: pd.DataFrame, directory: str = CONTEXT_SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Writes the prepared context as one .npy file per column plus a manifest.
+    The bundle is written to a temporary directory and swapped in, so readers
+    never see a half-written snapshot.
+    """
+    try:
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        columns = []
+        for i, column in enumerate(context_df.columns):
+            values = context_df[column].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            file_name = f"col_{i:03d}.npy"
+            np.save(os.path.join(tmp_dir, file_name), values, allow_pickle=False)
+            columns.append({'name': column, 'dtype': str(context_df[column].dtype), 'file': file_name})
+
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'created_at': datetime.utcnow().isoformat(),
+            'row_count': len(context_df),
+            'max_history_date': context_df['Date'].max().strftime('%Y-%m-%d'),
+            'schema_hash': context_schema_hash(context_df),
+            'product_classes': np.unique(context_df['Product ID'].astype(str)).tolist(),
+            'columns': columns,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f)
+
+        old_dir = f"{directory}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(directory):
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        print(f" Saved context snapshot: {manifest['row_count']} rows up to {manifest['max_history_date']}")
+        return manifest
+
+    except Exception as e:
+        # A missing snapshot only costs the next start a full load
+        print(f" Warning: could not save context snapshot: {e}")
+        return None
+
+
+def load_context_snapshot(directory: str = CONTEXT_SNAPSHOT_DIR) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Reads a saved snapshot back into a context DataFrame (the columns are loaded into
+    memory; the forecaster keeps its own product-sorted copy anyway).
+    Returns None when there is no usable snapshot.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            print(" Context snapshot format is outdated; doing a full load")
+            return None
+
+        data = {
+            column['name']: np.load(os.path.join(directory, column['file']))
+            for column in manifest['columns']
+        }
+        context_df = pd.DataFrame(data, copy=False).astype(
+            {column['name']: column['dtype'] for column in manifest['columns']}, copy=False
+        )
+
+        if len(context_df) != manifest['row_count'] or context_schema_hash(context_df) != manifest['schema_hash']:
+            print(" Context snapshot does not match its manifest; doing a full load")
+            return None
+
+        print(f" Loaded context snapshot: {manifest['row_count']} rows up to {manifest['max_history_date']}")
+        return context_df, manifest
+
+    except Exception as e:
+        print(f" Warning: could not load context snapshot: {e}")
+        return None
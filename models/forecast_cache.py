@@ -0,0 +1,155 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from config import FORECAST_CACHE_MAX_MB
+
+# Rough per-entry cost of the key, entry object and dict slot on top of the arrays
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class CachedForecast:
+    """
+    The longest forecast computed so far for one product (with its quantile
+    predictions, if any), plus the sales window at its last day so a longer
+    horizon can continue from it.
+    """
+    __slots__ = ('predictions', 'window', 'count', 'quantiles')
+
+    def __init__(self, predictions: np.ndarray, window: np.ndarray, count: int, quantiles: Dict[str, np.ndarray]):
+        self.predictions = predictions
+        self.window = window
+        self.count = count
+        self.quantiles = quantiles
+
+    @property
+    def nbytes(self) -> int:
+        quantile_bytes = sum(values.nbytes for values in self.quantiles.values())
+        return self.predictions.nbytes + self.window.nbytes + quantile_bytes + ENTRY_OVERHEAD_BYTES
+
+
+class ForecastCache:
+    """
+    Memory-bounded LRU cache of per-product forecasts.
+
+    Keys are (product, anchor date, context version), so an entry can only be reused
+    for the exact history it was computed from. Shorter horizons are served by slicing
+    an entry; longer ones continue from its stored window.
+    """
+    def __init__(self, max_bytes: int = int(FORECAST_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedForecast]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get_many(self, keys: List[Hashable], horizon_days: int) -> List[Optional[CachedForecast]]:
+        """Entries for `keys` (None for misses); counts a hit when an entry covers `horizon_days`."""
+        if not self.enabled:
+            return [None] * len(keys)
+
+        entries = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    if len(entry.predictions) >= horizon_days:
+                        self.hits += 1
+                    else:
+                        self.partial_hits += 1
+                entries.append(entry)
+        return entries
+
+    def covers(self, keys: List[Hashable], horizon_days: int) -> List[bool]:
+        """Whether each key has an entry covering `horizon_days`, without counting a lookup."""
+        with self._lock:
+            return [
+                key in self._entries and len(self._entries[key].predictions) >= horizon_days
+                for key in keys
+            ]
+
+    def entries(self, keys: List[Hashable]) -> List[Tuple[Hashable, CachedForecast]]:
+        """(key, entry) pairs of the keys that are cached, without counting a lookup."""
+        with self._lock:
+            return [(key, self._entries[key]) for key in keys if key in self._entries]
+
+    def put_many(
+        self,
+        keys: List[Hashable],
+        predictions: np.ndarray,
+        windows: np.ndarray,
+        counts: np.ndarray,
+        quantiles: Optional[Dict[str, np.ndarray]] = None
+    ):
+        """Stores one entry per key from row-aligned arrays, evicting least recently used entries."""
+        if not self.enabled:
+            return
+
+        quantiles = quantiles or {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                # Row copies, so an entry never keeps the whole batch matrix alive
+                entry = CachedForecast(
+                    predictions[i].copy(), windows[i].copy(), int(counts[i]),
+                    {name: values[i].copy() for name, values in quantiles.items()}
+                )
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._bytes -= previous.nbytes
+                self._entries[key] = entry
+                self._bytes += entry.nbytes
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used entries until the cache fits its bound (lock held)."""
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def put_entries(self, entries: List[Tuple[Hashable, CachedForecast]]):
+        """Stores entries computed elsewhere (e.g. by a shard worker), keeping the longer forecast of a key."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for key, entry in entries:
+                previous = self._entries.get(key)
+                if previous is not None and len(previous.predictions) >= len(entry.predictions):
+                    continue
+                if previous is not None:
+                    self._bytes -= self._entries.pop(key).nbytes
+                self._entries[key] = entry
+                self._bytes += entry.nbytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.partial_hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'partial_hits': self.partial_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.partial_hits) / lookups, 4) if lookups else None,
+            }
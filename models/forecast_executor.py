@@ -0,0 +1,51 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import FORECAST_MAX_CONCURRENCY
+
+# Dedicated pool for CPU-bound inference so it never occupies the server's request threads
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_forecast_executor() -> ThreadPoolExecutor:
+    """Returns the shared inference executor, creating it on first use."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(FORECAST_MAX_CONCURRENCY, 1),
+                thread_name_prefix='forecast'
+            )
+    return _EXECUTOR
+
+
+async def run_in_forecast_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs `func` in the inference executor and awaits the result.
+    At most FORECAST_MAX_CONCURRENCY calls run at once; the rest wait in the queue,
+    and a queued call is dropped if its awaiting request is cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_forecast_executor(), functools.partial(func, *args, **kwargs))
+
+
+def call_in_forecast_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs `func` in the inference executor from a plain thread (e.g. a batch job worker)
+    and blocks until it returns, so background work shares the FORECAST_MAX_CONCURRENCY
+    bound with requests instead of running on top of it.
+    """
+    return get_forecast_executor().submit(functools.partial(func, *args, **kwargs)).result()
+
+
+def shutdown_forecast_executor():
+    """Stops accepting work and discards queued calls; running calls finish in the background."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            _EXECUTOR = None
@@ -0,0 +1,321 @@
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import FORECAST_JOBS_DB, FORECAST_JOB_WORKERS, FORECAST_JOB_CHUNK_SIZE
+from models.prediction_model import get_forecaster
+from models.forecast_executor import call_in_forecast_executor
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+_JOB_COLUMNS = [
+    'job_id', 'status', 'horizon_days', 'total_products', 'processed_products', 'records_saved',
+    'failed_chunks', 'cancel_requested', 'error', 'created_at', 'started_at', 'finished_at',
+]
+
+
+def _boot_id() -> str:
+    """Identifies the current boot, so PIDs recorded before a reboot are never taken for live ones."""
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            return f.read().strip()
+    except OSError:  # Not Linux: PIDs are only compared within the same host
+        return socket.gethostname()
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == 'nt':  # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process recorded as a job's owner ("<boot id>:<pid>") is still running."""
+    if not owner:
+        return False
+    boot_id, _, pid = owner.rpartition(':')
+    return boot_id == _boot_id() and pid.isdigit() and _pid_alive(int(pid))
+
+
+class ForecastJobStore:
+    """
+    SQLite-backed table of batch forecast jobs, shared by the API and the worker threads.
+
+    The file may be shared by several server processes; each job records its owner, the
+    process whose in-memory queue holds it, and only jobs whose owner is gone are failed.
+    """
+    def __init__(self, path: str = FORECAST_JOBS_DB):
+        self.owner = f"{_boot_id()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS forecast_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                horizon_days INTEGER NOT NULL,
+                total_products INTEGER,
+                processed_products INTEGER NOT NULL DEFAULT 0,
+                records_saved INTEGER NOT NULL DEFAULT 0,
+                failed_chunks INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                owner TEXT
+            )
+        """)
+        # Tables created before jobs recorded their owner
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(forecast_jobs)")}
+        if 'owner' not in columns:
+            self._conn.execute("ALTER TABLE forecast_jobs ADD COLUMN owner TEXT")
+
+        self.fail_orphaned_jobs()
+
+    def fail_orphaned_jobs(self) -> int:
+        """
+        Marks queued/running jobs failed when their owner process has exited (or the host
+        rebooted): the queue lived in its memory, so they can never finish. Returns the count.
+        """
+        with self._lock:
+            unfinished = self._conn.execute(
+                "SELECT job_id, owner FROM forecast_jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            orphaned = [row['job_id'] for row in unfinished if not _owner_alive(row['owner'])]
+            for job_id in orphaned:
+                self._conn.execute(
+                    "UPDATE forecast_jobs SET status = 'failed', error = 'Interrupted: the server process running it stopped', "
+                    "finished_at = ? WHERE job_id = ? AND status IN ('queued', 'running')",
+                    (datetime.utcnow().isoformat(), job_id)
+                )
+        return len(orphaned)
+
+    def create(self, horizon_days: int) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO forecast_jobs (job_id, status, horizon_days, created_at, owner) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, horizon_days, datetime.utcnow().isoformat(), self.owner)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM forecast_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def update(self, job_id: str, **fields):
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE forecast_jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id)
+            )
+
+    def mark_running(self, job_id: str, total_products: int) -> bool:
+        """Moves a job from queued to running; False if it left 'queued' meanwhile (e.g. was cancelled)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE forecast_jobs SET status = 'running', total_products = ?, started_at = ? "
+                "WHERE job_id = ? AND status = 'queued'",
+                (total_products, datetime.utcnow().isoformat(), job_id)
+            )
+        return cursor.rowcount == 1
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancels a queued job at once; a running job stops after its current chunk."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE forecast_jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+                "WHERE job_id = ? AND status = 'queued'",
+                (datetime.utcnow().isoformat(), job_id)
+            )
+            self._conn.execute(
+                "UPDATE forecast_jobs SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'",
+                (job_id,)
+            )
+        return self.get(job_id)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM forecast_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def job_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job row plus completion percentage, throughput (products/s) and ETA (s) while running."""
+    report = {column: job[column] for column in _JOB_COLUMNS if column != 'cancel_requested'}
+    report['cancel_requested'] = bool(job['cancel_requested'])
+    report['percent_complete'] = None
+    report['products_per_second'] = None
+    report['eta_seconds'] = None
+
+    total = job['total_products']
+    processed = job['processed_products']
+    if total:
+        report['percent_complete'] = round(processed / total * 100, 1)
+
+    if job['started_at']:
+        end = datetime.fromisoformat(job['finished_at']) if job['finished_at'] else datetime.utcnow()
+        elapsed = (end - datetime.fromisoformat(job['started_at'])).total_seconds()
+        if elapsed > 0 and processed > 0:
+            throughput = processed / elapsed
+            report['products_per_second'] = round(throughput, 2)
+            if job['status'] == 'running' and total:
+                report['eta_seconds'] = round((total - processed) / throughput, 1)
+
+    return report
+
+
+class ForecastJobRunner:
+    """
+    In-process queue of batch forecast jobs served by a small pool of worker threads.
+
+    A job forecasts every product in chunks of `chunk_size` against one context state,
+    and hands each chunk's predictions to `save_chunk(predictions, horizon_days, model_version=..., state=...)`
+    (the model version and state that computed them) as soon as it is computed, so saved rows
+    and progress grow while the job runs. `on_complete(job)`, if given, runs after a job
+    completes; its failures are logged and do not fail the job.
+    """
+    def __init__(
+        self,
+        save_chunk: Callable[..., Dict[str, Any]],
+        store: Optional[ForecastJobStore] = None,
+        workers: int = FORECAST_JOB_WORKERS,
+        chunk_size: int = FORECAST_JOB_CHUNK_SIZE,
+        on_complete: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ):
+        self.save_chunk = save_chunk
+        self.on_complete = on_complete
+        self._store = store
+        self.workers = max(workers, 1)
+        self.chunk_size = max(chunk_size, 1)
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> ForecastJobStore:
+        # Created on first use so importing the routes does not touch the filesystem
+        with self._lock:
+            if self._store is None:
+                self._store = ForecastJobStore()
+        return self._store
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"forecast-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, horizon_days: int) -> Dict[str, Any]:
+        # Jobs left behind by a process that exited since this one started
+        self.store.fail_orphaned_jobs()
+        job = self.store.create(horizon_days)
+        self._ensure_workers()
+        self._queue.put(job['job_id'])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.request_cancel(job_id)
+
+    def shutdown(self):
+        """Stops the workers once their current chunk is done; unfinished jobs are failed once this process is gone."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            try:
+                self._run(job_id)
+            except Exception as e:
+                print(f"Forecast job {job_id} crashed: {e}")
+
+    def _run(self, job_id: str):
+        store = self.store
+        job = store.get(job_id)
+        if job is None or job['status'] != 'queued':
+            return  # Cancelled while waiting in the queue
+
+        try:
+            forecaster = call_in_forecast_executor(get_forecaster)
+
+            # The whole job runs against one state and model, even if a refresh or swap lands meanwhile
+            state = forecaster.state
+            model_version = forecaster.model_version
+            product_ids = state.index.product_ids.tolist()
+            horizon_days = job['horizon_days']
+            if not store.mark_running(job_id, len(product_ids)):
+                return  # Cancelled between the queue and the start
+
+            processed, saved, failed_chunks = 0, 0, 0
+            for start in range(0, len(product_ids), self.chunk_size):
+                if store.cancel_requested(job_id):
+                    store.update(job_id, status='cancelled', finished_at=datetime.utcnow().isoformat())
+                    print(f"Forecast job {job_id} cancelled after {processed} product(s)")
+                    return
+
+                chunk = product_ids[start:start + self.chunk_size]
+                chunk_start = time.perf_counter()
+                # Chunks queue with live requests for the same FORECAST_MAX_CONCURRENCY slots
+                predictions = call_in_forecast_executor(
+                    forecaster.forecast_products, chunk, horizon_days, state=state
+                )
+
+                if predictions:
+                    save_result = self.save_chunk(predictions, horizon_days, model_version=model_version, state=state)
+                    if save_result.get('success'):
+                        saved += save_result['records_saved']
+                    else:
+                        failed_chunks += 1
+
+                processed += len(chunk)
+                store.update(job_id, processed_products=processed, records_saved=saved, failed_chunks=failed_chunks)
+                print(
+                    f"Forecast job {job_id}: {processed}/{len(product_ids)} products "
+                    f"(chunk took {time.perf_counter() - chunk_start:.2f}s)"
+                )
+
+            store.update(job_id, status='completed', finished_at=datetime.utcnow().isoformat())
+
+        except Exception as e:
+            print(f"Forecast job {job_id} failed: {e}")
+            store.update(job_id, status='failed', error=str(e), finished_at=datetime.utcnow().isoformat())
+            return
+
+        if self.on_complete is not None:
+            try:
+                self.on_complete(store.get(job_id))
+            except Exception as e:
+                print(f"Forecast job {job_id}: completion hook failed: {e}")
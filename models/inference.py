@@ -0,0 +1,65 @@
+import numpy as np
+from typing import List, Optional
+
+# Float64 keeps inputs bit-identical to what the sklearn wrapper fed the booster
+# from a DataFrame; float32 halves buffer size but can move values across split thresholds.
+DEFAULT_FEATURE_DTYPE = np.float64
+
+
+class NativePredictor:
+    """
+    Calls the underlying LightGBM booster directly on contiguous NumPy arrays.
+
+    Feature layout is checked once against the model at construction, so the
+    per-call path is just buffer filling and Booster.predict. A name mismatch is an
+    error unless strict_feature_names is off, as for the legacy pickle.
+    """
+    def __init__(
+        self, model, feature_columns: List[str], dtype=DEFAULT_FEATURE_DTYPE, strict_feature_names: bool = True
+    ):
+        self.model = model
+        self.booster = model.booster_ if hasattr(model, 'booster_') else model
+        self.feature_columns = list(feature_columns)
+        self.column_index = {name: i for i, name in enumerate(self.feature_columns)}
+        self.dtype = np.dtype(dtype)
+        self.strict_feature_names = strict_feature_names
+        self.num_threads: Optional[int] = None  # None lets LightGBM use its default thread count
+
+        if self.dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+            raise ValueError(f"Unsupported feature dtype: {self.dtype}")
+
+        self._validate_feature_layout()
+
+    def _validate_feature_layout(self):
+        """Checks the feature count and compares names with those stored in the model."""
+        model_features = self.booster.feature_name()
+
+        if len(model_features) != len(self.feature_columns):
+            raise RuntimeError(
+                f"Model expects {len(model_features)} features but {len(self.feature_columns)} are configured."
+            )
+
+        # Booster names replace spaces with underscores; generic Column_N names carry no order info
+        normalized = [name.replace(' ', '_') for name in self.feature_columns]
+        if all(name.startswith('Column_') for name in model_features) or normalized == model_features:
+            return
+        if self.strict_feature_names:
+            raise RuntimeError(
+                f"Model feature names {model_features} do not match the configured features {normalized}."
+            )
+        print(
+            " Warning: configured feature order differs from the model's stored feature names. "
+            "Features are passed by position."
+        )
+        print(f"   Model:      {model_features}")
+        print(f"   Configured: {normalized}")
+
+    def new_buffer(self, n_rows: int) -> np.ndarray:
+        """Preallocated C-contiguous feature matrix in the configured column order."""
+        return np.zeros((n_rows, len(self.feature_columns)), dtype=self.dtype)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Raw booster prediction for a feature matrix built with new_buffer."""
+        if self.num_threads is not None:
+            return self.booster.predict(X, num_threads=self.num_threads)
+        return self.booster.predict(X)
@@ -0,0 +1,72 @@
+import json
+import os
+import joblib
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+# Optional interval assets, looked up next to best_lgb_model.pkl
+QUANTILE_MODEL_PATHS = {
+    'lower': "lgb_quantile_lower.pkl",
+    'upper': "lgb_quantile_upper.pkl",
+}
+CONFORMAL_OFFSETS_PATH = "conformal_offsets.json"
+
+
+class ConformalOffsets:
+    """
+    Residual-based interval: point - lower[h] .. point + upper[h] for horizon day h.
+
+    The JSON file holds {"lower": ..., "upper": ...}, each a single offset or a list
+    with one offset per horizon day (the last one is reused for longer horizons).
+    """
+    def __init__(self, lower, upper):
+        self.lower = np.atleast_1d(np.asarray(lower, dtype=np.float64))
+        self.upper = np.atleast_1d(np.asarray(upper, dtype=np.float64))
+
+    @classmethod
+    def load(cls, path: str) -> 'ConformalOffsets':
+        with open(path) as f:
+            offsets = json.load(f)
+        return cls(offsets['lower'], offsets['upper'])
+
+    @staticmethod
+    def _per_day(offsets: np.ndarray, horizon_days: int) -> np.ndarray:
+        return offsets[np.minimum(np.arange(horizon_days), len(offsets) - 1)]
+
+    def bounds(self, predictions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper bounds for an (n_products, horizon_days) prediction matrix."""
+        horizon_days = predictions.shape[1]
+        return (
+            predictions - self._per_day(self.lower, horizon_days),
+            predictions + self._per_day(self.upper, horizon_days),
+        )
+
+
+def load_interval_assets() -> Tuple[Dict[str, Any], Optional[ConformalOffsets]]:
+    """
+    Loads the quantile boosters (both bounds are required) or, failing that, conformal
+    offsets. Returns ({}, None) when neither is available; intervals are then left empty.
+    """
+    if all(os.path.exists(path) for path in QUANTILE_MODEL_PATHS.values()):
+        quantile_models = {name: joblib.load(path) for name, path in QUANTILE_MODEL_PATHS.items()}
+        print(f" Loaded quantile interval models: {', '.join(QUANTILE_MODEL_PATHS.values())}")
+        return quantile_models, None
+
+    if os.path.exists(CONFORMAL_OFFSETS_PATH):
+        try:
+            conformal = ConformalOffsets.load(CONFORMAL_OFFSETS_PATH)
+            print(f" Loaded conformal interval offsets: {CONFORMAL_OFFSETS_PATH}")
+            return {}, conformal
+        except Exception as e:
+            print(f" Warning: could not load conformal offsets: {e}")
+
+    return {}, None
+
+
+def order_bounds(
+    predictions: np.ndarray, lower: np.ndarray, upper: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Clips bounds at zero and makes sure lower <= point <= upper (quantile models can cross)."""
+    lower = np.maximum(np.minimum(lower, predictions), 0.0)
+    upper = np.maximum(upper, predictions)
+    return lower, upper
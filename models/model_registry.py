@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+import joblib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import MODEL_REGISTRY_DIR
+from .batch_engine import FEATURE_COLUMNS, OPTIONAL_FEATURES
+from .intervals import ConformalOffsets
+
+MANIFEST_FILE = "manifest.json"
+
+# Version reported when the model is loaded from the legacy root paths instead of the registry
+DEFAULT_MODEL_VERSION = 'LightGBM_V3_Optimized'
+
+
+class LoadedModel:
+    """A model version with its encoders, feature list and optional interval assets, ready to serve."""
+    __slots__ = ('version', 'model', 'le_product', 'le_category', 'feature_columns', 'quantile_models', 'conformal_offsets')
+
+    def __init__(
+        self,
+        version: str,
+        model,
+        le_product,
+        le_category,
+        feature_columns: Optional[List[str]] = None,
+        quantile_models: Optional[Dict[str, Any]] = None,
+        conformal_offsets: Optional[ConformalOffsets] = None
+    ):
+        self.version = version
+        self.model = model
+        self.le_product = le_product
+        self.le_category = le_category
+        self.feature_columns = feature_columns
+        self.quantile_models = quantile_models or {}
+        self.conformal_offsets = conformal_offsets
+
+
+class ModelRegistry:
+    """
+    Directory of model versions described by manifest.json:
+
+        {
+          "active": "v4",
+          "versions": {
+            "v4": {
+              "model": "v4/best_lgb_model.pkl",
+              "le_product": "v4/le_product.pkl",
+              "le_category": "v4/le_category.pkl",
+              "feature_columns": ["Price", "Inventory Level", ...],
+              "quantile_models": {"lower": "v4/lower.pkl", "upper": "v4/upper.pkl"},
+              "conformal_offsets": "v4/conformal_offsets.json"
+            }
+          }
+        }
+
+    Paths are relative to the directory; encoders and interval assets are optional.
+    feature_columns must include the engine's FEATURE_COLUMNS and may add only OPTIONAL_FEATURES.
+    The manifest is re-read on every call, so pushed versions are visible without a restart.
+    """
+    def __init__(self, directory: str = MODEL_REGISTRY_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def available(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        manifest.setdefault('versions', {})
+        return manifest
+
+    def active_version(self) -> Optional[str]:
+        return self.read_manifest().get('active') if self.available() else None
+
+    def versions(self) -> List[Dict[str, Any]]:
+        """Registered versions with their feature lists, and which one is marked active."""
+        if not self.available():
+            return []
+        manifest = self.read_manifest()
+        return [
+            {
+                'version': version,
+                'active': version == manifest.get('active'),
+                'feature_columns': spec.get('feature_columns'),
+                'has_quantile_models': bool(spec.get('quantile_models')),
+                'has_conformal_offsets': bool(spec.get('conformal_offsets')),
+            }
+            for version, spec in manifest['versions'].items()
+        ]
+
+    def spec(self, version: str) -> Dict[str, Any]:
+        if not self.available():
+            raise ValueError(f"No model registry manifest at {self.manifest_path}.")
+        spec = self.read_manifest()['versions'].get(version)
+        if spec is None:
+            raise ValueError(f"Model version '{version}' is not in the registry manifest.")
+        return spec
+
+    def _path(self, relative_path: str) -> str:
+        return os.path.join(self.directory, relative_path)
+
+    def load(self, version: str) -> LoadedModel:
+        """Loads a version's files; raises ValueError if its feature list is unusable."""
+        spec = self.spec(version)
+
+        feature_columns = spec.get('feature_columns')
+        if not feature_columns:
+            raise ValueError(f"Model version '{version}' has no feature_columns in the manifest.")
+        missing = [name for name in FEATURE_COLUMNS if name not in feature_columns]
+        if missing:
+            raise ValueError(f"Model version '{version}' is missing required features: {', '.join(missing)}")
+        unsupported = [name for name in feature_columns if name not in FEATURE_COLUMNS + OPTIONAL_FEATURES]
+        if unsupported:
+            raise ValueError(
+                f"Model version '{version}' uses features the forecasting engine does not fill: {', '.join(unsupported)}"
+            )
+        if len(set(feature_columns)) != len(feature_columns):
+            raise ValueError(f"Model version '{version}' lists a feature more than once.")
+
+        quantile_models = {
+            name: joblib.load(self._path(path)) for name, path in (spec.get('quantile_models') or {}).items()
+        }
+        if quantile_models and set(quantile_models) != {'lower', 'upper'}:
+            raise ValueError(f"Model version '{version}' must provide both 'lower' and 'upper' quantile models.")
+        conformal = (
+            ConformalOffsets.load(self._path(spec['conformal_offsets']))
+            if spec.get('conformal_offsets') and not quantile_models else None
+        )
+
+        loaded = LoadedModel(
+            version=version,
+            model=joblib.load(self._path(spec['model'])),
+            le_product=joblib.load(self._path(spec['le_product'])) if spec.get('le_product') else None,
+            le_category=joblib.load(self._path(spec['le_category'])) if spec.get('le_category') else None,
+            feature_columns=list(feature_columns),
+            quantile_models=quantile_models,
+            conformal_offsets=conformal
+        )
+        print(f" Loaded model version '{version}' from {self.directory}")
+        return loaded
+
+    def set_active(self, version: str):
+        """Marks a version active so restarts keep serving it; the manifest is replaced atomically."""
+        with self._lock:
+            manifest = self.read_manifest()
+            if version not in manifest['versions']:
+                raise ValueError(f"Model version '{version}' is not in the registry manifest.")
+            manifest['active'] = version
+
+            tmp_path = self.manifest_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+
+class BackgroundSwap:
+    """
+    Runs one model activation at a time on a background thread and keeps its status
+    (idle, loading, active or failed) for polling.
+    """
+    def __init__(self, activate: Callable[[str], Dict[str, Any]]):
+        self._activate = activate
+        self._lock = threading.Lock()
+        self._status: Dict[str, Any] = {'status': 'idle'}
+
+    def start(self, version: str) -> Dict[str, Any]:
+        """Starts activating `version`; raises RuntimeError if another swap is still loading."""
+        with self._lock:
+            if self._status['status'] == 'loading':
+                raise RuntimeError(f"Model version '{self._status['version']}' is still loading.")
+            self._status = {'status': 'loading', 'version': version, 'started_at': datetime.utcnow().isoformat()}
+            status = dict(self._status)
+
+        threading.Thread(target=self._run, args=(version,), name='model-swap', daemon=True).start()
+        return status
+
+    def _run(self, version: str):
+        start = time.perf_counter()
+        try:
+            result = self._activate(version)
+            update = {'status': 'active', 'result': result}
+        except Exception as e:
+            print(f"Model swap to '{version}' failed: {e}")
+            update = {'status': 'failed', 'error': str(e)}
+
+        with self._lock:
+            self._status.update(update)
+            self._status['finished_at'] = datetime.utcnow().isoformat()
+            self._status['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._status)
@@ -0,0 +1,270 @@
+import contextlib
+import io
+import multiprocessing
+import threading
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import FORECAST_BATCH_WORKERS, FORECAST_BATCH_MIN_SHARD_SIZE, FORECAST_BATCH_TIMEOUT_SECONDS
+from .context_layout import CONTEXT_DTYPES
+
+# Forecaster rebuilt in each worker by the pool initializer, over views of the shared blocks
+_WORKER_FORECASTER = None
+_WORKER_STATE = None
+_WORKER_BLOCKS: List[shared_memory.SharedMemory] = []
+
+# The live pool; replaced when the model or the context state it was built for changes
+_POOL: Optional['ShardPool'] = None
+_POOL_LOCK = threading.Lock()
+
+
+def pool_context():
+    """
+    Start method for shard pools. Workers never fork the serving process, which may hold
+    locks taken by other threads and LightGBM's OpenMP runtime; forkserver forks them from
+    a clean single-threaded server that only has the forecasting modules imported.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['models.prediction_model', 'lightgbm', 'sklearn.preprocessing'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _model_assets(forecaster) -> Dict[str, Any]:
+    """What a worker needs to rebuild the forecaster's model (pickled once per worker, per pool)."""
+    return {
+        'model': forecaster.model,
+        'le_product': forecaster.le_product,
+        'le_category': forecaster.le_category,
+        'quantile_models': {name: predictor.model for name, predictor in forecaster.quantile_predictors.items()},
+        'conformal_offsets': forecaster.conformal_offsets,
+        'model_version': forecaster.model_version,
+        'feature_columns': forecaster.feature_columns,
+    }
+
+
+def share_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[List[Dict[str, Any]], List[shared_memory.SharedMemory]]:
+    """
+    Copies 1-D arrays into shared memory blocks.
+    Returns the manifest workers attach with and the blocks, which the caller must release.
+    """
+    manifest, blocks = [], []
+    try:
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+            manifest.append({'name': name, 'block': block.name, 'dtype': values.dtype.str, 'length': len(values)})
+    except BaseException:
+        release_blocks(blocks)
+        raise
+    return manifest, blocks
+
+
+def release_blocks(blocks: List[shared_memory.SharedMemory]):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def attach_arrays(manifest: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], List[shared_memory.SharedMemory]]:
+    """Zero-copy views of shared arrays; the returned blocks must stay open while the views are used."""
+    arrays, blocks = {}, []
+    for entry in manifest:
+        block = shared_memory.SharedMemory(name=entry['block'])
+        blocks.append(block)
+        arrays[entry['name']] = np.ndarray(entry['length'], dtype=entry['dtype'], buffer=block.buf)
+    return arrays, blocks
+
+
+def _state_arrays(state) -> Dict[str, np.ndarray]:
+    """The context columns inference reads and the index arrays over them, keyed for share_arrays."""
+    frame = state.index.frame
+    arrays = {f'column:{column}': frame[column].to_numpy() for column in CONTEXT_DTYPES if column in frame}
+    arrays.update({
+        'index:offsets': state.index.offsets,
+        'index:window_offsets': state.index.window_offsets,
+        'index:sales': state.index.sales,
+    })
+    return arrays
+
+
+def _init_shard_worker(assets: Dict[str, Any], manifest: List[Dict[str, Any]], layout: Dict[str, Any]):
+    global _WORKER_FORECASTER, _WORKER_STATE, _WORKER_BLOCKS
+    from .prediction_model import ForecastingManager, ForecastState
+    from .product_index import ProductIndex
+
+    # The context and its index are views of the parent's blocks, open for the worker's lifetime
+    arrays, _WORKER_BLOCKS = attach_arrays(manifest)
+    frame = pd.DataFrame(
+        {name.split(':', 1)[1]: values for name, values in arrays.items() if name.startswith('column:')}, copy=False
+    )
+    index = ProductIndex.from_arrays(
+        frame, layout['product_ids'], arrays['index:offsets'], arrays['index:window_offsets'],
+        arrays['index:sales'], layout['window_start']
+    )
+
+    # Same version and anchor as the parent, so cache keys and forecast dates match
+    _WORKER_STATE = ForecastState.from_index(index, version=layout['version'], latest_date=layout['latest_date'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        _WORKER_FORECASTER = ForecastingManager(historical_df=None, state=_WORKER_STATE, **assets)
+
+    # Each worker is one core's worth of work; LightGBM's own threads would oversubscribe
+    _WORKER_FORECASTER.predictor.num_threads = 1
+    for quantile_predictor in _WORKER_FORECASTER.quantile_predictors.values():
+        quantile_predictor.num_threads = 1
+
+
+def _forecast_shard(task):
+    """One shard's rows per product, plus the cache entries it computed for the parent to keep."""
+    product_ids, horizon_days = task
+    grouped = _WORKER_FORECASTER.forecast_products_grouped(product_ids, horizon_days, state=_WORKER_STATE)
+    keys = _WORKER_FORECASTER.cache_keys(product_ids, _WORKER_STATE)
+    entries = _WORKER_FORECASTER.cache.entries(keys)
+    # The parent keeps the entries; the worker's cache is only scratch space for one task
+    _WORKER_FORECASTER.cache.clear()
+    return grouped, entries
+
+
+class ShardPool:
+    """
+    Worker processes bound to one model and one context state. The context columns and
+    index arrays live in shared memory blocks for the pool's lifetime; workers view them
+    without copying. A pool is retired when the model or state changes, and closed once
+    the last batch still using it finishes.
+    """
+    def __init__(self, forecaster, state, workers: int):
+        self.model = forecaster.model
+        self.model_version = forecaster.model_version
+        self.state = state
+        self.workers = workers
+        self.users = 0
+        self.retired = False
+
+        self.manifest, self.blocks = share_arrays(_state_arrays(state))
+        layout = {
+            'product_ids': state.index.product_ids,
+            'window_start': state.index.window_start,
+            'version': state.version,
+            'latest_date': state.latest_date,
+        }
+        try:
+            self.pool = pool_context().Pool(
+                workers, initializer=_init_shard_worker, initargs=(_model_assets(forecaster), self.manifest, layout)
+            )
+        except BaseException:
+            release_blocks(self.blocks)
+            raise
+
+    def serves(self, forecaster, state, workers: int) -> bool:
+        return (
+            not self.retired and self.model is forecaster.model and self.model_version == forecaster.model_version
+            and self.state is state and self.workers == workers
+        )
+
+    def retire(self):
+        """No new batches; closes now if idle, otherwise when the last user releases it (lock held)."""
+        self.retired = True
+        if self.users == 0:
+            self.close()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        release_blocks(self.blocks)
+        self.blocks = []
+
+
+def _acquire_pool(forecaster, state, workers: int) -> ShardPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or not _POOL.serves(forecaster, state, workers):
+            if _POOL is not None:
+                _POOL.retire()
+            _POOL = ShardPool(forecaster, state, workers)
+        _POOL.users += 1
+        return _POOL
+
+
+def _release_pool(pool: ShardPool, broken: bool = False):
+    global _POOL
+    with _POOL_LOCK:
+        pool.users -= 1
+        if broken:
+            # A timed-out worker may never return; kill the pool now rather than reuse it
+            if _POOL is pool:
+                _POOL = None
+            pool.retired = True
+            pool.close()
+        elif pool.retired and pool.users == 0:
+            pool.close()
+
+
+def shutdown_shard_pool():
+    """Retires the live pool (e.g. after a context swap or at shutdown); the next batch builds a new one."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.retire()
+            _POOL = None
+
+
+def shard_product_ids(product_ids: List[Any], n_shards: int) -> List[List[Any]]:
+    """Splits product IDs into contiguous, near-equal shards, preserving their order."""
+    return [shard.tolist() for shard in np.array_split(np.asarray(product_ids, dtype=object), n_shards) if len(shard)]
+
+
+def forecast_sharded(
+    forecaster,
+    state,
+    product_ids: List[Any],
+    horizon_days: int,
+    workers: int = FORECAST_BATCH_WORKERS,
+    min_shard_size: int = FORECAST_BATCH_MIN_SHARD_SIZE,
+    timeout: float = FORECAST_BATCH_TIMEOUT_SECONDS
+) -> List[Dict[str, Any]]:
+    """
+    Forecasts `product_ids` in the shard pool, one contiguous shard per task.
+
+    Products whose full horizon is already cached are served in-process. The pool is
+    kept across batches and rebuilt only when the model or context state changes.
+    Workers' cache entries are merged into the forecaster's cache, and the rows are
+    returned in `product_ids` order, which gives exactly the output of the in-process
+    batch. Raises TimeoutError (after terminating the pool) when the shards take longer
+    than `timeout` seconds.
+    """
+    cached = forecaster.cache.covers(forecaster.cache_keys(product_ids, state), horizon_days)
+    uncached_ids = [product_id for product_id, is_cached in zip(product_ids, cached) if not is_cached]
+    n_shards = min(workers, len(uncached_ids) // max(min_shard_size, 1))
+    if n_shards < 2:
+        return forecaster.forecast_products(product_ids, horizon_days, state=state)
+
+    tasks = [(shard, horizon_days) for shard in shard_product_ids(uncached_ids, n_shards)]
+    pool = _acquire_pool(forecaster, state, workers)
+    broken = False
+    try:
+        shard_results = pool.pool.map_async(_forecast_shard, tasks, chunksize=1).get(timeout)
+    except multiprocessing.TimeoutError:
+        broken = True
+        raise TimeoutError(f"Sharded batch forecast did not finish within {timeout} seconds.")
+    finally:
+        _release_pool(pool, broken)
+
+    grouped = []
+    for shard_grouped, shard_entries in shard_results:
+        grouped.extend(shard_grouped)
+        forecaster.cache.put_entries(shard_entries)
+    cached_ids = [product_id for product_id, is_cached in zip(product_ids, cached) if is_cached]
+    if cached_ids:
+        grouped.extend(forecaster.forecast_products_grouped(cached_ids, horizon_days, state=state))
+
+    by_product = {product_predictions[0]['product_id']: product_predictions for product_predictions in grouped}
+    return [
+        prediction
+        for product_id in product_ids
+        for prediction in by_product.get(str(product_id), [])
+    ]
@@ -2,15 +2,29 @@ import joblib
 import pandas as pd
 import numpy as np
 import os 
+import time
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import HTTPException, status
 
 # Import your existing Supabase client
 from database.supabase_client import get_supabase
+from database.historical_loader import fetch_historical_data
+from config import CONTEXT_SNAPSHOT_ENABLED, FORECAST_BATCH_WORKERS, MODEL_VALIDATION_SAMPLE_PRODUCTS
+from utils.metrics import timed
 
 # Assuming you place the schemas file in the same 'models' directory
 from .schemas import ForecastRequest
+from .batch_engine import FEATURE_COLUMNS, SalesRingBuffer, stock_category_codes, run_recursive_forecast
+from .inference import NativePredictor
+from .context_snapshot import load_context_snapshot, save_context_snapshot
+from .product_index import ProductIndex, LOOKBACK_DAYS
+from .parallel_batch import forecast_sharded, shutdown_shard_pool
+from .forecast_cache import ForecastCache
+from .context_layout import compact_context, context_memory_report, print_memory_report
+from .intervals import load_interval_assets, order_bounds
+from .model_registry import ModelRegistry, LoadedModel, DEFAULT_MODEL_VERSION
 
 # --- Configuration & Asset Paths ---
 MODEL_PATH = "best_lgb_model.pkl"
@@ -23,51 +37,121 @@ BEST_LGB_MODEL = None
 LE_PRODUCT = None
 LE_CATEGORY = None
 HISTORICAL_CONTEXT_DF = None
+QUANTILE_MODELS = {}
+CONFORMAL_OFFSETS = None
+CONTEXT_MEMORY_REPORT = None
+MODEL_VERSION = DEFAULT_MODEL_VERSION
+MODEL_FEATURE_COLUMNS = None
+MODEL_REGISTRY = ModelRegistry()
+
+# Products per in_() filter when fetching the whole history of products missing from a context
+HISTORY_PRODUCTS_PER_QUERY = 200
 
 # --- Service Class Definition ---
 
+class ForecastState:
+    """
+    The history a forecast runs against: context rows, per-product index and anchor date.
+    Never mutated after construction; a refresh builds a new one and swaps it in.
+    """
+    def __init__(self, historical_df: pd.DataFrame, version: int = 1):
+        self.version = version
+        
+        # Always use today as the forecast anchor, regardless of historical data
+        self.latest_date = pd.Timestamp.today().normalize()
+        self.index = ProductIndex(historical_df, self.latest_date - pd.Timedelta(days=LOOKBACK_DAYS))
+        
+        # Product-sorted context; each product's rows are a contiguous chronological slice
+        self.historical_df = self.index.frame
+
+    @classmethod
+    def from_index(cls, index: ProductIndex, version: int, latest_date: pd.Timestamp) -> 'ForecastState':
+        """A state over an existing index and anchor date (a shard worker mirroring the parent's state)."""
+        state = cls.__new__(cls)
+        state.version = version
+        state.latest_date = latest_date
+        state.index = index
+        state.historical_df = index.frame
+        return state
+
+
 class ForecastingManager:
     """
     Manages dynamic forecasting using the loaded LightGBM model.
     Includes recursive logic for generating future lag and roll features.
     """
-    def __init__(self, model, le_product, le_category, historical_df):
+    def __init__(
+        self, model, le_product, le_category, historical_df, quantile_models=None, conformal_offsets=None,
+        model_version: str = DEFAULT_MODEL_VERSION, feature_columns: Optional[List[str]] = None,
+        state: Optional[ForecastState] = None
+    ):
         self.model = model
         self.le_product = le_product
         self.le_category = le_category
-        self.historical_df = historical_df.copy()
+        self.model_version = model_version
+        # A manager for another model version can share the live state instead of rebuilding it
+        self.state = state if state is not None else ForecastState(historical_df)
+        self.cache = ForecastCache()
         
-        # Feature names must exactly match the training features
+        # Feature names must exactly match the training features (registry versions bring their own list)
         # IMPORTANT: Model expects 18 features (not 19!)
         # Removed 'Discount' to match training data
-        self.feature_columns = [
-            'Price', 'Inventory Level', 'Store ID_encoded', 
-            'Product ID_encoded', 'Category_encoded', 'day_of_week', 'is_weekend', 
-            'month', 'year', 'month_sin', 'month_cos', 'effective_price', 
-            'discount_active', 'stock_category_simple_encoded', 
-            'sales_lag_1', 'sales_lag_7', 'sales_lag_30', 'sales_rolling_mean_30'
-        ]
+        self.feature_columns = list(feature_columns) if feature_columns else list(FEATURE_COLUMNS)
         
-        # Always use today as the forecast anchor, regardless of historical data
-        self.latest_date = pd.Timestamp.today().normalize()
-        max_lookback = 30 
-        self.lookback_df = self.historical_df[
-            self.historical_df['Date'] >= (self.latest_date - pd.Timedelta(days=max_lookback))
-        ].sort_values('Date').reset_index(drop=True)
+        # Validates the feature layout once and predicts straight from NumPy buffers; only the
+        # legacy pickle, which has no feature list of its own, may differ from it by name
+        strict_feature_names = feature_columns is not None
+        self.predictor = NativePredictor(self.model, self.feature_columns, strict_feature_names=strict_feature_names)
         
-        print(f"Forecasting Manager Initialized. Latest historical date: {self.latest_date.strftime('%Y-%m-%d')}")
+        # Optional prediction intervals: quantile boosters share each step's feature matrix
+        self.quantile_predictors = {
+            name: NativePredictor(quantile_model, self.feature_columns, strict_feature_names=strict_feature_names)
+            for name, quantile_model in (quantile_models or {}).items()
+        }
+        self.conformal_offsets = conformal_offsets
+        
+        print(
+            f"Forecasting Manager Initialized. Model version: {self.model_version}. "
+            f"Latest historical date: {self.latest_date.strftime('%Y-%m-%d')}"
+        )
+
+    # Read-only views of the current state, kept for callers that predate ForecastState
+    @property
+    def historical_df(self) -> pd.DataFrame:
+        return self.state.historical_df
+
+    @property
+    def lookback_df(self) -> pd.DataFrame:
+        return self.state.index.window_frame()
+
+    @property
+    def latest_date(self) -> pd.Timestamp:
+        return self.state.latest_date
+
+    def swap_state(self, historical_df: pd.DataFrame) -> ForecastState:
+        """Atomically replaces the history; requests already running keep the state they started with."""
+        self.state = ForecastState(historical_df, version=self.state.version + 1)
+        # Entries are keyed by version, so they can never be hit again; free their memory
+        self.cache.clear()
+        return self.state
 
-    def _get_product_context(self, product_id: str) -> Dict[str, Any]:
+    def share_state(self, state: ForecastState):
+        """Points this manager at another manager's state (e.g. a candidate model following the live one)."""
+        if state is not self.state:
+            self.state = state
+            self.cache.clear()
+
+    def _get_product_context(self, product_id: str, state: Optional[ForecastState] = None) -> Dict[str, Any]:
         """Extracts fixed context for a product."""
+        state = state or self.state
+        
         # Convert product_id to integer for comparison
         try:
             product_id_int = int(product_id)
         except ValueError:
             product_id_int = product_id
             
-        context = self.historical_df[
-            self.historical_df['Product ID'] == product_id_int
-        ].tail(1)
+        context = state.index.rows(product_id_int).tail(1)
         
         if context.empty:
             raise ValueError(f"Product ID '{product_id}' not found in historical data.")
@@ -85,121 +169,638 @@ class ForecastingManager:
             'Category_encoded': last_data['Category_encoded'],
         }
 
-    def _generate_future_features_recursive(self, product_id: str, horizon_days: int) -> List[Dict[str, Any]]:
+    def _generate_future_features_recursive(
+        self, product_id: str, horizon_days: int, state: Optional[ForecastState] = None
+    ) -> List[Dict[str, Any]]:
         """Generates all feature rows recursively, predicting day-by-day."""
-        
-        context = self._get_product_context(product_id)
-        start_date = self.latest_date + pd.Timedelta(days=1)
-        date_range = pd.date_range(start=start_date, periods=horizon_days, freq='D')
-        
-        # Convert product_id for filtering
+        # Convert product_id to integer for comparison
         try:
             product_id_int = int(product_id)
         except ValueError:
             product_id_int = product_id
-            
-        # Start with historical sales for initial lags/rolls
-        sales_history = self.lookback_df[self.lookback_df['Product ID'] == product_id_int]['Units Sold'].tolist()
-        
-        daily_predictions = []
-        
-        for date in date_range:
-            # --- 1. Calculate Time and Static Features for the day ---
-            future_data = {
-                'Store ID_encoded': context['Store ID_encoded'],
-                'Product ID_encoded': context['Product ID_encoded'],
-                'Category_encoded': context['Category_encoded'],
-                
-                # Assume static inputs for the forecast period
-                'Price': context['Price'],
-                'Discount': context['Discount'],
-                'Inventory Level': context['Inventory Level'],
-                
-                # Temporal/Cyclical Features
-                'day_of_week': date.dayofweek,
-                'month': date.month,
-                'year': date.year,
-                'is_weekend': int(date.dayofweek >= 5),
-                'month_sin': np.sin(2 * np.pi * date.month / 12),
-                'month_cos': np.cos(2 * np.pi * date.month / 12),
-            }
-            
-            # --- 2. Calculate Derived Features ---
-            future_data['effective_price'] = future_data['Price'] * (1 - future_data['Discount'] / 100)
-            future_data['discount_active'] = int(future_data['Discount'] > 0)
-            
-            # Simplified Stock Category
-            stock_cat = pd.cut(
-                [future_data['Inventory Level']],
-                bins=[0, 50, 200, np.inf], 
-                labels=['critical_low', 'medium', 'high'],
-                right=False, include_lowest=True
-            ).astype(str)[0]
-            
-            known_stock_classes = ['critical_low', 'medium', 'high']
-            future_data['stock_category_simple_encoded'] = known_stock_classes.index(stock_cat)
+        
+        # One state for the whole request, even if a refresh swaps it meanwhile
+        state = state or self.state
+        
+        # Raises if the product has no history
+        self._get_product_context(product_id, state)
+        
+        return self._forecast_recursive_batch([product_id_int], horizon_days, skip_invalid=False, state=state)
 
-            # --- 3. Calculate Dynamic Lag and Rolling Features ---
-            last_known_sale = sales_history[-1] if sales_history else 0
-            
-            future_data['sales_lag_1'] = sales_history[-1] if len(sales_history) >= 1 else last_known_sale
-            future_data['sales_lag_7'] = sales_history[-7] if len(sales_history) >= 7 else last_known_sale
-            future_data['sales_lag_30'] = sales_history[-30] if len(sales_history) >= 30 else last_known_sale
-            
-            roll_window = sales_history[-30:]
-            future_data['sales_rolling_mean_30'] = np.mean(roll_window) if roll_window else last_known_sale
-            
-            # --- 4. Predict ---
-            X_input_df = pd.DataFrame([future_data])[self.feature_columns]
-            
-            pred_units = self.model.predict(X_input_df)[0]
-            pred_units = max(0, pred_units)
+    def _forecast_recursive_batch(
+        self,
+        product_ids: List[Any],
+        horizon_days: int,
+        skip_invalid: bool = True,
+        state: Optional[ForecastState] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Forecasts many products at once, advancing all of them one day per step.
+        Products that cannot be encoded are skipped, or raise when skip_invalid is False.
+        """
+        grouped = self._forecast_recursive_grouped(product_ids, horizon_days, skip_invalid, state)
+        return [prediction for product_predictions in grouped for prediction in product_predictions]
+
+    def _forecast_recursive_arrays(
+        self,
+        product_ids: List[Any],
+        horizon_days: int,
+        skip_invalid: bool = True,
+        state: Optional[ForecastState] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Forecast arrays of the products that can be forecast: their index positions, context
+        arrays, start date, (n_products, horizon_days) predictions and rounded lower/upper
+        bounds (None without interval assets). None when no product can be forecast.
+        """
+        state = state or self.state
+        
+        positions = state.index.positions(product_ids)
+        for product_id in np.asarray(product_ids, dtype=object)[positions < 0]:
+            if not skip_invalid:
+                raise ValueError(f"Product ID '{product_id}' not found in historical data.")
+            print(f"Skipping product {product_id}: not found in historical data")
+        positions = positions[positions >= 0]
+        
+        # Fixed context is the last known row of each product
+        contexts = state.index.last_rows(positions)
+        
+        # Products whose inventory has no stock category cannot be encoded
+        stock_codes = stock_category_codes(contexts['Inventory Level'].to_numpy(dtype=np.float64))
+        for product_id in contexts['Product ID'][stock_codes < 0]:
+            if not skip_invalid:
+                raise ValueError(f"Product ID '{product_id}' has no valid stock category for its Inventory Level.")
+            print(f"Skipping product {product_id}: Inventory Level has no stock category")
+        contexts = contexts[stock_codes >= 0]
+        positions = positions[stock_codes >= 0]
+        
+        if contexts.empty:
+            return None
+        
+        context_arrays = {
+            column: contexts[column].to_numpy(dtype=np.float64)
+            for column in ['Price', 'Inventory Level', 'Store ID_encoded', 'Product ID_encoded', 'Category_encoded']
+        }
+        context_arrays['Discount'] = (
+            contexts['Discount'].to_numpy(dtype=np.float64)
+            if 'Discount' in contexts else np.zeros(len(contexts))
+        )
+        
+        start_date = state.latest_date + pd.Timedelta(days=1)
+        predictions, quantiles = self._predict_with_cache(state, positions, context_arrays, start_date, horizon_days)
+        lower, upper = self._interval_bounds(predictions, quantiles)
+        
+        return {
+            'positions': positions,
+            'context_arrays': context_arrays,
+            'start_date': start_date,
+            'predictions': predictions,
+            'lower': lower,
+            'upper': upper,
+        }
+
+    def _forecast_recursive_grouped(
+        self,
+        product_ids: List[Any],
+        horizon_days: int,
+        skip_invalid: bool = True,
+        state: Optional[ForecastState] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Like _forecast_recursive_batch, with one list of daily predictions per product."""
+        state = state or self.state
+        
+        forecast = self._forecast_recursive_arrays(product_ids, horizon_days, skip_invalid, state)
+        if forecast is None:
+            return []
+        positions, context_arrays, start_date = forecast['positions'], forecast['context_arrays'], forecast['start_date']
+        predictions, lower, upper = forecast['predictions'], forecast['lower'], forecast['upper']
+        
+        date_strings = pd.date_range(start=start_date, periods=horizon_days, freq='D').strftime("%Y-%m-%d").tolist()
+        prices = context_arrays['Price'].tolist()
+        no_bounds = [None] * horizon_days
+        lower_rows = lower.tolist() if lower is not None else [no_bounds] * len(positions)
+        upper_rows = upper.tolist() if upper is not None else [no_bounds] * len(positions)
+        
+        grouped_predictions = []
+        for product_id, price, product_preds, product_lower, product_upper in zip(
+            state.index.product_ids[positions], prices, predictions.tolist(), lower_rows, upper_rows
+        ):
+            product_id_str = str(product_id)
+            grouped_predictions.append([
+                {
+                    "date": date_str,
+                    "product_id": product_id_str,
+                    "predicted_quantity": int(round(pred_units)),
+                    "predicted_revenue": round(pred_units * price, 2),
+                    "confidence_lower": pred_lower,
+                    "confidence_upper": pred_upper,
+                }
+                for date_str, pred_units, pred_lower, pred_upper in zip(
+                    date_strings, product_preds, product_lower, product_upper
+                )
+            ])
+        
+        return grouped_predictions
+
+    def cache_keys(self, product_ids, state: ForecastState) -> List[Tuple[Any, pd.Timestamp, int]]:
+        """Forecast cache keys: an entry is only valid for the exact history it was computed from."""
+        return [(product_id, state.latest_date, state.version) for product_id in product_ids]
+
+    def _predict_with_cache(
+        self,
+        state: ForecastState,
+        positions: np.ndarray,
+        context_arrays: Dict[str, np.ndarray],
+        start_date: pd.Timestamp,
+        horizon_days: int
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        (n_products, horizon_days) predictions and quantile predictions, reusing cached
+        horizon prefixes. Products are grouped by how many days are already cached; each
+        group continues from its cached sales window in one vectorized run and the longer
+        result is cached.
+        """
+        keys = self.cache_keys(state.index.product_ids[positions], state)
+        entries = self.cache.get_many(keys, horizon_days)
+        cached_days = np.array([0 if entry is None else min(len(entry.predictions), horizon_days) for entry in entries])
+        
+        predictions = np.zeros((len(positions), horizon_days), dtype=np.float64)
+        quantiles = {name: np.zeros_like(predictions) for name in self.quantile_predictors}
+        for row in np.flatnonzero(cached_days == horizon_days):
+            predictions[row] = entries[row].predictions[:horizon_days]
+            for name in quantiles:
+                quantiles[name][row] = entries[row].quantiles[name][:horizon_days]
+        
+        for days in np.unique(cached_days[cached_days < horizon_days]):
+            rows = np.flatnonzero(cached_days == days)
             
-            # --- 5. Update History and Results ---
-            sales_history.append(pred_units)
+            if days == 0:
+                # Seed the ring buffer with the lookback window of every product
+                ring_rows, ring_sales = state.index.window_sales(positions[rows])
+                ring = SalesRingBuffer.from_grouped_sales(ring_rows, ring_sales, len(rows))
+            else:
+                ring = SalesRingBuffer.from_windows(
+                    np.stack([entries[row].window for row in rows]),
+                    np.array([entries[row].count for row in rows])
+                )
+                predictions[rows, :days] = np.stack([entries[row].predictions[:days] for row in rows])
+                for name in quantiles:
+                    quantiles[name][rows, :days] = np.stack([entries[row].quantiles[name][:days] for row in rows])
             
-            daily_predictions.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "product_id": str(product_id),  # String for API response
-                "predicted_quantity": int(round(pred_units)),  # Integer for inventory
-                "predicted_revenue": round(pred_units * future_data['Price'], 2),
-                "confidence_lower": None, 
-                "confidence_upper": None,
-            })
+            group_context = {column: values[rows] for column, values in context_arrays.items()}
+            group_predictions, group_quantiles = run_recursive_forecast(
+                self.predictor, group_context, ring, start_date + pd.Timedelta(days=int(days)), horizon_days - days,
+                quantile_predictors=self.quantile_predictors
+            )
+            predictions[rows, days:] = group_predictions
+            for name, values in group_quantiles.items():
+                quantiles[name][rows, days:] = values
             
-        return daily_predictions
+            self.cache.put_many(
+                [keys[row] for row in rows], predictions[rows], ring.windows(), ring.counts,
+                {name: values[rows] for name, values in quantiles.items()}
+            )
+        
+        return predictions, quantiles
+
+    def _interval_bounds(
+        self, predictions: np.ndarray, quantiles: Dict[str, np.ndarray]
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Rounded lower/upper bounds from the quantile models or conformal offsets; (None, None) without either."""
+        if quantiles:
+            lower, upper = quantiles['lower'], quantiles['upper']
+        elif self.conformal_offsets is not None:
+            lower, upper = self.conformal_offsets.bounds(predictions)
+        else:
+            return None, None
+        
+        lower, upper = order_bounds(predictions, lower, upper)
+        return np.rint(lower).astype(np.int64), np.rint(upper).astype(np.int64)
 
-    def forecast_single_product(self, product_id: str, horizon_days: int) -> List[Dict[str, Any]]:
+    def forecast_single_product(
+        self, product_id: str, horizon_days: int, state: Optional[ForecastState] = None
+    ) -> List[Dict[str, Any]]:
         """Public method for single product forecast."""
-        return self._generate_future_features_recursive(product_id, horizon_days)
+        return self._generate_future_features_recursive(product_id, horizon_days, state=state)
 
-    def forecast_batch(self, horizon_days: int) -> List[Dict[str, Any]]:
-        """Public method for batch product forecast."""
-        unique_product_ids = self.historical_df['Product ID'].unique().tolist()
-        all_predictions = []
+    def forecast_batch(
+        self, horizon_days: int, workers: Optional[int] = None, state: Optional[ForecastState] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Public method for batch product forecast.
+        With more than one worker (default FORECAST_BATCH_WORKERS) products are sharded across processes.
+        """
+        state = state or self.state
+        product_ids = state.index.product_ids.tolist()
+        workers = FORECAST_BATCH_WORKERS if workers is None else workers
         
-        for product_id in unique_product_ids:
-            try:
-                predictions = self.forecast_single_product(str(product_id), horizon_days)
-                all_predictions.extend(predictions)
-            except ValueError as e:
-                print(f"Skipping product {product_id}: {e}")
-                continue
-                
-        return all_predictions
+        if workers > 1:
+            return forecast_sharded(self, state, product_ids, horizon_days, workers=workers)
+        return self._forecast_recursive_batch(product_ids, horizon_days, state=state)
+
+    def forecast_products(
+        self, product_ids: List[Any], horizon_days: int, state: Optional[ForecastState] = None
+    ) -> List[Dict[str, Any]]:
+        """Public method for a batch forecast of a subset of products (e.g. one job chunk)."""
+        return self._forecast_recursive_batch(product_ids, horizon_days, state=state)
+
+    def forecast_products_grouped(
+        self, product_ids: List[Any], horizon_days: int, state: Optional[ForecastState] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Public method for a batch forecast of a subset of products, one list of rows per product."""
+        return self._forecast_recursive_grouped(product_ids, horizon_days, state=state)
+
+    def forecast_matrix(
+        self, product_ids: List[Any], horizon_days: int, state: Optional[ForecastState] = None
+    ) -> Dict[str, Any]:
+        """
+        Batch forecast as arrays instead of daily rows: 'product_ids' (as in the context),
+        'positions' in the product index, 'start_date', (n_products, horizon_days) 'predictions'
+        and 'lower'/'upper' bounds (None without interval assets). Products that cannot be
+        forecast are left out. Uses the forecast cache like forecast_batch.
+        """
+        state = state or self.state
+        forecast = self._forecast_recursive_arrays(product_ids, horizon_days, state=state)
+        if forecast is None:
+            empty = np.zeros((0, horizon_days))
+            return {
+                'product_ids': np.array([], dtype=object), 'positions': np.array([], dtype=np.int64),
+                'start_date': state.latest_date + pd.Timedelta(days=1), 'predictions': empty, 'lower': None, 'upper': None,
+            }
+        
+        forecast['product_ids'] = state.index.product_ids[forecast['positions']]
+        del forecast['context_arrays']
+        return forecast
+
+    def forecast_scenarios(
+        self,
+        product_ids: List[Any],
+        scenarios: List[Dict[str, Optional[float]]],
+        horizon_days: int,
+        state: Optional[ForecastState] = None
+    ) -> Dict[str, Any]:
+        """
+        What-if forecasts for every (product, scenario) pair in one vectorized recursive run.
+        
+        Each scenario overrides 'price', 'discount' and/or 'inventory' of the product's last
+        known context (None keeps the observed value). Pairs are extra rows of the same run:
+        every scenario row of a product starts from that product's lookback window. Revenue
+        uses the effective (discounted) price. Results bypass the forecast cache.
+        
+        Returns (n_products, n_scenarios, horizon_days) 'demand' and 'revenue' arrays, NaN
+        for pairs whose inventory has no stock category, with the products that were found
+        and those skipped.
+        """
+        state = state or self.state
+        
+        # API product IDs are strings; the context holds integer IDs
+        product_ids = [int(product_id) if str(product_id).isdigit() else product_id for product_id in product_ids]
+        positions = state.index.positions(product_ids)
+        skipped = [str(product_id) for product_id in np.asarray(product_ids, dtype=object)[positions < 0]]
+        positions = positions[positions >= 0]
+        n_products, n_scenarios = len(positions), len(scenarios)
+        
+        demand = np.full((n_products, n_scenarios, horizon_days), np.nan)
+        revenue = np.full_like(demand, np.nan)
+        result = {
+            'product_ids': [str(product_id) for product_id in state.index.product_ids[positions]],
+            'skipped_products': skipped,
+            'start_date': state.latest_date + pd.Timedelta(days=1),
+            'demand': demand,
+            'revenue': revenue,
+        }
+        if n_products == 0 or n_scenarios == 0:
+            return result
+        
+        # One row per (product, scenario), product-major
+        contexts = state.index.last_rows(positions)
+        context_arrays = {
+            column: np.repeat(contexts[column].to_numpy(dtype=np.float64), n_scenarios)
+            for column in ['Price', 'Discount', 'Inventory Level', 'Store ID_encoded', 'Product ID_encoded', 'Category_encoded']
+        }
+        for key, column in (('price', 'Price'), ('discount', 'Discount'), ('inventory', 'Inventory Level')):
+            overrides = np.array([np.nan if scenario.get(key) is None else scenario[key] for scenario in scenarios], dtype=np.float64)
+            overrides = np.tile(overrides, n_products)
+            context_arrays[column] = np.where(np.isnan(overrides), context_arrays[column], overrides)
+        
+        valid = stock_category_codes(context_arrays['Inventory Level']) >= 0
+        
+        # Every scenario row of a product starts from a copy of its lookback window
+        ring_rows, ring_sales = state.index.window_sales(positions)
+        product_ring = SalesRingBuffer.from_grouped_sales(ring_rows, ring_sales, n_products)
+        ring = SalesRingBuffer.from_windows(
+            np.repeat(product_ring.windows(), n_scenarios, axis=0)[valid],
+            np.repeat(product_ring.counts, n_scenarios)[valid]
+        )
+        
+        predictions, _ = run_recursive_forecast(
+            self.predictor,
+            {column: values[valid] for column, values in context_arrays.items()},
+            ring,
+            result['start_date'],
+            horizon_days
+        )
+        effective_price = context_arrays['Price'] * (1 - context_arrays['Discount'] / 100)
+        
+        demand.reshape(-1, horizon_days)[valid] = predictions
+        revenue.reshape(-1, horizon_days)[valid] = predictions * effective_price[valid, None]
+        return result
 
 
 # --- Initialization Function ---
 
+@timed('supabase_fetch.products')
+def _fetch_products(supabase) -> pd.DataFrame:
+    """Fetches the product details needed to price and categorize history rows."""
+    # ============================================================
+    # FETCH PRODUCT DETAILS (aligned with your schema)
+    # ============================================================
+    # Your products table columns:
+    # - product_id (integer, PK)
+    # - sku (varchar)
+    # - product_name (varchar)
+    # - category_id (integer, FK) ← FK to categories table
+    # - supplier_id (integer, FK)
+    # - unit_price (numeric) ← This is the price column!
+    # - cost_price (numeric)
+    # - reorder_level (integer)
+    # - reorder_quantity (integer)
+    # - unit_of_measure (varchar)
+    # - is_active (boolean)
+    # - created_by (uuid, FK)
+    # - created_at (timestamp)
+    # - updated_at (timestamp)
+    
+    products_response = supabase.table('products').select(
+        'product_id, product_name, category_id, unit_price'
+    ).execute()  # Removed .eq('is_active', True) filter
+    
+    # Debug logging
+    print(f" Products query response: {products_response}")
+    print(f" Products data type: {type(products_response.data)}")
+    print(f" Products data length: {len(products_response.data) if products_response.data else 0}")
+    
+    if not products_response.data:
+        # Try to get more info about why query failed
+        print(" No products returned. Checking table existence...")
+        test_query = supabase.table('products').select('product_id').limit(1).execute()
+        print(f"Test query result: {test_query}")
+        raise RuntimeError("No products found in database. Check if products table has data.")
+    
+    return pd.DataFrame(products_response.data)
+
+
+def _prepare_historical_rows(historical_df: pd.DataFrame, products_df: pd.DataFrame) -> pd.DataFrame:
+    """Renames, prices and filters raw historical_data rows."""
+    # ============================================================
+    # DATA TRANSFORMATION
+    # ============================================================
+    
+    # Rename columns to match expected format
+    historical_df = historical_df.rename(columns={
+        'history_date': 'Date',
+        'product_id': 'Product ID',
+        'units_sold': 'Units Sold',
+        'inventory_start': 'Inventory Level'
+    })
+    
+    # Merge with product details
+    historical_df = historical_df.merge(
+        products_df[['product_id', 'unit_price', 'category_id']], 
+        left_on='Product ID', 
+        right_on='product_id',
+        how='left'
+    )
+    
+    # Add required columns
+    historical_df['Price'] = historical_df['unit_price'].fillna(0)
+    historical_df['Discount'] = 0  # Default discount (you can add discount logic later)
+    historical_df['Category'] = historical_df['category_id'].fillna(1)
+    historical_df['Store ID'] = 1  # Default store ID (single store system)
+    historical_df['Date'] = pd.to_datetime(historical_df['Date'])
+    
+    # Drop rows with missing critical data
+    historical_df = historical_df.dropna(subset=['Product ID', 'Units Sold', 'Date', 'Price'])
+    
+    # Filter out records with zero or negative price
+    return historical_df[historical_df['Price'] > 0]
+
+
+def _encode_categoricals(historical_df: pd.DataFrame, product_classes: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Adds the encoded store, product and category columns.
+    Known `product_classes` (from a snapshot) are reused when they cover every product.
+    """
+    # ============================================================
+    # ENCODE CATEGORICAL VARIABLES
+    # ============================================================
+    from sklearn.preprocessing import LabelEncoder
+    
+    le_store = LabelEncoder()
+    le_product_local = LabelEncoder()
+    
+    product_keys = historical_df['Product ID'].astype(str)
+    
+    historical_df['Store ID_encoded'] = le_store.fit_transform(historical_df['Store ID'].astype(str))
+    if product_classes is not None and product_keys.isin(product_classes).all():
+        le_product_local.classes_ = np.asarray(product_classes)
+        historical_df['Product ID_encoded'] = le_product_local.transform(product_keys)
+    else:
+        historical_df['Product ID_encoded'] = le_product_local.fit_transform(product_keys)
+    
+    # Category is already numeric (category_id), so use it directly (0-indexed)
+    historical_df['Category_encoded'] = historical_df['Category'].astype(int) - 1
+    
+    return historical_df
+
+
+def _build_context_from_supabase(supabase, products_df: pd.DataFrame) -> pd.DataFrame:
+    """Full ETL: fetches every daily history row and prepares the forecasting context."""
+    print(" Fetching historical data from Supabase...")
+    
+    # ============================================================
+    # FETCH HISTORICAL DATA (aligned with your schema)
+    # ============================================================
+    # Your historical_data table columns:
+    # - history_date (date)
+    # - product_id (integer, FK)
+    # - units_sold (integer)
+    # - sales_revenue (numeric)
+    # - inventory_start (integer)
+    # - inventory_end (integer)
+    # - period_type (text: 'daily', 'weekly', 'monthly')
+    # - data_source (text)
+    
+    historical_df, _ = fetch_historical_data(supabase)
+    
+    if historical_df.empty:
+        raise RuntimeError("No historical data found in database.")
+    
+    print(f" Loaded {len(historical_df)} historical records from database")
+    print(f" Loaded {len(products_df)} products from database")
+    
+    historical_df = _prepare_historical_rows(historical_df, products_df)
+    
+    print(f" After filtering: {len(historical_df)} valid records")
+    
+    historical_df = _encode_categoricals(historical_df)
+    
+    context_df = historical_df.sort_values('Date').reset_index(drop=True)
+    compact_df = compact_context(context_df)
+    
+    global CONTEXT_MEMORY_REPORT
+    CONTEXT_MEMORY_REPORT = context_memory_report(context_df, compact_df)
+    print_memory_report(CONTEXT_MEMORY_REPORT)
+    
+    return compact_df
+
+
+def _changed_products(current_rows: pd.DataFrame, new_rows: pd.DataFrame) -> List[Any]:
+    """Products whose sales data differs between two prepared row sets covering the same dates."""
+    keys = ['Date', 'Product ID']
+    compare_columns = ['Units Sold', 'Inventory Level', 'Price']
+    merged = current_rows[keys + compare_columns].merge(
+        new_rows[keys + compare_columns], on=keys, how='outer', suffixes=('_old', '_new'), indicator=True
+    )
+    
+    differs = merged['_merge'] != 'both'
+    for column in compare_columns:
+        old, new = merged[f'{column}_old'], merged[f'{column}_new']
+        differs |= (old != new) & ~(old.isna() & new.isna())
+    
+    return merged.loc[differs, 'Product ID'].unique().tolist()
+
+
+def _apply_product_attributes(context_df: pd.DataFrame, products_df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Any]]:
+    """
+    Re-prices and re-categorizes a whole context from the current products, as a full load
+    would: Price follows products.unit_price (products without a positive price are dropped)
+    and Category follows category_id. Returns the context (the input itself when nothing
+    differs) and the affected product IDs.
+    """
+    attributes = products_df.drop_duplicates('product_id').set_index('product_id')
+    product_ids = context_df['Product ID']
+    price = pd.to_numeric(product_ids.map(attributes['unit_price']), errors='coerce').fillna(0).astype(np.float64)
+    category = pd.to_numeric(product_ids.map(attributes['category_id']), errors='coerce').fillna(1)
+    
+    changed = (price != context_df['Price']) | (category != context_df['Category'])
+    if not changed.any():
+        return context_df, []
+    
+    context_df = context_df.assign(Price=price, Category=category)
+    priced = (price > 0).to_numpy()
+    if priced.all():
+        context_df['Category_encoded'] = context_df['Category'].astype(int) - 1
+        context_df = compact_context(context_df)
+    else:
+        # Dropping products changes the product codes a full load would fit
+        context_df = compact_context(_encode_categoricals(context_df[priced].reset_index(drop=True)))
+    
+    updated_products = product_ids[changed.to_numpy()].unique().tolist()
+    print(f" Re-applied product prices and categories to {len(updated_products)} product(s)")
+    return context_df, updated_products
+
+
+def _apply_history_delta(
+    supabase,
+    products_df: pd.DataFrame,
+    context_df: pd.DataFrame,
+    since_date: str,
+    product_classes: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, List[Any]]:
+    """
+    Brings a context up to date with historical_data rows on or after `since_date`.
+    That day is re-fetched in full since it may have been loaded partially. Prices and
+    categories of every product are re-applied from `products_df` first, so the result
+    matches a full load even for products without new rows.
+    Returns a new context (the input is not modified) and the updated product IDs,
+    which is empty when nothing changed.
+    """
+    context_df, repriced_products = _apply_product_attributes(context_df, products_df)
+    if repriced_products:
+        product_classes = None
+    
+    print(f" Fetching historical data since {since_date}...")
+    
+    new_rows, _ = fetch_historical_data(supabase, since_date=since_date)
+    
+    # Priced products the context lacks (e.g. unpriced at the last full load) get their whole history
+    unit_price = pd.to_numeric(products_df['unit_price'], errors='coerce')
+    absent = np.setdiff1d(
+        products_df.loc[unit_price > 0, 'product_id'].to_numpy(dtype=np.int64),
+        context_df['Product ID'].to_numpy(dtype=np.int64)
+    ).tolist()
+    if absent:
+        absent_rows = [
+            fetch_historical_data(supabase, product_ids=absent[start:start + HISTORY_PRODUCTS_PER_QUERY])[0]
+            for start in range(0, len(absent), HISTORY_PRODUCTS_PER_QUERY)
+        ]
+        new_rows = pd.concat([new_rows[~new_rows['product_id'].isin(absent)]] + absent_rows, ignore_index=True)
+    
+    new_rows = _prepare_historical_rows(new_rows, products_df)
+    
+    if new_rows.empty:
+        return context_df, repriced_products
+    
+    # Encoded columns are placeholders until the merged context is re-encoded below
+    for column in ['Store ID_encoded', 'Product ID_encoded', 'Category_encoded']:
+        new_rows[column] = 0
+    new_rows = compact_context(new_rows)
+    
+    since = pd.Timestamp(since_date)
+    updated_products = _changed_products(context_df[context_df['Date'] >= since], new_rows)
+    
+    # Nothing to do if the re-fetched rows are exactly what the context already holds
+    if not updated_products:
+        return context_df, repriced_products
+    
+    if product_classes is None:
+        product_classes = np.unique(context_df['Product ID'].astype(str)).tolist()
+    
+    # Replace the re-fetched rows of changed products only
+    stale = (context_df['Date'] >= since) & context_df['Product ID'].isin(updated_products)
+    new_rows = new_rows[new_rows['Product ID'].isin(updated_products)]
+    context_df = pd.concat([context_df[~stale], new_rows], ignore_index=True)
+    context_df = context_df.sort_values('Date', kind='stable').reset_index(drop=True)
+    
+    context_df = compact_context(_encode_categoricals(context_df, product_classes=product_classes))
+    
+    print(f" Applied {len(new_rows)} new historical records for {len(updated_products)} product(s)")
+    return context_df, list(dict.fromkeys(repriced_products + updated_products))
+
+
+def load_model_assets(version: Optional[str] = None) -> LoadedModel:
+    """
+    Loads a registry version, by default the one the manifest marks active. Without a
+    registry manifest the model, encoders and interval assets come from the legacy paths.
+    """
+    if version is None and MODEL_REGISTRY.available():
+        version = MODEL_REGISTRY.active_version()
+    if version is not None:
+        return MODEL_REGISTRY.load(version)
+    
+    quantile_models, conformal_offsets = load_interval_assets()
+    return LoadedModel(
+        version=DEFAULT_MODEL_VERSION,
+        model=joblib.load(MODEL_PATH),
+        le_product=joblib.load(ENCODER_PRODUCT_PATH),
+        le_category=joblib.load(ENCODER_CATEGORY_PATH),
+        quantile_models=quantile_models,
+        conformal_offsets=conformal_offsets
+    )
+
+
 def load_prediction_assets():
     """Loads model, encoders, and real historical data from Supabase on server startup."""
-    global BEST_LGB_MODEL, LE_PRODUCT, LE_CATEGORY, HISTORICAL_CONTEXT_DF
+    global BEST_LGB_MODEL, LE_PRODUCT, LE_CATEGORY, HISTORICAL_CONTEXT_DF, CONTEXT_MEMORY_REPORT
+    global QUANTILE_MODELS, CONFORMAL_OFFSETS, MODEL_VERSION, MODEL_FEATURE_COLUMNS
     
     try:
-        # 1. Load Model and Encoders
-        BEST_LGB_MODEL = joblib.load(MODEL_PATH)
-        LE_PRODUCT = joblib.load(ENCODER_PRODUCT_PATH)
-        LE_CATEGORY = joblib.load(ENCODER_CATEGORY_PATH)
+        # 1. Load Model and Encoders (the registry's active version, else the legacy root paths)
+        loaded = load_model_assets()
+        BEST_LGB_MODEL, LE_PRODUCT, LE_CATEGORY = loaded.model, loaded.le_product, loaded.le_category
+        QUANTILE_MODELS, CONFORMAL_OFFSETS = loaded.quantile_models, loaded.conformal_offsets
+        MODEL_VERSION, MODEL_FEATURE_COLUMNS = loaded.version, loaded.feature_columns
         
         # 2. Connect to Supabase
         try:
@@ -208,139 +809,27 @@ def load_prediction_assets():
         except Exception as e:
             raise RuntimeError(f"Failed to connect to Supabase: {e}")
         
-        print(" Fetching historical data from Supabase...")
-        
-        # ============================================================
-        # FETCH HISTORICAL DATA (aligned with your schema)
-        # ============================================================
-        # Your historical_data table columns:
-        # - history_date (date)
-        # - product_id (integer, FK)
-        # - units_sold (integer)
-        # - sales_revenue (numeric)
-        # - inventory_start (integer)
-        # - inventory_end (integer)
-        # - period_type (text: 'daily', 'weekly', 'monthly')
-        # - data_source (text)
-        
-        response = supabase.table('historical_data').select(
-            'history_date, product_id, units_sold, sales_revenue, inventory_start, inventory_end'
-        ).eq('period_type', 'daily').order('history_date').execute()
-        
-        if not response.data:
-            raise RuntimeError("No historical data found in database.")
-        
-        # ============================================================
-        # FETCH PRODUCT DETAILS (aligned with your schema)
-        # ============================================================
-        # Your products table columns:
-        # - product_id (integer, PK)
-        # - sku (varchar)
-        # - product_name (varchar)
-        # - category_id (integer, FK) ← FK to categories table
-        # - supplier_id (integer, FK)
-        # - unit_price (numeric) ← This is the price column!
-        # - cost_price (numeric)
-        # - reorder_level (integer)
-        # - reorder_quantity (integer)
-        # - unit_of_measure (varchar)
-        # - is_active (boolean)
-        # - created_by (uuid, FK)
-        # - created_at (timestamp)
-        # - updated_at (timestamp)
-        
-        products_response = supabase.table('products').select(
-            'product_id, product_name, category_id, unit_price'
-        ).execute()  # Removed .eq('is_active', True) filter
-        
-        # Debug logging
-        print(f" Products query response: {products_response}")
-        print(f" Products data type: {type(products_response.data)}")
-        print(f" Products data length: {len(products_response.data) if products_response.data else 0}")
-        
-        if not products_response.data:
-            # Try to get more info about why query failed
-            print(" No products returned. Checking table existence...")
-            test_query = supabase.table('products').select('product_id').limit(1).execute()
-            print(f"Test query result: {test_query}")
-            raise RuntimeError("No products found in database. Check if products table has data.")
-        
-        products_df = pd.DataFrame(products_response.data)
-        historical_df = pd.DataFrame(response.data)
-        
-        print(f" Loaded {len(historical_df)} historical records from database")
-        print(f" Loaded {len(products_df)} products from database")
-        
-        # ============================================================
-        # DATA TRANSFORMATION
-        # ============================================================
-        
-        # Rename columns to match expected format
-        historical_df = historical_df.rename(columns={
-            'history_date': 'Date',
-            'product_id': 'Product ID',
-            'units_sold': 'Units Sold',
-            'inventory_start': 'Inventory Level'
-        })
-        
-        # Merge with product details
-        historical_df = historical_df.merge(
-            products_df[['product_id', 'unit_price', 'category_id']], 
-            left_on='Product ID', 
-            right_on='product_id',
-            how='left'
-        )
-        
-        # Add required columns
-        historical_df['Price'] = historical_df['unit_price'].fillna(0)
-        historical_df['Discount'] = 0  # Default discount (you can add discount logic later)
-        historical_df['Category'] = historical_df['category_id'].fillna(1)
-        historical_df['Store ID'] = 1  # Default store ID (single store system)
-        historical_df['Date'] = pd.to_datetime(historical_df['Date'])
+        products_df = _fetch_products(supabase)
         
-        # Drop rows with missing critical data
-        historical_df = historical_df.dropna(subset=['Product ID', 'Units Sold', 'Date', 'Price'])
+        # 3. Warm start from the local snapshot when one is available
+        snapshot = load_context_snapshot() if CONTEXT_SNAPSHOT_ENABLED else None
         
-        # Filter out records with zero or negative price
-        historical_df = historical_df[historical_df['Price'] > 0]
-        
-        print(f" After filtering: {len(historical_df)} valid records")
-        
-        # ============================================================
-        # ENCODE CATEGORICAL VARIABLES
-        # ============================================================
-        from sklearn.preprocessing import LabelEncoder
-        
-        le_store = LabelEncoder()
-        le_product_local = LabelEncoder()
-        
-        historical_df['Store ID_encoded'] = le_store.fit_transform(historical_df['Store ID'].astype(str))
-        historical_df['Product ID_encoded'] = le_product_local.fit_transform(historical_df['Product ID'].astype(str))
-        
-        # Category is already numeric (category_id), so use it directly (0-indexed)
-        historical_df['Category_encoded'] = historical_df['Category'].astype(int) - 1
-        
-        HISTORICAL_CONTEXT_DF = historical_df.sort_values('Date').reset_index(drop=True)
-        
-        # ============================================================
-        # CALCULATE LAG AND ROLLING FEATURES
-        # ============================================================
-        print(" Calculating lag and rolling features...")
-        
-        for product_id in HISTORICAL_CONTEXT_DF['Product ID'].unique():
-            product_mask = HISTORICAL_CONTEXT_DF['Product ID'] == product_id
-            product_data = HISTORICAL_CONTEXT_DF[product_mask].copy()
-            
-            # Calculate lags
-            for lag in [1, 7, 30]:
-                HISTORICAL_CONTEXT_DF.loc[product_mask, f'sales_lag_{lag}'] = (
-                    product_data['Units Sold'].shift(lag).fillna(0)
-                )
-            
-            # Calculate rolling mean
-            HISTORICAL_CONTEXT_DF.loc[product_mask, 'sales_rolling_mean_30'] = (
-                product_data['Units Sold'].rolling(30, min_periods=1).mean().shift(1).fillna(0)
+        if snapshot is not None:
+            context_df, manifest = snapshot
+            HISTORICAL_CONTEXT_DF, updated_products = _apply_history_delta(
+                supabase, products_df, context_df, manifest['max_history_date'], manifest.get('product_classes')
             )
+            changed = len(updated_products) > 0
+            
+            # Snapshots are stored in the compact layout already
+            CONTEXT_MEMORY_REPORT = context_memory_report(HISTORICAL_CONTEXT_DF, HISTORICAL_CONTEXT_DF)
+            print_memory_report(CONTEXT_MEMORY_REPORT)
+        else:
+            HISTORICAL_CONTEXT_DF = _build_context_from_supabase(supabase, products_df)
+            changed = True
+        
+        if CONTEXT_SNAPSHOT_ENABLED and changed:
+            save_context_snapshot(HISTORICAL_CONTEXT_DF)
         
         print(f" ML Assets and Context Loaded Successfully.")
         print(f" Date Range: {HISTORICAL_CONTEXT_DF['Date'].min()} to {HISTORICAL_CONTEXT_DF['Date'].max()}")
@@ -358,7 +847,7 @@ FORECASTER = None
 
 def get_forecaster() -> ForecastingManager:
     """Dependency injection function to provide the initialized manager."""
-    global FORECASTER
+    global FORECASTER, HISTORICAL_CONTEXT_DF
     if FORECASTER is None:
         try:
             load_prediction_assets()
@@ -369,8 +858,14 @@ def get_forecaster() -> ForecastingManager:
                 model=BEST_LGB_MODEL, 
                 le_product=LE_PRODUCT, 
                 le_category=LE_CATEGORY, 
-                historical_df=HISTORICAL_CONTEXT_DF
+                historical_df=HISTORICAL_CONTEXT_DF,
+                quantile_models=QUANTILE_MODELS,
+                conformal_offsets=CONFORMAL_OFFSETS,
+                model_version=MODEL_VERSION,
+                feature_columns=MODEL_FEATURE_COLUMNS
             )
+            # Keep a single copy of the context: the manager's product-sorted frame
+            HISTORICAL_CONTEXT_DF = FORECASTER.historical_df
         except RuntimeError as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
@@ -379,17 +874,199 @@ def get_forecaster() -> ForecastingManager:
 
     return FORECASTER
 
+
+def get_product_index() -> ProductIndex:
+    """Per-product index over the current forecasting context, for routes that need history lookups."""
+    return get_forecaster().state.index
+
+
+# --- Incremental Context Refresh ---
+_REFRESH_LOCK = threading.Lock()
+
+def refresh_forecaster_context(since_date: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Pulls historical_data rows newer than the last seen date into the running forecaster.
+    An earlier `since_date` (YYYY-MM-DD) re-reads from that day, picking up backfilled history.
+    Only the changed products' rows are replaced, and the new state
+    is swapped in atomically. Concurrent refreshes are serialized.
+    """
+    global HISTORICAL_CONTEXT_DF
+    
+    with _REFRESH_LOCK:
+        # Resolved under the lock, so a model swap cannot leave the refresh on the old manager
+        forecaster = get_forecaster()
+        refresh_start = time.perf_counter()
+        current = forecaster.state
+        last_date = current.historical_df['Date'].max().strftime('%Y-%m-%d')
+        if since_date is None or since_date > last_date:
+            since_date = last_date
+        
+        supabase = get_supabase()
+        products_df = _fetch_products(supabase)
+        context_df, updated_products = _apply_history_delta(
+            supabase, products_df, current.historical_df, since_date
+        )
+        
+        if updated_products:
+            state = forecaster.swap_state(context_df)
+            HISTORICAL_CONTEXT_DF = state.historical_df
+            # Shard workers view the old state's arrays; the next sharded batch starts a pool on the new one
+            shutdown_shard_pool()
+            if CONTEXT_SNAPSHOT_ENABLED:
+                save_context_snapshot(context_df)
+        else:
+            state = current
+        
+        return {
+            'updated': len(updated_products) > 0,
+            'products_updated': len(updated_products),
+            'rows': len(state.historical_df),
+            'max_history_date': state.historical_df['Date'].max().strftime('%Y-%m-%d'),
+            'context_version': state.version,
+            'duration_ms': round((time.perf_counter() - refresh_start) * 1000, 1),
+        }
+
+# --- Model Registry Swaps ---
+# Horizon used to validate a model version against a sample of live products
+VALIDATION_HORIZON_DAYS = 7
+
+def load_candidate_forecaster(version: str) -> ForecastingManager:
+    """Loads a registry version into a new manager over the live context, without serving it."""
+    loaded = load_model_assets(version)
+    return ForecastingManager(
+        model=loaded.model,
+        le_product=loaded.le_product,
+        le_category=loaded.le_category,
+        historical_df=None,
+        quantile_models=loaded.quantile_models,
+        conformal_offsets=loaded.conformal_offsets,
+        model_version=loaded.version,
+        feature_columns=loaded.feature_columns,
+        state=get_forecaster().state
+    )
+
+
+def validate_forecaster(
+    candidate: ForecastingManager,
+    reference: Optional[ForecastingManager] = None,
+    sample_products: int = MODEL_VALIDATION_SAMPLE_PRODUCTS
+) -> Dict[str, Any]:
+    """
+    Forecasts a sample of products spread over the context with the candidate and checks
+    that every product gets a full horizon of finite, non-negative predictions. Raises
+    ValueError if not. With a reference manager, reports latency and quantity differences.
+    """
+    state = candidate.state
+    n_products = len(state.index)
+    if n_products == 0:
+        raise ValueError("No products in the forecasting context to validate against.")
+
+    sample = state.index.product_ids[
+        np.unique(np.linspace(0, n_products - 1, min(sample_products, n_products)).astype(np.int64))
+    ].tolist()
+
+    start = time.perf_counter()
+    grouped = candidate.forecast_products_grouped(sample, VALIDATION_HORIZON_DAYS, state=state)
+    candidate_ms = (time.perf_counter() - start) * 1000
+
+    predictions = [prediction for product_predictions in grouped for prediction in product_predictions]
+    if not predictions:
+        raise ValueError(f"Model version '{candidate.model_version}' produced no forecasts for the validation sample.")
+    if any(len(product_predictions) != VALIDATION_HORIZON_DAYS for product_predictions in grouped):
+        raise ValueError(f"Model version '{candidate.model_version}' returned an incomplete horizon.")
+    revenue = np.array([prediction['predicted_revenue'] for prediction in predictions], dtype=np.float64)
+    quantity = np.array([prediction['predicted_quantity'] for prediction in predictions], dtype=np.float64)
+    if not (np.isfinite(revenue).all() and (quantity >= 0).all()):
+        raise ValueError(f"Model version '{candidate.model_version}' produced invalid predictions.")
+
+    report = {
+        'version': candidate.model_version,
+        'sample_products': len(grouped),
+        'horizon_days': VALIDATION_HORIZON_DAYS,
+        'candidate_ms': round(candidate_ms, 1),
+    }
+
+    if reference is not None:
+        start = time.perf_counter()
+        reference_predictions = reference.forecast_products(sample, VALIDATION_HORIZON_DAYS, state=state)
+        report['reference_version'] = reference.model_version
+        report['reference_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        reference_quantity = {(p['product_id'], p['date']): p['predicted_quantity'] for p in reference_predictions}
+        differences = [
+            abs(p['predicted_quantity'] - reference_quantity[(p['product_id'], p['date'])])
+            for p in predictions if (p['product_id'], p['date']) in reference_quantity
+        ]
+        report['mean_abs_quantity_difference'] = round(float(np.mean(differences)), 3) if differences else None
+
+    return report
+
+
+def activate_model_version(version: str) -> Dict[str, Any]:
+    """
+    Loads and validates a registry version next to the live model, then swaps it in.
+    Requests already running finish on the manager they started with; new requests get
+    the new one. Cached forecasts are not keyed by model version, so the cache is
+    replaced with the manager. The manifest is updated so restarts keep this version.
+    """
+    global FORECASTER, BEST_LGB_MODEL, LE_PRODUCT, LE_CATEGORY, QUANTILE_MODELS, CONFORMAL_OFFSETS
+    global MODEL_VERSION, MODEL_FEATURE_COLUMNS
+
+    # Loading and validation run next to live traffic; only the swap itself is serialized
+    candidate = load_candidate_forecaster(version)
+    previous = get_forecaster()
+    validation = validate_forecaster(candidate, reference=previous)
+
+    with _REFRESH_LOCK:
+        previous = get_forecaster()
+        # A context refresh may have landed while the candidate was loading
+        candidate.share_state(previous.state)
+        FORECASTER = candidate
+        BEST_LGB_MODEL, LE_PRODUCT, LE_CATEGORY = candidate.model, candidate.le_product, candidate.le_category
+        QUANTILE_MODELS = {name: predictor.model for name, predictor in candidate.quantile_predictors.items()}
+        CONFORMAL_OFFSETS = candidate.conformal_offsets
+        MODEL_VERSION, MODEL_FEATURE_COLUMNS = candidate.model_version, candidate.feature_columns
+        previous.cache.clear()
+        shutdown_shard_pool()
+        MODEL_REGISTRY.set_active(version)
+
+    print(f" Swapped model version {previous.model_version} -> {candidate.model_version}")
+    return {
+        'previous_version': previous.model_version,
+        'active_version': candidate.model_version,
+        'validation': validation,
+    }
+
+
+def context_memory_usage() -> Dict[str, Any]:
+    """Memory report of the last context load plus the current state's footprint."""
+    state = get_forecaster().state
+    index = state.index
+    return {
+        'context_version': state.version,
+        'rows': len(state.historical_df),
+        'context_bytes': int(state.historical_df.memory_usage(index=True, deep=True).sum()),
+        'index_bytes': int(index.offsets.nbytes + index.window_offsets.nbytes + index.sales.nbytes),
+        'load_report': CONTEXT_MEMORY_REPORT,
+    }
+
 # --- Main Prediction Function ---
-def run_forecast_prediction(request: ForecastRequest) -> List[Dict[str, Any]]:
+def run_forecast_prediction(
+    request: ForecastRequest,
+    forecaster: Optional[ForecastingManager] = None,
+    state: Optional[ForecastState] = None
+) -> List[Dict[str, Any]]:
     """
     Drives the prediction based on the request type (single or batch).
+    `forecaster` defaults to the live manager; shadow scoring passes a candidate.
+    `state` defaults to the forecaster's current context.
     """
-    forecaster = get_forecaster()
+    forecaster = forecaster or get_forecaster()
 
     if request.is_batch:
-        return forecaster.forecast_batch(request.horizon_days)
+        return forecaster.forecast_batch(request.horizon_days, state=state)
     
     if request.product_id:
-        return forecaster.forecast_single_product(str(request.product_id), request.horizon_days)
+        return forecaster.forecast_single_product(str(request.product_id), request.horizon_days, state=state)
     
     raise ValueError("Request must specify a 'product_id' or set 'is_batch' to True.")
\ No newline at end of file
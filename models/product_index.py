@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Iterable, Optional, Tuple
+
+# Days of history before the forecast anchor used to seed lags and rolling means
+LOOKBACK_DAYS = 30
+
+
+class ProductIndex:
+    """
+    CSR-style per-product index over the forecasting context.
+
+    Rows are stably sorted by product, so each product's rows form one contiguous,
+    chronological slice `frame[offsets[p]:offsets[p + 1]]`. The suffix of that slice
+    on or after `window_start` is the product's lookback window and starts at
+    `window_offsets[p]`. Products are numbered in order of first appearance in the
+    date-sorted input, which is the order batch forecasts are returned in.
+    """
+    def __init__(self, historical_df: pd.DataFrame, window_start: pd.Timestamp):
+        codes, product_ids = pd.factorize(historical_df['Product ID'], sort=False)
+        order = np.argsort(codes, kind='stable')
+
+        self.frame = historical_df.iloc[order].reset_index(drop=True)
+        self.product_ids = pd.Index(product_ids)
+        self.window_start = window_start
+
+        counts = np.bincount(codes, minlength=len(product_ids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        # Rows of a product are chronological, so its window is a suffix of its slice
+        in_window = (self.frame['Date'] >= window_start).to_numpy()
+        window_counts = np.bincount(codes[order][in_window], minlength=len(product_ids))
+        self.window_offsets = self.offsets[1:] - window_counts
+
+        self.sales = self.frame['Units Sold'].to_numpy(dtype=np.float64)
+        self._positions = {product_id: i for i, product_id in enumerate(self.product_ids.tolist())}
+        self._row_keys: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        frame: pd.DataFrame,
+        product_ids: pd.Index,
+        offsets: np.ndarray,
+        window_offsets: np.ndarray,
+        sales: np.ndarray,
+        window_start: pd.Timestamp
+    ) -> 'ProductIndex':
+        """
+        An index over a frame that is already product-sorted, from another index's arrays
+        (e.g. views of shared memory in a shard worker). Nothing is copied or recomputed.
+        """
+        index = cls.__new__(cls)
+        index.frame = frame
+        index.product_ids = pd.Index(product_ids)
+        index.window_start = window_start
+        index.offsets = offsets
+        index.window_offsets = window_offsets
+        index.sales = sales
+        index._positions = {product_id: i for i, product_id in enumerate(index.product_ids.tolist())}
+        index._row_keys = None
+        return index
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __contains__(self, product_id: Any) -> bool:
+        return product_id in self._positions
+
+    def position(self, product_id: Any) -> Optional[int]:
+        """Position of a product in the index, or None if it has no history."""
+        return self._positions.get(product_id)
+
+    def positions(self, product_ids: Iterable[Any]) -> np.ndarray:
+        """Positions for many products; -1 for products without history."""
+        return np.array([self._positions.get(product_id, -1) for product_id in product_ids], dtype=np.int64)
+
+    def rows(self, product_id: Any) -> pd.DataFrame:
+        """All context rows of a product in chronological order (empty if unknown)."""
+        position = self.position(product_id)
+        if position is None:
+            return self.frame.iloc[0:0]
+        return self.frame.iloc[self.offsets[position]:self.offsets[position + 1]]
+
+    def last_rows(self, positions: np.ndarray) -> pd.DataFrame:
+        """The most recent context row of each product position."""
+        return self.frame.iloc[self.offsets[np.asarray(positions) + 1] - 1]
+
+    def sales_window(self, product_id: Any) -> np.ndarray:
+        """Sales on or after the window start for one product, oldest first."""
+        position = self.position(product_id)
+        if position is None:
+            return np.empty(0, dtype=np.float64)
+        return self.sales[self.window_offsets[position]:self.offsets[position + 1]]
+
+    def window_sales(self, positions: np.ndarray, max_values: int = LOOKBACK_DAYS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Flattened lookback sales of many products, at most `max_values` each.
+        Returns (batch row of each value, values) with every product's values oldest first.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        return self.sales_between(self.window_offsets[positions], self.offsets[positions + 1], max_values)
+
+    def sales_between(
+        self, starts: np.ndarray, ends: np.ndarray, max_values: int = LOOKBACK_DAYS
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Flattened sales of the row ranges [starts, ends), keeping at most the last `max_values` of each.
+        Returns (batch row of each value, values) with every range's values oldest first.
+        """
+        ends = np.asarray(ends, dtype=np.int64)
+        starts = np.minimum(np.maximum(np.asarray(starts, dtype=np.int64), ends - max_values), ends)
+        lengths = ends - starts
+
+        rows = np.repeat(np.arange(len(ends)), lengths)
+        group_starts = np.cumsum(lengths) - lengths
+        flat_index = np.repeat(starts - group_starts, lengths) + np.arange(lengths.sum())
+        return rows, self.sales[flat_index]
+
+    def _keys(self) -> np.ndarray:
+        # Product-major (position, day) keys; ascending because rows are sorted that way
+        if self._row_keys is None:
+            days = self.frame['Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+            positions = np.repeat(np.arange(len(self.product_ids), dtype=np.int64), np.diff(self.offsets))
+            self._row_keys = (positions << 32) + days
+        return self._row_keys
+
+    @staticmethod
+    def _date_keys(positions: np.ndarray, dates) -> np.ndarray:
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        return (np.asarray(positions, dtype=np.int64) << 32) + days
+
+    def rows_through(self, positions: np.ndarray, dates) -> np.ndarray:
+        """End (exclusive) of each product's rows dated on or before the paired date."""
+        return np.searchsorted(self._keys(), self._date_keys(positions, dates), side='right')
+
+    def rows_from(self, positions: np.ndarray, dates) -> np.ndarray:
+        """Start of each product's rows dated on or after the paired date."""
+        return np.searchsorted(self._keys(), self._date_keys(positions, dates), side='left')
+
+    def sales_on(self, positions: np.ndarray, dates) -> np.ndarray:
+        """Sales of each product on the paired date; NaN where the product has no row that day."""
+        keys = self._date_keys(positions, dates)
+        all_keys = self._keys()
+        if len(all_keys) == 0:
+            return np.full(keys.shape, np.nan)
+        rows = np.minimum(np.searchsorted(all_keys, keys), len(all_keys) - 1)
+        return np.where(all_keys[rows] == keys, self.sales[rows], np.nan)
+
+    def window_frame(self) -> pd.DataFrame:
+        """Every product's lookback rows, grouped by product."""
+        lengths = self.offsets[1:] - self.window_offsets
+        group_starts = np.cumsum(lengths) - lengths
+        flat_index = np.repeat(self.window_offsets - group_starts, lengths) + np.arange(lengths.sum())
+        return self.frame.iloc[flat_index].reset_index(drop=True)
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from typing import Any, Dict, List
+
+from utils.metrics import timed
+
+# Rows per page when reading inventory/products/suppliers in bulk
+REORDER_PAGE_SIZE = 1000
+
+# Lead time for products whose supplier has none recorded
+DEFAULT_LEAD_TIME_DAYS = 7
+
+# Plan statuses, most urgent first
+STATUS_NO_INVENTORY = 'no_inventory'
+STATUS_STOCKOUT_RISK = 'stockout_risk'
+STATUS_REORDER = 'reorder'
+STATUS_OK = 'ok'
+
+
+def _fetch_all(supabase, table: str, columns: str, key: str) -> List[Dict[str, Any]]:
+    """Every row of `table`, paged by `key` in REORDER_PAGE_SIZE ranges."""
+    rows, start = [], 0
+    while True:
+        page = supabase.table(table).select(columns).order(key).range(
+            start, start + REORDER_PAGE_SIZE - 1
+        ).execute().data or []
+        rows.extend(page)
+        if len(page) < REORDER_PAGE_SIZE:
+            return rows
+        start += REORDER_PAGE_SIZE
+
+
+@timed('supabase_fetch.reorder_inputs')
+def fetch_reorder_inputs(supabase) -> pd.DataFrame:
+    """
+    Stock and reorder settings per product, indexed by product_id: inventory summed over
+    locations (quantity_available falls back to on hand minus reserved), the product's name,
+    sku, reorder_level and reorder_quantity, and the supplier's lead_time_days.
+    """
+    inventory_columns = ['inventory_id', 'product_id', 'quantity_on_hand', 'quantity_reserved', 'quantity_available']
+    inventory = pd.DataFrame(
+        _fetch_all(supabase, 'inventory', ', '.join(inventory_columns), 'inventory_id'), columns=inventory_columns
+    )
+    products = pd.DataFrame(
+        _fetch_all(supabase, 'products', 'product_id, product_name, sku, reorder_level, reorder_quantity, supplier_id', 'product_id'),
+        columns=['product_id', 'product_name', 'sku', 'reorder_level', 'reorder_quantity', 'supplier_id']
+    )
+    suppliers = pd.DataFrame(
+        _fetch_all(supabase, 'suppliers', 'supplier_id, lead_time_days', 'supplier_id'),
+        columns=['supplier_id', 'lead_time_days']
+    )
+
+    quantities = inventory[['quantity_on_hand', 'quantity_reserved', 'quantity_available']].astype(np.float64)
+    quantities['quantity_available'] = quantities['quantity_available'].fillna(
+        quantities['quantity_on_hand'] - quantities['quantity_reserved'].fillna(0)
+    )
+    quantities['product_id'] = inventory['product_id']
+    stock = quantities.groupby('product_id').sum(min_count=1)
+
+    settings = products.merge(suppliers, on='supplier_id', how='left').set_index('product_id')
+    numeric = settings[['reorder_level', 'reorder_quantity', 'lead_time_days']].astype(np.float64)
+    return settings[['product_name', 'sku']].join(numeric).join(stock, how='outer')
+
+
+def demand_std(index, positions: np.ndarray) -> np.ndarray:
+    """Standard deviation of daily units sold over each product's lookback window."""
+    rows, sales = index.window_sales(positions)
+    n_products = len(positions)
+    counts = np.bincount(rows, minlength=n_products)
+    sums = np.bincount(rows, weights=sales, minlength=n_products)
+    squares = np.bincount(rows, weights=sales * sales, minlength=n_products)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = squares / counts - (sums / counts) ** 2
+    return np.sqrt(np.clip(np.nan_to_num(variance), 0, None))
+
+
+def _demand_over(cumulative: np.ndarray, average: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Forecast demand of the first `days` days per product, extrapolated at `average` past the horizon."""
+    horizon_days = cumulative.shape[1]
+    days = np.maximum(np.ceil(days).astype(np.int64), 0)
+    within = np.take_along_axis(cumulative, np.clip(days - 1, 0, horizon_days - 1)[:, None], axis=1)[:, 0]
+    beyond = cumulative[:, -1] + (days - horizon_days) * average
+    return np.where(days == 0, 0.0, np.where(days <= horizon_days, within, beyond))
+
+
+def reorder_plan(
+    demand: np.ndarray,
+    available: np.ndarray,
+    sales_std: np.ndarray,
+    lead_time_days: np.ndarray,
+    reorder_level: np.ndarray,
+    reorder_quantity: np.ndarray,
+    service_level: float = 0.95,
+    review_period_days: int = 7
+) -> Dict[str, np.ndarray]:
+    """
+    Reorder recommendations for n products from their (n, horizon_days) daily demand
+    forecast, all computed in one vectorized pass.
+
+    `available` is the stock that can still be sold (NaN without an inventory row).
+    Days of cover are interpolated within the forecast curve where stock runs out inside
+    the horizon and extrapolated at the average forecast demand otherwise (NaN without
+    demand). Safety stock is z(service_level) * sales_std * sqrt(lead time); the reorder
+    point is lead-time demand plus safety stock, at least products.reorder_level. Orders
+    bring stock up to the demand of lead time plus review period plus safety stock, rounded
+    up to a multiple of reorder_quantity (at least one lot once an order is due).
+
+    Returns per-product arrays: days_of_cover, stockout_day (index within the horizon, -1
+    if none), safety_stock, reorder_point, order_quantity, order_by_day (days from the
+    forecast start, may be negative when overdue; NaN without demand) and status.
+    """
+    n_products, horizon_days = demand.shape
+    rows = np.arange(n_products)
+    has_stock = ~np.isnan(available)
+    stock = np.maximum(np.nan_to_num(available), 0.0)
+
+    cumulative = np.cumsum(demand, axis=1)
+    average = demand.mean(axis=1) if horizon_days else np.zeros(n_products)
+
+    # First day whose (positive) cumulative demand reaches the stock, and how far into it
+    crossed = (cumulative >= stock[:, None]) & (cumulative > 0)
+    stocks_out = crossed.any(axis=1) & has_stock
+    day = crossed.argmax(axis=1)
+    day_demand = demand[rows, day]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(day_demand > 0, (stock - (cumulative[rows, day] - day_demand)) / day_demand, 0.0)
+        extrapolated = np.where(average > 0, stock / average, np.nan)
+    days_of_cover = np.where(stocks_out, day + np.clip(fraction, 0, 1), extrapolated)
+    days_of_cover = np.where(has_stock, days_of_cover, np.nan)
+
+    lead_time_days = np.nan_to_num(lead_time_days, nan=DEFAULT_LEAD_TIME_DAYS)
+    z = NormalDist().inv_cdf(service_level)
+    safety_stock = z * sales_std * np.sqrt(lead_time_days)
+    reorder_point = np.maximum(_demand_over(cumulative, average, lead_time_days) + safety_stock, np.nan_to_num(reorder_level))
+
+    # A zero reorder point (no demand, safety stock or reorder level) never calls for an order
+    needs_order = has_stock & (reorder_point > 0) & (stock <= reorder_point)
+    order_up_to = np.maximum(
+        _demand_over(cumulative, average, lead_time_days + review_period_days) + safety_stock, reorder_point
+    )
+    shortfall = np.where(needs_order, np.maximum(order_up_to - stock, 0.0), 0.0)
+    lot = np.nan_to_num(reorder_quantity)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # At least one lot whenever an order is due
+        lots = np.maximum(np.ceil(shortfall / np.where(lot > 0, lot, 1)), 1)
+        order_quantity = np.where(~needs_order, 0.0, np.where(lot > 0, lots * lot, np.ceil(shortfall)))
+
+    status = np.full(n_products, STATUS_OK, dtype=object)
+    status[needs_order] = STATUS_REORDER
+    status[has_stock & (days_of_cover < lead_time_days)] = STATUS_STOCKOUT_RISK
+    status[~has_stock] = STATUS_NO_INVENTORY
+
+    return {
+        'days_of_cover': days_of_cover,
+        'stockout_day': np.where(stocks_out, day, -1),
+        'safety_stock': safety_stock,
+        'reorder_point': reorder_point,
+        'order_quantity': order_quantity,
+        'order_by_day': np.floor(days_of_cover - lead_time_days),
+        'lead_time_days': lead_time_days,
+        'average_daily_demand': average,
+        'forecast_demand': cumulative[:, -1] if horizon_days else np.zeros(n_products),
+        'status': status,
+    }
@@ -0,0 +1,396 @@
+import threading
+import numpy as np
+import pandas as pd
+from collections import Counter
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from database.historical_loader import fetch_historical_data
+from utils.metrics import timed
+
+# Accepted header names per canonical column (matched case-insensitively; the first present wins)
+COLUMN_ALIASES = {
+    'sale_date': ('sale_date', 'date', 'history_date'),
+    'product_id': ('product_id',),
+    'quantity': ('quantity', 'units_sold'),
+    'revenue': ('revenue', 'sales_revenue', 'total_price'),
+    'unit_price': ('unit_price',),
+    'inventory_start': ('inventory_start',),
+    'inventory_end': ('inventory_end',),
+}
+REQUIRED_COLUMNS = ('sale_date', 'product_id', 'quantity')
+
+# historical_data rows written by an upload; the upsert needs the unique index on these columns
+# (supabase/migrations/20261017000000_historical_data_daily_unique.sql)
+DATA_SOURCE = 'sales_upload'
+HISTORY_CONFLICT_COLUMNS = 'product_id,history_date,period_type'
+
+# Products whose stored rows are read back per query when merging an upload into existing days
+EXISTING_FETCH_PRODUCTS = 200
+
+# Rows per page when reading the valid product IDs
+PRODUCT_PAGE_SIZE = 1000
+
+# Failed rows listed individually in sales_uploads.error_log
+ERROR_LOG_MAX_LINES = 100
+
+UPLOAD_STATUS_PROCESSING = 'processing'
+UPLOAD_STATUS_COMPLETED = 'completed'
+UPLOAD_STATUS_FAILED = 'failed'
+
+# Read-add-write of existing days is not atomic; ingests in this process run one at a time
+_INGEST_LOCK = threading.Lock()
+
+
+def _normalize(name: str) -> str:
+    return str(name).strip().lower()
+
+
+def resolve_columns(header: List[str]) -> Dict[str, str]:
+    """Maps the CSV's header names to canonical columns; raises ValueError if a required one is missing."""
+    normalized = {}
+    for name in header:
+        normalized.setdefault(_normalize(name), name)
+
+    mapping = {}
+    for canonical, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                mapping[normalized[alias]] = canonical
+                break
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in mapping.values()]
+    if missing:
+        raise ValueError(
+            f"Missing required column(s): {', '.join(missing)}. "
+            f"Expected at least {', '.join(REQUIRED_COLUMNS)}."
+        )
+    return mapping
+
+
+def read_header(file: BinaryIO) -> Dict[str, str]:
+    """Column mapping of a CSV file from its header line; the file is rewound afterwards."""
+    try:
+        header = pd.read_csv(file, nrows=0).columns.tolist()
+    except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f"Could not read the CSV header: {e}")
+    finally:
+        file.seek(0)
+    return resolve_columns(header)
+
+
+def written_columns(mapping: Dict[str, str]) -> List[str]:
+    """historical_data value columns a file with this column mapping provides."""
+    provided = set(mapping.values())
+    columns = ['units_sold']
+    if provided & {'revenue', 'unit_price'}:
+        columns.append('sales_revenue')
+    columns.extend(column for column in ('inventory_start', 'inventory_end') if column in provided)
+    return columns
+
+
+def _fetch_product_ids(supabase) -> np.ndarray:
+    """Every product_id in products, paged by product_id."""
+    product_ids, start = [], 0
+    while True:
+        page = supabase.table('products').select('product_id').order('product_id').range(
+            start, start + PRODUCT_PAGE_SIZE - 1
+        ).execute().data or []
+        product_ids.extend(row['product_id'] for row in page)
+        if len(page) < PRODUCT_PAGE_SIZE:
+            return np.array(product_ids, dtype=np.int64)
+        start += PRODUCT_PAGE_SIZE
+
+
+def _whole_number(values: pd.Series) -> pd.Series:
+    """True where the (numeric) value is a non-negative whole number."""
+    return (values >= 0) & (np.floor(values) == values)
+
+
+def validate_chunk(chunk: pd.DataFrame, known_products: np.ndarray) -> pd.DataFrame:
+    """
+    Coerces one chunk of raw (string) CSV columns, column by column. Returns a frame with
+    the chunk's index holding history_date, product_id, units_sold, sales_revenue,
+    inventory_start, inventory_end and `error`: the first failed check, or '' if valid.
+    """
+    def numeric(column: str) -> pd.Series:
+        if column not in chunk:
+            return pd.Series(np.nan, index=chunk.index)
+        return pd.to_numeric(chunk[column], errors='coerce')
+
+    def unparsed(column: str, values: pd.Series) -> pd.Series:
+        """Given (not blank) but not a number."""
+        if column not in chunk:
+            return pd.Series(False, index=chunk.index)
+        return chunk[column].notna() & values.isna()
+
+    product_id = numeric('product_id')
+    sale_date = pd.to_datetime(chunk['sale_date'], format='ISO8601', errors='coerce', utc=True)
+    quantity = numeric('quantity')
+    revenue = numeric('revenue')
+    unit_price = numeric('unit_price')
+    inventory_start = numeric('inventory_start')
+    inventory_end = numeric('inventory_end')
+
+    valid_product = (product_id > 0) & _whole_number(product_id)
+    checks = [
+        (~valid_product, 'invalid product_id'),
+        (sale_date.isna(), 'invalid sale_date (expected YYYY-MM-DD)'),
+        (~_whole_number(quantity), 'invalid quantity (expected a whole number >= 0)'),
+        (unparsed('revenue', revenue) | (revenue < 0), 'invalid revenue'),
+        (unparsed('unit_price', unit_price) | (unit_price < 0), 'invalid unit_price'),
+        (unparsed('inventory_start', inventory_start) | (inventory_start.notna() & ~_whole_number(inventory_start)),
+         'invalid inventory_start'),
+        (unparsed('inventory_end', inventory_end) | (inventory_end.notna() & ~_whole_number(inventory_end)),
+         'invalid inventory_end'),
+        (valid_product & ~np.isin(product_id.to_numpy(), known_products), 'unknown product_id'),
+    ]
+
+    return pd.DataFrame({
+        'history_date': sale_date.dt.tz_localize(None).dt.normalize(),
+        'product_id': product_id,
+        'units_sold': quantity,
+        'sales_revenue': revenue.fillna(quantity * unit_price),
+        'inventory_start': inventory_start,
+        'inventory_end': inventory_end,
+        'error': np.select([mask.to_numpy() for mask, _ in checks], [reason for _, reason in checks], ''),
+    }, index=chunk.index)
+
+
+def daily_totals(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums rows (sales lines or earlier partial totals) per product and day: units and
+    revenue are added (revenue stays NaN if none was given), inventory_start is the
+    day's first known value and inventory_end its last, in row order.
+    """
+    grouped = rows.groupby(['product_id', 'history_date'], sort=False)
+    return pd.DataFrame({
+        'units_sold': grouped['units_sold'].sum(),
+        'sales_revenue': grouped['sales_revenue'].sum(min_count=1),
+        'inventory_start': grouped['inventory_start'].first(),
+        'inventory_end': grouped['inventory_end'].last(),
+    }).reset_index()
+
+
+class DailySalesAggregate:
+    """
+    Running per-product daily totals of a file. Chunk totals are buffered and merged once
+    they outnumber the merged rows, so the cost stays linear in the rows added and memory
+    bounded by about twice the distinct product-days.
+    """
+    def __init__(self):
+        self.merged: Optional[pd.DataFrame] = None
+        self.pending: List[pd.DataFrame] = []
+        self.pending_rows = 0
+
+    def add(self, rows: pd.DataFrame):
+        totals = daily_totals(rows)
+        self.pending.append(totals)
+        self.pending_rows += len(totals)
+        if self.pending_rows >= (len(self.merged) if self.merged is not None else 0):
+            self._merge()
+
+    def _merge(self):
+        parts = ([self.merged] if self.merged is not None else []) + self.pending
+        if parts:
+            self.merged = daily_totals(pd.concat(parts, ignore_index=True))
+        self.pending, self.pending_rows = [], 0
+
+    def frame(self) -> pd.DataFrame:
+        self._merge()
+        if self.merged is None:
+            return daily_totals(pd.DataFrame({
+                'product_id': pd.Series(dtype=np.int64),
+                'history_date': pd.Series(dtype='datetime64[ns]'),
+                'units_sold': pd.Series(dtype=np.float64),
+                'sales_revenue': pd.Series(dtype=np.float64),
+                'inventory_start': pd.Series(dtype=np.float64),
+                'inventory_end': pd.Series(dtype=np.float64),
+            }))
+        return self.merged
+
+
+def _native_values(values: pd.Series, integer: bool = False) -> List[Any]:
+    """Python ints/floats of a float column, NaN as None."""
+    array = values.to_numpy(dtype=np.float64)
+    missing = np.isnan(array)
+    native = (np.where(missing, 0, array).astype(np.int64) if integer else array).tolist()
+    for position in np.flatnonzero(missing).tolist():
+        native[position] = None
+    return native
+
+
+def add_to_existing(totals: pd.DataFrame, existing: pd.DataFrame) -> pd.DataFrame:
+    """
+    Daily totals combined with the stored rows of the same product and day: units and
+    revenue are added, inventory_start keeps the stored value (the day's opening stock)
+    and inventory_end takes the upload's (its closing stock), each falling back to the other.
+    """
+    keys = ['product_id', 'history_date']
+    totals = totals.assign(
+        product_id=totals['product_id'].astype(np.int64),
+        history_date=totals['history_date'].astype('datetime64[ns]')
+    )
+    existing = existing.assign(
+        product_id=existing['product_id'].astype(np.int64),
+        history_date=existing['history_date'].astype('datetime64[ns]')
+    )
+    merged = totals.merge(existing, on=keys, how='left', suffixes=('', '_stored'))
+
+    revenue = merged[['sales_revenue', 'sales_revenue_stored']]
+    return pd.DataFrame({
+        'product_id': merged['product_id'],
+        'history_date': merged['history_date'],
+        'units_sold': merged['units_sold'] + merged['units_sold_stored'].fillna(0),
+        'sales_revenue': revenue.sum(axis=1, min_count=1),
+        'inventory_start': merged['inventory_start_stored'].fillna(merged['inventory_start']),
+        'inventory_end': merged['inventory_end'].fillna(merged['inventory_end_stored']),
+    })
+
+
+def history_records(totals: pd.DataFrame, columns: List[str]) -> List[Dict[str, Any]]:
+    """
+    historical_data row dicts with only the given value columns, so columns the upload
+    does not provide keep their stored values; built from whole columns converted at once.
+    """
+    values = {
+        'history_date': totals['history_date'].dt.strftime('%Y-%m-%d').tolist(),
+        'product_id': _native_values(totals['product_id'], integer=True),
+    }
+    for column in columns:
+        values[column] = _native_values(
+            totals[column].round(2) if column == 'sales_revenue' else totals[column],
+            integer=column != 'sales_revenue'
+        )
+    names = list(values)
+    return [
+        {**dict(zip(names, row)), 'period_type': 'daily', 'data_source': DATA_SOURCE}
+        for row in zip(*values.values())
+    ]
+
+
+@timed('db_save.historical_data')
+def upsert_daily_history(supabase, totals: pd.DataFrame, columns: List[str], batch_size: int) -> int:
+    """
+    Adds daily totals to historical_data: for EXISTING_FETCH_PRODUCTS products at a time the
+    stored rows since their earliest uploaded day are read back and combined (add_to_existing),
+    then upserted in batches of `batch_size`. Returns the rows written.
+    """
+    written = 0
+    product_ids = np.unique(totals['product_id'].astype(np.int64))
+    for start in range(0, len(product_ids), EXISTING_FETCH_PRODUCTS):
+        chunk_ids = product_ids[start:start + EXISTING_FETCH_PRODUCTS]
+        chunk = totals[totals['product_id'].isin(chunk_ids)]
+        existing, _ = fetch_historical_data(
+            supabase,
+            since_date=chunk['history_date'].min().strftime('%Y-%m-%d'),
+            product_ids=chunk_ids.tolist()
+        )
+        combined = add_to_existing(chunk, existing)
+
+        for batch_start in range(0, len(combined), batch_size):
+            batch = history_records(combined.iloc[batch_start:batch_start + batch_size], columns)
+            supabase.table('historical_data').upsert(batch, on_conflict=HISTORY_CONFLICT_COLUMNS).execute()
+            written += len(batch)
+    return written
+
+
+def _error_log(samples: List[str], reasons: Counter) -> Optional[str]:
+    if not reasons:
+        return None
+    failed = sum(reasons.values())
+    summary = ', '.join(f"{count} {reason}" for reason, count in reasons.most_common())
+    lines = [f"{failed} row(s) failed: {summary}"] + samples
+    if failed > len(samples):
+        lines.append(f"... {failed - len(samples)} more failed row(s) not listed")
+    return '\n'.join(lines)
+
+
+def _update_upload(supabase, upload_id: int, values: Dict[str, Any]):
+    supabase.table('sales_uploads').update(values).eq('upload_id', upload_id).execute()
+
+
+def create_upload(supabase, file_name: str, uploaded_by: Optional[str] = None) -> int:
+    """Inserts the sales_uploads row tracking an ingest; returns its upload_id."""
+    result = supabase.table('sales_uploads').insert({
+        'file_name': file_name,
+        'records_processed': 0,
+        'records_failed': 0,
+        'status': UPLOAD_STATUS_PROCESSING,
+        'uploaded_by': uploaded_by,
+    }).execute()
+    return result.data[0]['upload_id']
+
+
+def ingest_sales_csv(
+    supabase,
+    file: BinaryIO,
+    upload_id: int,
+    chunk_rows: int = 50000,
+    batch_size: int = 1000
+) -> Dict[str, Any]:
+    """
+    Streams a sales CSV into daily historical_data rows, tracking progress on sales_uploads.
+
+    The file is parsed `chunk_rows` rows at a time; each chunk is coerced and validated
+    column-wise, its invalid rows are counted and logged, and its valid rows are added to
+    the running per-product daily totals, after which records_processed/records_failed are
+    updated. Once the whole file is read the totals are added to the stored days (see
+    upsert_daily_history), so a day split across chunks or across files accumulates, and a
+    file that fails to parse writes nothing. Uploads are additive: the same file uploaded
+    twice counts its sales twice. Only the columns the file provides are written.
+    The final status is 'completed' (even with failed rows) or 'failed' on a parse or
+    database error.
+
+    Returns a summary with the row counts, the days written and the earliest date written.
+    """
+    processed, failed = 0, 0
+    samples: List[str] = []
+    reasons: Counter = Counter()
+    try:
+        mapping = read_header(file)
+        known_products = _fetch_product_ids(supabase)
+        aggregate = DailySalesAggregate()
+
+        chunks = pd.read_csv(file, usecols=list(mapping), dtype=str, chunksize=chunk_rows)
+        for chunk in chunks:
+            rows = validate_chunk(chunk.rename(columns=mapping), known_products)
+            invalid = rows['error'] != ''
+
+            if invalid.any():
+                errors = rows.loc[invalid, 'error']
+                reasons.update(errors.value_counts().to_dict())
+                # The chunk index continues across chunks: data row numbers, header excluded
+                for row_number, reason in errors.head(ERROR_LOG_MAX_LINES - len(samples)).items():
+                    samples.append(f"row {row_number + 1}: {reason}")
+
+            aggregate.add(rows.loc[~invalid])
+            processed += int((~invalid).sum())
+            failed += int(invalid.sum())
+            _update_upload(supabase, upload_id, {'records_processed': processed, 'records_failed': failed})
+
+        totals = aggregate.frame()
+        with _INGEST_LOCK:
+            days_written = upsert_daily_history(supabase, totals, written_columns(mapping), batch_size)
+    except Exception as e:
+        error_log = _error_log(samples, reasons)
+        _update_upload(supabase, upload_id, {
+            'records_processed': processed,
+            'records_failed': failed,
+            'status': UPLOAD_STATUS_FAILED,
+            'error_log': f"Ingest failed: {e}" + (f"\n{error_log}" if error_log else ''),
+        })
+        raise
+
+    _update_upload(supabase, upload_id, {
+        'records_processed': processed,
+        'records_failed': failed,
+        'status': UPLOAD_STATUS_COMPLETED,
+        'error_log': _error_log(samples, reasons),
+    })
+    return {
+        'upload_id': upload_id,
+        'records_processed': processed,
+        'records_failed': failed,
+        'days_written': days_written,
+        'since_date': totals['history_date'].min().strftime('%Y-%m-%d') if days_written else None,
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Annotated, Dict, Optional, List
 
 class Product(BaseModel):
     product_name: str
@@ -45,4 +45,131 @@ class ForecastResponse(BaseModel):
     """
     message: str
     forecast_data: List[DailyPrediction]
-    model_version: str
\ No newline at end of file
+    model_version: str
+
+# --- 4. Models for background batch forecast jobs ---
+class ForecastJobRequest(BaseModel):
+    """
+    Starts a background batch forecast of every product.
+    """
+    horizon_days: int = Field(..., description="Forecast horizon in days (7, 14, 30, or 90).")
+
+class ForecastJobStatus(BaseModel):
+    """
+    Progress of a background batch forecast job.
+    """
+    job_id: str
+    status: str = Field(..., description="queued, running, completed, failed or cancelled.")
+    horizon_days: int
+    total_products: Optional[int] = None
+    processed_products: int
+    records_saved: int
+    failed_chunks: int = Field(..., description="Chunks whose forecasts could not be saved.")
+    cancel_requested: bool
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    percent_complete: Optional[float] = None
+    products_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+
+# --- 5. Models for what-if scenario grids ---
+class ScenarioRequest(BaseModel):
+    """
+    A grid of future price/discount/inventory overrides for one or many products.
+    Every combination of the given values is one scenario; an omitted field keeps
+    each product's last observed value.
+    """
+    horizon_days: int = Field(..., ge=1, le=365, description="Forecast horizon in days.")
+    product_ids: List[str] = Field(..., min_length=1, description="Products to evaluate every scenario for.")
+    future_price: Optional[List[Annotated[float, Field(ge=0)]]] = Field(None, description="Price points to sweep.")
+    future_discount: Optional[List[Annotated[float, Field(ge=0, le=100)]]] = Field(
+        None, description="Discount percentages (0-100) to sweep."
+    )
+    future_inventory: Optional[List[Annotated[int, Field(ge=0)]]] = Field(None, description="Inventory levels to sweep.")
+    include_baseline: bool = Field(True, description="Add the observed context as the first scenario.")
+    include_daily: bool = Field(False, description="Also return demand per day (product x scenario x day).")
+
+class Scenario(BaseModel):
+    """
+    One column of the scenario matrix; None means the product's observed value.
+    """
+    future_price: Optional[float] = None
+    future_discount: Optional[float] = None
+    future_inventory: Optional[int] = None
+
+class ScenarioResponse(BaseModel):
+    """
+    Demand and revenue totals over the horizon, indexed [product][scenario].
+    Entries are None where a scenario's inventory has no stock category.
+    """
+    horizon_days: int
+    start_date: str
+    product_ids: List[str]
+    skipped_products: List[str]
+    scenarios: List[Scenario]
+    demand: List[List[Optional[float]]]
+    revenue: List[List[Optional[float]]]
+    daily_demand: Optional[List[List[List[Optional[float]]]]] = None
+    elapsed_ms: float
+    model_version: str
+
+# --- 6. Models for the model registry ---
+class ModelActivationRequest(BaseModel):
+    """
+    Registry version to load, validate and swap in.
+    """
+    version: str
+
+class ShadowRequest(BaseModel):
+    """
+    Registry version to score next to the live model on a sample of forecast requests.
+    """
+    version: str
+    sample_rate: float = Field(1.0, ge=0.0, le=1.0, description="Share of live forecast requests to shadow.")
+
+# --- 7. Models for reorder planning ---
+class ReorderPlanRequest(BaseModel):
+    """
+    Parameters of a reorder plan over all products, or the given ones.
+    """
+    horizon_days: int = Field(30, ge=1, le=365, description="Forecast horizon the plan is computed over.")
+    product_ids: Optional[List[str]] = Field(None, description="Products to plan; all forecastable products if omitted.")
+    service_level: float = Field(0.95, gt=0.5, lt=1.0, description="Target probability of not stocking out during the lead time.")
+    default_lead_time_days: int = Field(7, ge=0, description="Lead time for products whose supplier has none recorded.")
+    review_period_days: int = Field(7, ge=0, description="Days until the next planning run that an order must also cover.")
+    actionable_only: bool = Field(False, description="Only return products that need an order or have no inventory.")
+
+class ReorderRecommendation(BaseModel):
+    """
+    Stock position and recommendation of one product. Dates count from the forecast start.
+    """
+    product_id: str
+    status: str
+    quantity_on_hand: Optional[float] = None
+    quantity_reserved: Optional[float] = None
+    quantity_available: Optional[float] = None
+    forecast_demand: float
+    average_daily_demand: float
+    days_of_cover: Optional[float] = None
+    stockout_date: Optional[str] = None
+    lead_time_days: int
+    safety_stock: float
+    reorder_point: float
+    order_quantity: int
+    order_by_date: Optional[str] = None
+
+class ReorderPlanResponse(BaseModel):
+    """
+    Recommendations ordered by urgency (fewest days of cover first), with status counts.
+    """
+    horizon_days: int
+    start_date: str
+    service_level: float
+    products_evaluated: int
+    skipped_products: List[str]
+    status_counts: Dict[str, int]
+    recommendations: List[ReorderRecommendation]
+    elapsed_ms: float
+    model_version: str
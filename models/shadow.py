@@ -0,0 +1,155 @@
+import random
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Latency and difference samples kept for the comparison report
+SHADOW_HISTORY_SIZE = 1000
+
+
+def _latency_summary(samples) -> Optional[Dict[str, float]]:
+    if not samples:
+        return None
+    values = np.asarray(samples) * 1000
+    return {
+        'mean_ms': round(float(values.mean()), 2),
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+    }
+
+
+class ShadowScorer:
+    """
+    Scores a candidate forecaster on a sample of live requests after the primary
+    response has been produced, and compares latency and predicted quantities.
+
+    Shadow work is dispatched from its own single thread and at most one request is
+    scored at a time; requests arriving meanwhile are skipped. The candidate's forecast
+    itself is expected to run inside the shared forecast executor, so shadowing never
+    uses more than the executor's bound alongside live forecasts.
+    """
+    def __init__(self, history_size: int = SHADOW_HISTORY_SIZE):
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._candidate = None
+        self._version: Optional[str] = None
+        self._sample_rate = 0.0
+        self._pending = False
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.requests_scored = 0
+        self.requests_skipped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self._primary_seconds = deque(maxlen=self.history_size)
+        self._candidate_seconds = deque(maxlen=self.history_size)
+        self._abs_differences = deque(maxlen=self.history_size)
+        self._max_abs_difference = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._candidate is not None
+
+    def start(self, candidate, version: str, sample_rate: float):
+        """Shadows `candidate` (a ForecastingManager) on `sample_rate` of live requests; resets the stats."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+            self._candidate, self._version = candidate, version
+            self._sample_rate = min(max(sample_rate, 0.0), 1.0)
+            self._reset_stats()
+            self.started_at = time.time()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stops shadowing and returns the final comparison."""
+        report = self.stats()
+        with self._lock:
+            self._candidate, self._version = None, None
+        return report
+
+    def shutdown(self):
+        with self._lock:
+            self._candidate = None
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(
+        self,
+        run_candidate: Callable[[Any], Tuple[List[Dict[str, Any]], float]],
+        primary_predictions: List[Dict[str, Any]],
+        primary_seconds: float
+    ):
+        """
+        Schedules `run_candidate(candidate)` for comparison with the primary predictions,
+        if shadowing is on and this request is sampled. `run_candidate` returns the
+        candidate's predictions and their compute time. Never raises.
+        """
+        with self._lock:
+            candidate = self._candidate
+            if candidate is None or random.random() >= self._sample_rate:
+                return
+            if self._pending:
+                self.requests_skipped += 1
+                return
+            self._pending = True
+            executor = self._executor
+
+        executor.submit(self._score, candidate, run_candidate, primary_predictions, primary_seconds)
+
+    def _score(self, candidate, run_candidate, primary_predictions, primary_seconds):
+        try:
+            candidate_predictions, candidate_seconds = run_candidate(candidate)
+
+            primary = {(p['product_id'], p['date']): p['predicted_quantity'] for p in primary_predictions}
+            differences = [
+                abs(p['predicted_quantity'] - primary[(p['product_id'], p['date'])])
+                for p in candidate_predictions if (p['product_id'], p['date']) in primary
+            ]
+
+            with self._lock:
+                if candidate is not self._candidate:
+                    return  # Shadowing was stopped or restarted meanwhile
+                self.requests_scored += 1
+                self._primary_seconds.append(primary_seconds)
+                self._candidate_seconds.append(candidate_seconds)
+                if differences:
+                    self._abs_differences.append(float(np.mean(differences)))
+                    self._max_abs_difference = max(self._max_abs_difference, float(max(differences)))
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                self._pending = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            primary = _latency_summary(self._primary_seconds)
+            candidate = _latency_summary(self._candidate_seconds)
+            return {
+                'active': self._candidate is not None,
+                'candidate_version': self._version,
+                'sample_rate': self._sample_rate,
+                'requests_scored': self.requests_scored,
+                'requests_skipped': self.requests_skipped,
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'primary_latency': primary,
+                'candidate_latency': candidate,
+                'candidate_latency_ratio': (
+                    round(candidate['mean_ms'] / primary['mean_ms'], 3)
+                    if primary and candidate and primary['mean_ms'] > 0 else None
+                ),
+                'mean_abs_quantity_difference': (
+                    round(float(np.mean(self._abs_differences)), 3) if self._abs_differences else None
+                ),
+                'max_abs_quantity_difference': self._max_abs_difference if self._abs_differences else None,
+            }
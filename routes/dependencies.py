@@ -0,0 +1,16 @@
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException, status
+
+from config import ADMIN_API_TOKEN
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allows the request only when it carries the configured admin token."""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled. Set ADMIN_API_TOKEN to enable them."
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required.")
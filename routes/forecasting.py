@@ -1,13 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from datetime import datetime, date, timedelta
+from typing import Any, Dict, List, Optional
+import asyncio
+import itertools
+import json
+import time
 import random
+import numpy as np
+import pandas as pd
 
-from models.schemas import ForecastRequest, ForecastResponse
-from models.prediction_model import run_forecast_prediction, get_forecaster
+from models.schemas import (
+    ForecastRequest, ForecastResponse, ForecastJobRequest, ForecastJobStatus, ScenarioRequest, ScenarioResponse,
+    ModelActivationRequest, ShadowRequest, ReorderPlanRequest, ReorderPlanResponse
+)
+from models.prediction_model import (
+    run_forecast_prediction, get_forecaster, refresh_forecaster_context, context_memory_usage,
+    MODEL_REGISTRY, activate_model_version, load_candidate_forecaster, validate_forecaster
+)
+from models.model_registry import BackgroundSwap
+from models.shadow import ShadowScorer
+from models.forecast_executor import call_in_forecast_executor, run_in_forecast_executor
+from models.forecast_cache import ForecastCache
+from models.forecast_jobs import ForecastJobRunner, job_progress
+from models.backtest import run_backtest, write_backtest_metrics, backtest_summary
+from models.alerts import run_alert_engine
+from models.reorder import (
+    fetch_reorder_inputs, demand_std, reorder_plan, STATUS_STOCKOUT_RISK, STATUS_REORDER, STATUS_NO_INVENTORY, STATUS_OK
+)
 from database.supabase_client import get_supabase
+from database.historical_loader import fetch_historical_data
+from routes.dependencies import require_admin
+from utils.metrics import METRICS, timed
+from utils.profiling import CountingSupabaseClient, ProfilerBusyError, profile_call
+from config import FORECAST_REQUEST_TIMEOUT_SECONDS, PROFILE_OUTPUT_DIR, PROFILE_TOP_N, ALERT_HORIZON_DAYS
 
 router = APIRouter(prefix="/forecast", tags=["Forecasting"])
 
+# Product IDs per in_() filter, keeping request URLs well under proxy limits
+IN_FILTER_CHUNK_SIZE = 200
+
+# Streamed forecasts: media type and products computed per inference call
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+STREAM_CHUNK_PRODUCTS = 200
+
+# Largest what-if grid (products x scenarios) evaluated in one request
+MAX_SCENARIO_ROWS = 50000
+
+# Registry version swaps run in the background; a candidate can be shadowed on live traffic
+MODEL_SWAP = BackgroundSwap(activate_model_version)
+SHADOW = ShadowScorer()
+
+# Daily history rows per product used for enhancement (30), trend (60) and explanation (90)
+EXPLANATION_HISTORY_ROWS = 90
+
+
+def trend_from_history(history_desc: list) -> dict:
+    """Calculate demand trend from daily history rows ordered newest first"""
+    result_data = history_desc[:60]
+    
+    if not result_data or len(result_data) < 30:
+        return {'direction': 'STABLE', 'percent_change': 0, 'confidence': 'low'}
+    
+    recent_sales = sum(r['units_sold'] for r in result_data[:30]) / 30
+    
+    if len(result_data) >= 60:
+        older_sales = sum(r['units_sold'] for r in result_data[30:60]) / 30
+    else:
+        older_sales = recent_sales
+    
+    if older_sales > 0:
+        percent_change = ((recent_sales - older_sales) / older_sales) * 100
+    else:
+        percent_change = 0
+    
+    if percent_change > 15:
+        direction = 'GROWING'
+        confidence = 'high' if percent_change > 25 else 'medium'
+    elif percent_change < -15:
+        direction = 'DECLINING'
+        confidence = 'high' if percent_change < -25 else 'medium'
+    else:
+        direction = 'STABLE'
+        confidence = 'high'
+    
+    return {
+        'direction': direction,
+        'percent_change': round(percent_change, 1),
+        'confidence': confidence
+    }
+
 
 def calculate_trend_direction(product_id: int, supabase) -> dict:
     """Calculate demand trend by comparing recent vs older sales"""
@@ -18,36 +102,7 @@ def calculate_trend_direction(product_id: int, supabase) -> dict:
             'history_date', desc=True
         ).limit(60).execute()
         
-        if not result.data or len(result.data) < 30:
-            return {'direction': 'STABLE', 'percent_change': 0, 'confidence': 'low'}
-        
-        recent_sales = sum(r['units_sold'] for r in result.data[:30]) / 30
-        
-        if len(result.data) >= 60:
-            older_sales = sum(r['units_sold'] for r in result.data[30:60]) / 30
-        else:
-            older_sales = recent_sales
-        
-        if older_sales > 0:
-            percent_change = ((recent_sales - older_sales) / older_sales) * 100
-        else:
-            percent_change = 0
-        
-        if percent_change > 15:
-            direction = 'GROWING'
-            confidence = 'high' if percent_change > 25 else 'medium'
-        elif percent_change < -15:
-            direction = 'DECLINING'
-            confidence = 'high' if percent_change < -25 else 'medium'
-        else:
-            direction = 'STABLE'
-            confidence = 'high'
-        
-        return {
-            'direction': direction,
-            'percent_change': round(percent_change, 1),
-            'confidence': confidence
-        }
+        return trend_from_history(result.data or [])
         
     except Exception as e:
         print(f"Error calculating trend: {e}")
@@ -119,23 +174,32 @@ def calculate_confidence_score(product_id: int, historical_data: list) -> dict:
     return {'level': level, 'score': score, 'reasons': reasons}
 
 
-def generate_explanation(product_id: int, predicted_qty: int, predicted_rev: float, horizon_days: int, supabase) -> dict:
-    """Generate comprehensive explanation for the forecast"""
+def fallback_explanation(horizon_days: int) -> dict:
+    """Explanation used when the forecast context cannot be analysed"""
+    return {
+        'summary': 'Forecast generated successfully',
+        'trend_direction': 'STABLE',
+        'confidence_level': 'MEDIUM',
+        'key_factors': ['Standard forecast generated'],
+        'horizon_days': horizon_days
+    }
+
+
+def build_explanation(
+    product_id: int,
+    product: Optional[dict],
+    historical_data: list,
+    predicted_qty: int,
+    predicted_rev: float,
+    horizon_days: int
+) -> dict:
+    """Build the forecast explanation from product details and up to 90 daily history rows (newest first)"""
     try:
-        product_result = supabase.table('products').select(
-            'product_name, unit_price'
-        ).eq('product_id', product_id).single().execute()
-        
-        product_name = product_result.data['product_name'] if product_result.data else 'Product'
-        product_price = product_result.data['unit_price'] if product_result.data else 0
-        
-        hist_result = supabase.table('historical_data').select(
-            'units_sold, history_date'
-        ).eq('product_id', product_id).eq('period_type', 'daily').order(
-            'history_date', desc=True
-        ).limit(90).execute()
+        if product is None:
+            raise ValueError(f"Product {product_id} not found")
         
-        historical_data = hist_result.data if hist_result.data else []
+        product_name = product['product_name'] if product else 'Product'
+        product_price = product['unit_price'] if product else 0
         
         if len(historical_data) > 0:
             hist_avg_daily = sum(r['units_sold'] for r in historical_data) / len(historical_data)
@@ -149,7 +213,7 @@ def generate_explanation(product_id: int, predicted_qty: int, predicted_rev: flo
         else:
             percent_change = 0
         
-        trend_info = calculate_trend_direction(product_id, supabase)
+        trend_info = trend_from_history(historical_data)
         confidence_info = calculate_confidence_score(product_id, historical_data)
         
         if percent_change > 10:
@@ -230,13 +294,64 @@ def generate_explanation(product_id: int, predicted_qty: int, predicted_rev: flo
         
     except Exception as e:
         print(f"Error generating explanation: {e}")
-        return {
-            'summary': 'Forecast generated successfully',
-            'trend_direction': 'STABLE',
-            'confidence_level': 'MEDIUM',
-            'key_factors': ['Standard forecast generated'],
-            'horizon_days': horizon_days
-        }
+        return fallback_explanation(horizon_days)
+
+
+def generate_explanation(product_id: int, predicted_qty: int, predicted_rev: float, horizon_days: int, supabase) -> dict:
+    """Generate comprehensive explanation for the forecast"""
+    try:
+        product_result = supabase.table('products').select(
+            'product_name, unit_price'
+        ).eq('product_id', product_id).single().execute()
+        
+        hist_result = supabase.table('historical_data').select(
+            'units_sold, history_date'
+        ).eq('product_id', product_id).eq('period_type', 'daily').order(
+            'history_date', desc=True
+        ).limit(90).execute()
+        
+    except Exception as e:
+        print(f"Error generating explanation: {e}")
+        return fallback_explanation(horizon_days)
+    
+    historical_data = hist_result.data if hist_result.data else []
+    
+    return build_explanation(
+        product_id, product_result.data, historical_data, predicted_qty, predicted_rev, horizon_days
+    )
+
+
+def enhance_from_history(product: Optional[dict], history_desc: list, horizon_days: int) -> Optional[dict]:
+    """Enhance predictions from product price and daily history rows ordered newest first"""
+    if not product:
+        return None
+    
+    price = product['unit_price']
+    recent_history = history_desc[:30]
+    
+    if not recent_history or len(recent_history) == 0:
+        return None
+    
+    total_units = sum(r['units_sold'] for r in recent_history)
+    avg_daily_units = total_units / len(recent_history)
+    
+    if price >= 500:
+        daily_rate = max(1, min(5, avg_daily_units * random.uniform(0.8, 1.2)))
+    elif price >= 100:
+        daily_rate = max(2, min(8, avg_daily_units * random.uniform(0.85, 1.15)))
+    elif price >= 30:
+        daily_rate = max(3, min(12, avg_daily_units * random.uniform(0.9, 1.1)))
+    else:
+        daily_rate = max(5, min(20, avg_daily_units * random.uniform(0.9, 1.15)))
+    
+    predicted_units = int(round(daily_rate * horizon_days))
+    predicted_units = max(horizon_days, predicted_units)
+    predicted_revenue = round(predicted_units * price, 2)
+    
+    return {
+        'predicted_quantity': predicted_units,
+        'predicted_revenue': predicted_revenue
+    }
 
 
 def enhance_prediction_with_context(product_id: int, horizon_days: int, supabase) -> dict:
@@ -249,47 +364,85 @@ def enhance_prediction_with_context(product_id: int, horizon_days: int, supabase
         if not product_result.data:
             return None
         
-        price = product_result.data['unit_price']
-        
         hist_result = supabase.table('historical_data').select(
             'units_sold, sales_revenue'
         ).eq('product_id', product_id).eq('period_type', 'daily').order(
             'history_date', desc=True
         ).limit(30).execute()
         
-        if not hist_result.data or len(hist_result.data) == 0:
-            return None
-        
-        total_units = sum(r['units_sold'] for r in hist_result.data)
-        avg_daily_units = total_units / len(hist_result.data)
-        
-        if price >= 500:
-            daily_rate = max(1, min(5, avg_daily_units * random.uniform(0.8, 1.2)))
-        elif price >= 100:
-            daily_rate = max(2, min(8, avg_daily_units * random.uniform(0.85, 1.15)))
-        elif price >= 30:
-            daily_rate = max(3, min(12, avg_daily_units * random.uniform(0.9, 1.1)))
-        else:
-            daily_rate = max(5, min(20, avg_daily_units * random.uniform(0.9, 1.15)))
-        
-        predicted_units = int(round(daily_rate * horizon_days))
-        predicted_units = max(horizon_days, predicted_units)
-        predicted_revenue = round(predicted_units * price, 2)
-        
-        return {
-            'predicted_quantity': predicted_units,
-            'predicted_revenue': predicted_revenue
-        }
+        return enhance_from_history(product_result.data, hist_result.data or [], horizon_days)
         
     except Exception as e:
         print(f"Warning: Context enhancement unavailable for product {product_id}: {e}")
         return None
 
 
-def save_forecasts_to_database(predictions: list, horizon_days: int) -> dict:
-    """Save forecasts with explanations to database"""
-    supabase = get_supabase()
+@timed('supabase_fetch.products_by_id')
+def _fetch_products_by_id(supabase, product_ids: list) -> dict:
+    """Product details keyed by product_id, fetched with one in_() query per chunk of IDs"""
+    products = {}
+    for start in range(0, len(product_ids), IN_FILTER_CHUNK_SIZE):
+        chunk = product_ids[start:start + IN_FILTER_CHUNK_SIZE]
+        result = supabase.table('products').select(
+            'product_id, product_name, unit_price, category_id'
+        ).in_('product_id', chunk).execute()
+        for row in result.data or []:
+            products[row['product_id']] = row
+    return products
+
+
+def _history_window_start(product_ids: list, state=None) -> str:
+    """
+    Earliest date needed to cover the last EXPLANATION_HISTORY_ROWS daily rows of every product.
+    Derived from the forecasting state the predictions came from; newer rows in the database
+    only move it later. Without a state the window is the last EXPLANATION_HISTORY_ROWS days.
+    """
+    fallback = (date.today() - timedelta(days=EXPLANATION_HISTORY_ROWS)).isoformat()
+    if state is None:
+        return fallback
+    
+    index = state.index
+    positions = index.positions(product_ids)
+    if len(positions) == 0 or (positions < 0).any():
+        return fallback
+    
+    first_rows = np.maximum(index.offsets[positions], index.offsets[positions + 1] - EXPLANATION_HISTORY_ROWS)
+    window_start = index.frame['Date'].to_numpy()[first_rows].min()
+    return min(pd.Timestamp(window_start).strftime('%Y-%m-%d'), fallback)
+
+
+def _fetch_recent_history(supabase, product_ids: list, state=None) -> dict:
+    """
+    Up to EXPLANATION_HISTORY_ROWS daily history rows per product, newest first,
+    from one paged, date-windowed historical_data fetch.
+    """
+    if not product_ids:
+        return {}
     
+    product_filter = product_ids if len(product_ids) <= IN_FILTER_CHUNK_SIZE else None
+    history_df, _ = fetch_historical_data(
+        supabase, since_date=_history_window_start(product_ids, state), product_ids=product_filter
+    )
+    
+    history_df = history_df[history_df['product_id'].isin(product_ids)]
+    history_df = history_df.sort_values(['product_id', 'history_date'], ascending=[True, False], kind='stable')
+    history_df = history_df.groupby('product_id', sort=False).head(EXPLANATION_HISTORY_ROWS)
+    
+    history = {}
+    for product_id, rows in history_df.groupby('product_id', sort=False):
+        history[int(product_id)] = [
+            {'units_sold': units, 'sales_revenue': revenue, 'history_date': history_date}
+            for units, revenue, history_date in zip(
+                rows['units_sold'].tolist(),
+                rows['sales_revenue'].tolist(),
+                rows['history_date'].dt.strftime('%Y-%m-%d').tolist()
+            )
+        ]
+    return history
+
+
+def _final_forecasts(predictions: list) -> dict:
+    """Last forecast day of every product, keyed by product_id"""
     products_final_forecast = {}
     
     for pred in predictions:
@@ -301,22 +454,28 @@ def save_forecasts_to_database(predictions: list, horizon_days: int) -> dict:
             if pred['date'] > products_final_forecast[product_id]['date']:
                 products_final_forecast[product_id] = pred
     
+    return products_final_forecast
+
+
+def forecast_period_label(horizon_days: int) -> str:
+    """forecast_period value stored for a horizon"""
     if horizon_days <= 7:
-        period = '7 Days'
+        return '7 Days'
     elif horizon_days <= 14:
-        period = '14 Days'
+        return '14 Days'
     elif horizon_days <= 30:
-        period = '30 Days'
-    else:
-        period = '90 Days'
-    
-    product_ids = [int(pid) for pid in products_final_forecast.keys()]
-    
+        return '30 Days'
+    return '90 Days'
+
+
+@timed('db_save.delete')
+def _delete_old_forecasts(supabase, product_ids: list, period: str) -> int:
+    """Removes existing forecasts of the products for this period, one in_() query per chunk"""
     try:
         deleted_count = 0
-        for product_id in product_ids:
-            delete_result = supabase.table('forecasts').delete().eq(
-                'product_id', product_id
+        for start in range(0, len(product_ids), IN_FILTER_CHUNK_SIZE):
+            delete_result = supabase.table('forecasts').delete().in_(
+                'product_id', product_ids[start:start + IN_FILTER_CHUNK_SIZE]
             ).eq(
                 'forecast_period', period
             ).execute()
@@ -324,14 +483,24 @@ def save_forecasts_to_database(predictions: list, horizon_days: int) -> dict:
         
         if deleted_count > 0:
             print(f"Deleted {deleted_count} old forecast(s)")
+        return deleted_count
     except Exception as e:
         print(f"Warning: Could not delete old forecasts: {str(e)}")
-    
+        return 0
+
+
+@timed('explanation')
+def _build_forecast_records(
+    products_final_forecast: dict, products: dict, history: dict, period: str, horizon_days: int, model_version: str
+) -> list:
+    """forecasts rows with explanations for every product's final forecast, stamped with the producing model"""
     forecast_records = []
     for product_id, final_pred in products_final_forecast.items():
         product_id_int = int(product_id)
+        product = products.get(product_id_int)
+        product_history = history.get(product_id_int, [])
         
-        enhanced = enhance_prediction_with_context(product_id_int, horizon_days, supabase)
+        enhanced = enhance_from_history(product, product_history, horizon_days)
         
         if enhanced:
             predicted_qty = enhanced['predicted_quantity']
@@ -340,12 +509,13 @@ def save_forecasts_to_database(predictions: list, horizon_days: int) -> dict:
             predicted_qty = final_pred['predicted_quantity']
             predicted_rev = final_pred['predicted_revenue']
         
-        explanation = generate_explanation(
+        explanation = build_explanation(
             product_id_int,
+            product,
+            product_history,
             predicted_qty,
             predicted_rev,
-            horizon_days,
-            supabase
+            horizon_days
         )
         
         record = {
@@ -356,14 +526,20 @@ def save_forecasts_to_database(predictions: list, horizon_days: int) -> dict:
             'predicted_revenue': predicted_rev,
             'confidence_lower': final_pred.get('confidence_lower'),
             'confidence_upper': final_pred.get('confidence_upper'),
-            'model_version': 'LightGBM_V3_Optimized',
+            'model_version': model_version,
             'explanation': explanation,
             'generated_at': datetime.utcnow().isoformat()
         }
         forecast_records.append(record)
     
+    return forecast_records
+
+
+@timed('db_save.insert')
+def _insert_forecasts(supabase, forecast_records: list, period: str) -> dict:
     try:
         result = supabase.table('forecasts').insert(forecast_records).execute()
+        METRICS.record_forecasts(len(result.data))
         
         print(f"Saved {len(result.data)} forecast(s) with explanations")
         return {
@@ -372,6 +548,7 @@ def save_forecasts_to_database(predictions: list, horizon_days: int) -> dict:
             'period': period
         }
     except Exception as e:
+        METRICS.record_error()
         print(f"Failed to save forecasts: {str(e)}")
         return {
             'success': False,
@@ -379,34 +556,275 @@ def save_forecasts_to_database(predictions: list, horizon_days: int) -> dict:
         }
 
 
-@router.post("/", response_model=ForecastResponse)
-def generate_inventory_forecast(request: ForecastRequest):
-    """Generates sales forecast with explainable AI insights"""
+def save_forecasts_to_database(
+    predictions: list, horizon_days: int, supabase=None, model_version: Optional[str] = None, state=None
+) -> dict:
+    """
+    Save forecasts with explanations to database.
+    `model_version` is the version that produced the predictions (default: the live model) and
+    `state` the forecasting state they were computed on, which bounds the history fetch.
+    """
+    supabase = supabase or get_supabase()
+    model_version = model_version or get_forecaster().model_version
+    
+    products_final_forecast = _final_forecasts(predictions)
+    period = forecast_period_label(horizon_days)
+    product_ids = [int(pid) for pid in products_final_forecast.keys()]
+    
+    # Shared context for every product: one products fetch and one windowed history fetch
+    try:
+        products = _fetch_products_by_id(supabase, product_ids)
+        history = _fetch_recent_history(supabase, product_ids, state)
+    except Exception as e:
+        print(f"Warning: Could not fetch forecast context: {str(e)}")
+        products, history = {}, {}
+    
+    _delete_old_forecasts(supabase, product_ids, period)
+    
+    forecast_records = _build_forecast_records(
+        products_final_forecast, products, history, period, horizon_days, model_version
+    )
+    return _insert_forecasts(supabase, forecast_records, period)
+
+
+async def save_forecasts_to_database_async(
+    predictions: list, horizon_days: int, model_version: str, state=None
+) -> dict:
+    """
+    save_forecasts_to_database without blocking the event loop. The products fetch,
+    history fetch and delete of old forecasts are independent, so they run concurrently.
+    """
+    supabase = get_supabase()
+    
+    products_final_forecast = _final_forecasts(predictions)
+    period = forecast_period_label(horizon_days)
+    product_ids = [int(pid) for pid in products_final_forecast.keys()]
+    
+    products, history, _ = await asyncio.gather(
+        asyncio.to_thread(_fetch_products_by_id, supabase, product_ids),
+        asyncio.to_thread(_fetch_recent_history, supabase, product_ids, state),
+        asyncio.to_thread(_delete_old_forecasts, supabase, product_ids, period),
+        return_exceptions=True
+    )
+    if isinstance(products, Exception) or isinstance(history, Exception):
+        error = products if isinstance(products, Exception) else history
+        print(f"Warning: Could not fetch forecast context: {str(error)}")
+        products, history = {}, {}
+    
+    forecast_records = await asyncio.to_thread(
+        _build_forecast_records, products_final_forecast, products, history, period, horizon_days, model_version
+    )
+    return await asyncio.to_thread(_insert_forecasts, supabase, forecast_records, period)
+
+
+def _timed_forecast(request: ForecastRequest, forecaster, state) -> tuple:
+    """Forecast and its compute time, excluding the wait for an executor slot"""
+    start = time.perf_counter()
+    prediction_data = run_forecast_prediction(request, forecaster, state)
+    seconds = time.perf_counter() - start
+    METRICS.observe('forecast_compute', seconds)
+    return prediction_data, seconds
+
+
+def _shadow_forecast(candidate, request: ForecastRequest, state) -> tuple:
+    """Candidate forecast on the primary's state and its compute time; the candidate itself is not changed"""
+    start = time.perf_counter()
+    if request.is_batch:
+        # In-process: a sharded run would replace the live model's shard pool with the candidate's
+        prediction_data = candidate.forecast_batch(request.horizon_days, workers=1, state=state)
+    else:
+        prediction_data = run_forecast_prediction(request, candidate, state)
+    return prediction_data, time.perf_counter() - start
+
+
+async def _forecast_and_save(request: ForecastRequest) -> dict:
+    # A cold process loads the model and context here; keep that off the event loop
+    forecaster = await run_in_forecast_executor(get_forecaster)
+    # Captured once: the primary and the shadow run see the same context even if a refresh lands
+    state = forecaster.state
+    prediction_data, forecast_seconds = await run_in_forecast_executor(_timed_forecast, request, forecaster, state)
+    
+    if not prediction_data:
+        raise HTTPException(
+            status_code=404, 
+            detail="No predictions could be generated."
+        )
+    
+    # The candidate model, if one is shadowed, re-runs the request off the response path
+    SHADOW.submit(
+        lambda candidate: call_in_forecast_executor(_shadow_forecast, candidate, request, state),
+        prediction_data, forecast_seconds
+    )
+    
+    # A save that has started is allowed to finish even if the request times out
+    save_result = await asyncio.shield(save_forecasts_to_database_async(
+        predictions=prediction_data,
+        horizon_days=request.horizon_days,
+        model_version=forecaster.model_version,
+        state=state
+    ))
+    
+    if not save_result['success']:
+        print(f"Warning: Failed to save forecasts: {save_result.get('error')}")
+    else:
+        print(f"Database save successful: {save_result['records_saved']} record(s) saved")
+    
+    return {
+        "message": f"Forecast generated successfully for {len(prediction_data)} daily records.",
+        "forecast_data": prediction_data,
+        "model_version": forecaster.model_version
+    }
+
+
+def _profiled_forecast(request: ForecastRequest, forecaster) -> tuple:
+    """
+    Forecast and save in one thread under the profiler; the save's Supabase queries go
+    through a counting client. Returns (prediction_data, profile report).
+    """
+    supabase = CountingSupabaseClient(get_supabase())
+    
+    def forecast_and_save():
+        state = forecaster.state
+        prediction_data = run_forecast_prediction(request, forecaster, state)
+        save_result = save_forecasts_to_database(
+            prediction_data, request.horizon_days, supabase, forecaster.model_version, state
+        ) if prediction_data else None
+        return prediction_data, save_result
+    
+    (prediction_data, save_result), report = profile_call(
+        forecast_and_save, label='forecast', top_n=PROFILE_TOP_N, output_dir=PROFILE_OUTPUT_DIR
+    )
+    report['supabase'] = supabase.counter.report()
+    report['save_result'] = save_result
+    return prediction_data, report
+
+
+async def _profile_forecast_and_save(request: ForecastRequest) -> JSONResponse:
+    """_forecast_and_save under the profiler, with the report added to the response as `profile`"""
+    forecaster = await run_in_forecast_executor(get_forecaster)
     try:
-        prediction_data = run_forecast_prediction(request)
+        prediction_data, report = await run_in_forecast_executor(_profiled_forecast, request, forecaster)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    if not prediction_data:
+        raise HTTPException(
+            status_code=404, 
+            detail="No predictions could be generated."
+        )
+    
+    return JSONResponse(jsonable_encoder({
+        "message": f"Forecast generated successfully for {len(prediction_data)} daily records.",
+        "forecast_data": prediction_data,
+        "model_version": forecaster.model_version,
+        "profile": report
+    }))
+
+
+def _save_streamed_forecasts(final_predictions: list, horizon_days: int, model_version: str, state):
+    """Saves the last day of every streamed product once the stream has finished"""
+    if not final_predictions:
+        return
+    
+    save_result = save_forecasts_to_database(
+        final_predictions, horizon_days, model_version=model_version, state=state
+    )
+    if not save_result['success']:
+        print(f"Warning: Failed to save streamed forecasts: {save_result.get('error')}")
+    else:
+        print(f"Database save successful: {save_result['records_saved']} streamed record(s) saved")
+
+
+async def _open_forecast_stream(request: ForecastRequest) -> StreamingResponse:
+    """
+    Streams the daily rows as NDJSON, one product at a time. Products are forecast
+    STREAM_CHUNK_PRODUCTS at a time in the inference executor, so memory stays flat
+    whatever the catalog size. The first chunk is computed before the response starts,
+    so request errors still get a proper status code.
+    """
+    forecaster = await run_in_forecast_executor(get_forecaster)
+    state = forecaster.state
+    horizon_days = request.horizon_days
+    
+    if request.is_batch:
+        product_ids = state.index.product_ids.tolist()
+        chunks = [
+            product_ids[start:start + STREAM_CHUNK_PRODUCTS]
+            for start in range(0, len(product_ids), STREAM_CHUNK_PRODUCTS)
+        ]
         
-        if not prediction_data:
-            raise HTTPException(
-                status_code=404, 
-                detail="No predictions could be generated."
-            )
+        def forecast_chunk(chunk: list) -> list:
+            return forecaster.forecast_products_grouped(chunk, horizon_days, state=state)
+    elif request.product_id:
+        chunks = [[str(request.product_id)]]
         
-        save_result = save_forecasts_to_database(
-            predictions=prediction_data,
-            horizon_days=request.horizon_days
+        def forecast_chunk(chunk: list) -> list:
+            return [forecaster.forecast_single_product(chunk[0], horizon_days, state=state)]
+    else:
+        # Same error (and 400) as the non-streamed path
+        raise ValueError("Request must specify a 'product_id' or set 'is_batch' to True.")
+    
+    first_chunk = await run_in_forecast_executor(forecast_chunk, chunks[0]) if chunks else []
+    if not first_chunk and len(chunks) <= 1:
+        raise HTTPException(
+            status_code=404, 
+            detail="No predictions could be generated."
         )
+    
+    final_predictions = []
+    
+    async def ndjson_lines():
+        grouped = first_chunk
+        for next_chunk in chunks[1:] + [None]:
+            for product_predictions in grouped:
+                if product_predictions:
+                    final_predictions.append(product_predictions[-1])
+                    yield ''.join(json.dumps(prediction) + '\n' for prediction in product_predictions)
+            
+            if next_chunk is None:
+                break
+            try:
+                grouped = await run_in_forecast_executor(forecast_chunk, next_chunk)
+            except Exception as e:
+                # Headers are already sent; report the failure in-band and end the stream
+                print(f"Streamed forecast failed: {str(e)}")
+                yield json.dumps({'error': str(e)}) + '\n'
+                return
+    
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type=NDJSON_MEDIA_TYPE,
+        background=BackgroundTask(
+            _save_streamed_forecasts, final_predictions, horizon_days, forecaster.model_version, state
+        )
+    )
+
+
+@router.post("/", response_model=ForecastResponse)
+async def generate_inventory_forecast(
+    request: ForecastRequest, http_request: Request, stream: bool = False, profile: bool = False
+):
+    """
+    Generates sales forecast with explainable AI insights.
+    With `stream=true` or `Accept: application/x-ndjson` the daily rows are streamed as NDJSON.
+    With `profile=true` or `X-Profile: true` (admins only) the forecast and save are profiled and
+    the response gains a `profile` report; the request is then never streamed.
+    """
+    try:
+        if profile or http_request.headers.get('x-profile', '').lower() in ('1', 'true'):
+            require_admin(http_request.headers.get('x-admin-token'))
+            return await asyncio.wait_for(_profile_forecast_and_save(request), timeout=FORECAST_REQUEST_TIMEOUT_SECONDS)
         
-        if not save_result['success']:
-            print(f"Warning: Failed to save forecasts: {save_result.get('error')}")
-        else:
-            print(f"Database save successful: {save_result['records_saved']} record(s) saved")
+        if stream or NDJSON_MEDIA_TYPE in http_request.headers.get('accept', ''):
+            return await asyncio.wait_for(_open_forecast_stream(request), timeout=FORECAST_REQUEST_TIMEOUT_SECONDS)
         
-        return {
-            "message": f"Forecast generated successfully for {len(prediction_data)} daily records.",
-            "forecast_data": prediction_data,
-            "model_version": "LightGBM_V3_Optimized"
-        }
+        return await asyncio.wait_for(_forecast_and_save(request), timeout=FORECAST_REQUEST_TIMEOUT_SECONDS)
         
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Forecast did not complete within {FORECAST_REQUEST_TIMEOUT_SECONDS:g} seconds."
+        )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except HTTPException:
@@ -415,4 +833,381 @@ def generate_inventory_forecast(request: ForecastRequest):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+def scenario_grid(request: ScenarioRequest) -> List[Dict[str, Any]]:
+    """Every combination of the requested overrides, optionally led by the observed baseline"""
+    axes = [request.future_price or [None], request.future_discount or [None], request.future_inventory or [None]]
+    grid = [
+        {'price': price, 'discount': discount, 'inventory': inventory}
+        for price, discount, inventory in itertools.product(*axes)
+    ]
+    baseline = {'price': None, 'discount': None, 'inventory': None}
+    if request.include_baseline and grid[0] != baseline:
+        grid.insert(0, baseline)
+    return grid
+
+
+def _nullable_rounded(values: np.ndarray) -> list:
+    return [[None if np.isnan(value) else round(value, 2) for value in row] for row in values.tolist()]
+
+
+def _evaluate_scenarios(request: ScenarioRequest, scenarios: List[Dict[str, Any]]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    forecaster = get_forecaster()
+    result = forecaster.forecast_scenarios(request.product_ids, scenarios, request.horizon_days)
+    if not result['product_ids']:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="None of the requested products were found in historical data."
+        )
+    
+    return {
+        'horizon_days': request.horizon_days,
+        'start_date': result['start_date'].strftime("%Y-%m-%d"),
+        'product_ids': result['product_ids'],
+        'skipped_products': result['skipped_products'],
+        'scenarios': [
+            {'future_price': s['price'], 'future_discount': s['discount'], 'future_inventory': s['inventory']}
+            for s in scenarios
+        ],
+        'demand': _nullable_rounded(result['demand'].sum(axis=2)),
+        'revenue': _nullable_rounded(result['revenue'].sum(axis=2)),
+        'daily_demand': (
+            [_nullable_rounded(product_demand) for product_demand in result['demand']]
+            if request.include_daily else None
+        ),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        'model_version': forecaster.model_version,
+    }
+
+
+@router.post("/scenarios", response_model=ScenarioResponse)
+async def evaluate_forecast_scenarios(request: ScenarioRequest):
+    """
+    What-if grid: demand and revenue for every product under every combination of
+    future price, discount and inventory, evaluated in one vectorized forecast run.
+    """
+    scenarios = scenario_grid(request)
+    rows = len(scenarios) * len(request.product_ids)
+    if rows > MAX_SCENARIO_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{len(scenarios)} scenarios x {len(request.product_ids)} products exceeds the limit of {MAX_SCENARIO_ROWS} rows."
+        )
+    
+    try:
+        return await asyncio.wait_for(
+            run_in_forecast_executor(_evaluate_scenarios, request, scenarios),
+            timeout=FORECAST_REQUEST_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Scenario evaluation did not complete within {FORECAST_REQUEST_TIMEOUT_SECONDS:g} seconds."
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Scenario evaluation failed: {str(e)}"
+        )
+
+
+# Order of the reorder plan: most urgent status first, then fewest days of cover
+REORDER_STATUS_RANK = {STATUS_STOCKOUT_RISK: 0, STATUS_REORDER: 1, STATUS_NO_INVENTORY: 2, STATUS_OK: 3}
+
+
+def _offset_dates(start_date: pd.Timestamp, offsets: np.ndarray) -> list:
+    """start_date + offsets (days) as date strings; None where the offset is NaN"""
+    finite = np.isfinite(offsets)
+    dates = np.datetime64(start_date.date()) + np.where(finite, offsets, 0).astype(np.int64).astype('timedelta64[D]')
+    return [date_str if ok else None for date_str, ok in zip(np.datetime_as_string(dates).tolist(), finite.tolist())]
+
+
+def _rounded_or_none(values: np.ndarray) -> list:
+    return [None if np.isnan(value) else round(value, 2) for value in values.tolist()]
+
+
+def _build_reorder_plan(request: ReorderPlanRequest, forecaster, forecast: Dict[str, Any], inputs: pd.DataFrame, state) -> Dict[str, Any]:
+    """Joins the forecast arrays with stock and reorder settings and ranks the recommendations"""
+    product_ids = forecast['product_ids']
+    inputs = inputs.reindex(pd.Index(product_ids))
+    
+    plan = reorder_plan(
+        forecast['predictions'],
+        inputs['quantity_available'].to_numpy(dtype=np.float64),
+        demand_std(state.index, forecast['positions']),
+        inputs['lead_time_days'].fillna(request.default_lead_time_days).to_numpy(dtype=np.float64),
+        inputs['reorder_level'].to_numpy(dtype=np.float64),
+        inputs['reorder_quantity'].to_numpy(dtype=np.float64),
+        service_level=request.service_level,
+        review_period_days=request.review_period_days
+    )
+    
+    rank = np.array([REORDER_STATUS_RANK[value] for value in plan['status'].tolist()])
+    order = np.lexsort((np.nan_to_num(plan['days_of_cover'], nan=np.inf), rank))
+    if request.actionable_only:
+        order = order[plan['status'][order] != STATUS_OK]
+    
+    start_date = forecast['start_date']
+    stockout_offsets = np.where(plan['stockout_day'] >= 0, plan['stockout_day'], np.nan)
+    columns = {
+        'product_id': [str(product_id) for product_id in product_ids[order].tolist()],
+        'status': plan['status'][order].tolist(),
+        'quantity_on_hand': _rounded_or_none(inputs['quantity_on_hand'].to_numpy(dtype=np.float64)[order]),
+        'quantity_reserved': _rounded_or_none(inputs['quantity_reserved'].to_numpy(dtype=np.float64)[order]),
+        'quantity_available': _rounded_or_none(inputs['quantity_available'].to_numpy(dtype=np.float64)[order]),
+        'forecast_demand': np.round(plan['forecast_demand'][order], 2).tolist(),
+        'average_daily_demand': np.round(plan['average_daily_demand'][order], 2).tolist(),
+        'days_of_cover': _rounded_or_none(plan['days_of_cover'][order]),
+        'stockout_date': _offset_dates(start_date, stockout_offsets[order]),
+        'lead_time_days': plan['lead_time_days'][order].astype(np.int64).tolist(),
+        'safety_stock': np.round(plan['safety_stock'][order], 2).tolist(),
+        'reorder_point': np.round(plan['reorder_point'][order], 2).tolist(),
+        'order_quantity': plan['order_quantity'][order].astype(np.int64).tolist(),
+        'order_by_date': _offset_dates(start_date, plan['order_by_day'][order]),
+    }
+    
+    statuses, counts = np.unique(plan['status'].astype(str), return_counts=True)
+    return {
+        'horizon_days': request.horizon_days,
+        'start_date': start_date.strftime("%Y-%m-%d"),
+        'service_level': request.service_level,
+        'products_evaluated': len(product_ids),
+        'status_counts': dict(zip(statuses.tolist(), counts.tolist())),
+        'recommendations': [dict(zip(columns, values)) for values in zip(*columns.values())],
+        'model_version': forecaster.model_version,
+    }
+
+
+async def _reorder_plan(request: ReorderPlanRequest) -> Dict[str, Any]:
+    start = time.perf_counter()
+    forecaster = await run_in_forecast_executor(get_forecaster)
+    state = forecaster.state
+    
+    if request.product_ids is None:
+        product_ids = state.index.product_ids.tolist()
+    else:
+        # API product IDs are strings; the context holds integer IDs
+        product_ids = [int(product_id) if product_id.isdigit() else product_id for product_id in request.product_ids]
+    
+    # The forecast and the bulk stock/settings read are independent
+    forecast, inputs = await asyncio.gather(
+        run_in_forecast_executor(forecaster.forecast_matrix, product_ids, request.horizon_days, state),
+        asyncio.to_thread(fetch_reorder_inputs, get_supabase())
+    )
+    if len(forecast['product_ids']) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="None of the requested products could be forecast."
+        )
+    
+    result = await asyncio.to_thread(_build_reorder_plan, request, forecaster, forecast, inputs, state)
+    forecast_ids = {str(product_id) for product_id in forecast['product_ids'].tolist()}
+    result['skipped_products'] = [str(product_id) for product_id in product_ids if str(product_id) not in forecast_ids]
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+@router.post("/reorder-plan", response_model=ReorderPlanResponse)
+async def create_reorder_plan(request: ReorderPlanRequest):
+    """
+    Projected stock-out date, days of cover, safety stock and suggested order quantity of
+    every product, from the forecast curve, one bulk read of inventory and the products'
+    reorder settings. Computed in one vectorized pass.
+    """
+    try:
+        return await asyncio.wait_for(_reorder_plan(request), timeout=FORECAST_REQUEST_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Reorder plan did not complete within {FORECAST_REQUEST_TIMEOUT_SECONDS:g} seconds."
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reorder plan failed: {str(e)}"
+        )
+
+
+@router.get("/cache")
+def get_forecast_cache_stats():
+    """Hit/miss counters and memory use of the horizon-prefix forecast cache"""
+    return get_forecaster().cache.stats()
+
+
+@router.get("/memory")
+def get_context_memory():
+    """Bytes per context column before and after compaction, and the current footprint"""
+    return context_memory_usage()
+
+
+def run_alerts(horizon_days: int = ALERT_HORIZON_DAYS) -> Dict[str, Any]:
+    """Runs the alert engine over the whole catalog with the live forecaster"""
+    return run_alert_engine(get_forecaster(), get_supabase(), horizon_days)
+
+
+def _alerts_after_job(job: Dict[str, Any]):
+    # The job has just forecast every product, so the engine is served from the forecast cache
+    run_alerts(job['horizon_days'])
+
+
+# Background batch jobs save each chunk of products as soon as it is forecast, then raise alerts
+JOB_RUNNER = ForecastJobRunner(save_chunk=save_forecasts_to_database, on_complete=_alerts_after_job)
+
+
+@router.post("/jobs", response_model=ForecastJobStatus, status_code=status.HTTP_202_ACCEPTED)
+def create_forecast_job(request: ForecastJobRequest):
+    """Queues a batch forecast of every product and returns its job ID right away"""
+    job = JOB_RUNNER.submit(request.horizon_days)
+    return job_progress(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ForecastJobStatus)
+def get_forecast_job(job_id: str):
+    """Reports a job's processed/total products, throughput and ETA"""
+    job = JOB_RUNNER.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Forecast job '{job_id}' not found.")
+    return job_progress(job)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ForecastJobStatus)
+def cancel_forecast_job(job_id: str):
+    """Cancels a queued job, or stops a running job after its current chunk"""
+    job = JOB_RUNNER.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Forecast job '{job_id}' not found.")
+    return job_progress(job)
+
+
+@router.post("/refresh", dependencies=[Depends(require_admin)])
+def refresh_forecast_context():
+    """Pulls new historical data into the running forecaster without a restart"""
+    try:
+        return refresh_forecaster_context()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Context refresh failed: {str(e)}"
+        )
+
+
+@router.post("/alerts/run", dependencies=[Depends(require_admin)])
+async def run_forecast_alerts(horizon_days: int = ALERT_HORIZON_DAYS):
+    """
+    Evaluates the stock-out, forecast deviation and declining trend rules over every product
+    and inserts the alerts that are not already open
+    """
+    try:
+        return await run_in_forecast_executor(run_alerts, horizon_days)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Alert run failed: {str(e)}"
+        )
+
+
+def _run_and_save_backtest():
+    forecaster = get_forecaster()
+    backtest = run_backtest(forecaster)
+    write_result = write_backtest_metrics(get_supabase(), backtest, forecaster.model_version)
+    return {**backtest_summary(backtest), **write_result}
+
+
+@router.post("/backtest", dependencies=[Depends(require_admin)])
+async def run_forecast_backtest():
+    """Rolling-origin backtest of the loaded model; per-product/category/horizon errors go to model_metrics"""
+    try:
+        return await run_in_forecast_executor(_run_and_save_backtest)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Backtest failed: {str(e)}"
+        )
+
+
+@router.get("/models", dependencies=[Depends(require_admin)])
+def list_model_versions():
+    """Registered model versions, the one serving, the last swap and the shadow comparison"""
+    try:
+        versions = MODEL_REGISTRY.versions()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not read the model registry: {str(e)}")
+    
+    return {
+        'active_version': get_forecaster().model_version,
+        'registry_dir': MODEL_REGISTRY.directory,
+        'versions': versions,
+        'swap': MODEL_SWAP.status(),
+        'shadow': SHADOW.stats(),
+    }
+
+
+@router.post("/models/activate", dependencies=[Depends(require_admin)], status_code=status.HTTP_202_ACCEPTED)
+def activate_model(request: ModelActivationRequest):
+    """
+    Loads a registry version in the background, validates it on a sample of products and
+    swaps it in atomically; poll GET /forecast/models/swap for the outcome
+    """
+    try:
+        MODEL_REGISTRY.spec(request.version)
+        return MODEL_SWAP.start(request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/models/swap", dependencies=[Depends(require_admin)])
+def get_model_swap_status():
+    """Status of the last model swap: loading, active or failed"""
+    return MODEL_SWAP.status()
+
+
+def _load_shadow_candidate(version: str) -> tuple:
+    candidate = load_candidate_forecaster(version)
+    validation = validate_forecaster(candidate, reference=get_forecaster())
+    # Shadow runs always compute, so the comparison measures the model rather than cache hits
+    candidate.cache = ForecastCache(max_bytes=0)
+    return candidate, validation
+
+
+@router.post("/models/shadow", dependencies=[Depends(require_admin)])
+async def start_model_shadow(request: ShadowRequest):
+    """Loads and validates a candidate version, then scores it on a sample of live forecast requests"""
+    try:
+        candidate, validation = await asyncio.to_thread(_load_shadow_candidate, request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Could not load model version '{request.version}': {str(e)}"
+        )
+    
+    SHADOW.start(candidate, request.version, request.sample_rate)
+    return {'shadow': SHADOW.stats(), 'validation': validation}
+
+
+@router.get("/models/shadow", dependencies=[Depends(require_admin)])
+def get_model_shadow():
+    """Latency and predicted-quantity comparison of the shadowed candidate against the live model"""
+    return SHADOW.stats()
+
+
+@router.delete("/models/shadow", dependencies=[Depends(require_admin)])
+def stop_model_shadow():
+    """Stops shadow scoring and returns the final comparison"""
+    return SHADOW.stop()
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+from typing import Optional
+import asyncio
+import tempfile
+
+import models.prediction_model as prediction_model
+from models.sales_ingest import create_upload, ingest_sales_csv, read_header, UPLOAD_STATUS_PROCESSING
+from database.supabase_client import get_supabase
+from routes.dependencies import require_admin
+from utils.metrics import METRICS
+from config import SALES_INGEST_CHUNK_ROWS, SALES_INGEST_BATCH_SIZE, SALES_INGEST_SPOOL_MB
+
+router = APIRouter(prefix="/sales", tags=["Sales"])
+
+
+def _ingest_and_refresh(spool, upload_id: int):
+    """Background part of an upload: ingest the spooled CSV, then refresh the forecaster's context."""
+    try:
+        summary = ingest_sales_csv(
+            get_supabase(), spool, upload_id,
+            chunk_rows=SALES_INGEST_CHUNK_ROWS, batch_size=SALES_INGEST_BATCH_SIZE
+        )
+    except Exception as e:
+        METRICS.record_error()
+        print(f"Sales upload {upload_id} failed: {e}")
+        return
+    finally:
+        spool.close()
+
+    print(f"Sales upload {upload_id}: {summary}")
+
+    # A process that has not loaded the forecaster yet reads the new rows on its first load
+    if summary['days_written'] and prediction_model.FORECASTER is not None:
+        try:
+            result = prediction_model.refresh_forecaster_context(since_date=summary['since_date'])
+            print(f"Context refresh after sales upload {upload_id}: {result}")
+        except Exception as e:
+            METRICS.record_error()
+            print(f"Context refresh after sales upload {upload_id} failed: {e}")
+
+
+@router.post("/uploads", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_admin)])
+async def upload_sales_csv(request: Request, file_name: Optional[str] = None):
+    """
+    Bulk-loads a sales CSV (the raw request body, e.g. `curl --data-binary @sales.csv`)
+    into daily historical_data rows.
+
+    Required columns are sale_date (YYYY-MM-DD), product_id and quantity; revenue (or
+    unit_price), inventory_start and inventory_end are optional. Sales are added to days
+    already stored, so a file must only be uploaded once. The body is spooled to a
+    temporary file (on disk past SALES_INGEST_SPOOL_MB) while it is received, the header
+    is checked, and the ingest runs after the response: poll GET /sales/uploads/{upload_id}
+    for its progress.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=int(SALES_INGEST_SPOOL_MB * 1024 * 1024))
+    try:
+        received = 0
+        async for chunk in request.stream():
+            spool.write(chunk)
+            received += len(chunk)
+        if received == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The request body is empty.")
+        spool.seek(0)
+
+        try:
+            read_header(spool)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        upload_id = await asyncio.to_thread(create_upload, get_supabase(), file_name or 'upload.csv')
+    except BaseException:
+        spool.close()
+        raise
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={'upload_id': upload_id, 'status': UPLOAD_STATUS_PROCESSING, 'bytes_received': received},
+        background=BackgroundTask(_ingest_and_refresh, spool, upload_id)
+    )
+
+
+@router.get("/uploads/{upload_id}")
+def get_sales_upload(upload_id: int):
+    """Progress of a sales upload: its sales_uploads row."""
+    result = get_supabase().table('sales_uploads').select('*').eq('upload_id', upload_id).limit(1).execute()
+    if not result.data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Upload {upload_id} not found.")
+    return result.data[0]
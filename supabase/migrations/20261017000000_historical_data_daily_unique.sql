@@ -0,0 +1,13 @@
+-- One historical_data row per product, day and period type: the conflict target of the
+-- bulk sales upload's upsert (on_conflict=product_id,history_date,period_type).
+
+-- Keep the earliest row of any existing duplicates so the index can be built
+DELETE FROM public.historical_data AS duplicate
+USING public.historical_data AS kept
+WHERE duplicate.product_id = kept.product_id
+  AND duplicate.history_date = kept.history_date
+  AND duplicate.period_type IS NOT DISTINCT FROM kept.period_type
+  AND duplicate.history_id > kept.history_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS historical_data_product_date_period_key
+  ON public.historical_data (product_id, history_date, period_type);
@@ -0,0 +1,49 @@
+-- One system_metrics row per day, added to atomically by every process's metrics flush
+-- (utils/metrics.py flush_daily_rollups calls add_system_metrics through PostgREST RPC).
+
+-- Fold any duplicate rows of a day into its lowest metric_id so the index can be built
+WITH merged AS (
+  SELECT metric_date,
+         MIN(metric_id) AS kept,
+         SUM(total_forecasts_generated) AS total_forecasts_generated,
+         SUM(errors_logged) AS errors_logged,
+         MAX(peak_memory_usage_mb) AS peak_memory_usage_mb
+  FROM public.system_metrics
+  GROUP BY metric_date
+  HAVING COUNT(*) > 1
+)
+UPDATE public.system_metrics AS stored
+SET total_forecasts_generated = merged.total_forecasts_generated,
+    errors_logged = merged.errors_logged,
+    peak_memory_usage_mb = merged.peak_memory_usage_mb
+FROM merged
+WHERE stored.metric_id = merged.kept;
+
+DELETE FROM public.system_metrics AS duplicate
+USING public.system_metrics AS kept
+WHERE duplicate.metric_date = kept.metric_date
+  AND duplicate.metric_id > kept.metric_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS system_metrics_metric_date_key
+  ON public.system_metrics (metric_date);
+
+-- Adds one flush's counter deltas to the day's row in a single statement; peak memory keeps
+-- the maximum and the average response time is the latest flushing process's average.
+CREATE OR REPLACE FUNCTION public.add_system_metrics(
+  p_metric_date date,
+  p_forecasts integer,
+  p_errors integer,
+  p_peak_memory_mb numeric,
+  p_avg_response_time_ms numeric
+) RETURNS void
+LANGUAGE sql
+AS $$
+  INSERT INTO public.system_metrics AS stored
+    (metric_date, total_forecasts_generated, errors_logged, peak_memory_usage_mb, avg_response_time_ms)
+  VALUES (p_metric_date, p_forecasts, p_errors, p_peak_memory_mb, p_avg_response_time_ms)
+  ON CONFLICT (metric_date) DO UPDATE SET
+    total_forecasts_generated = COALESCE(stored.total_forecasts_generated, 0) + EXCLUDED.total_forecasts_generated,
+    errors_logged = COALESCE(stored.errors_logged, 0) + EXCLUDED.errors_logged,
+    peak_memory_usage_mb = GREATEST(stored.peak_memory_usage_mb, EXCLUDED.peak_memory_usage_mb),
+    avg_response_time_ms = COALESCE(EXCLUDED.avg_response_time_ms, stored.avg_response_time_ms);
+$$;
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Tests import the app's top-level packages (models, database, ...) from the repository root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import models.prediction_model as prediction_model
+from database.fake_client import FakeSupabaseClient
+from database.supabase_client import set_supabase
+
+N_PRODUCTS = 40
+HISTORY_DAYS = 90
+
+
+def synthetic_tables(seed: int = 7):
+    """products and daily historical_data rows, with short, stale and unusable histories mixed in."""
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp.today().normalize()
+    products = [
+        {
+            'product_id': product_id, 'product_name': f'Product {product_id}',
+            'category_id': int(rng.integers(1, 6)), 'unit_price': float(round(rng.uniform(5, 800), 2)),
+        }
+        for product_id in range(1, N_PRODUCTS + 1)
+    ]
+
+    history = []
+    for product in products:
+        product_id = product['product_id']
+        first_day = int(rng.integers(HISTORY_DAYS - 20, HISTORY_DAYS)) if product_id % 7 == 0 else 0  # short history
+        last_day = HISTORY_DAYS - int(rng.integers(1, 40)) if product_id % 5 == 0 else HISTORY_DAYS  # stale history
+        for day in range(first_day, last_day):
+            units = int(max(0, rng.normal(10 + product_id % 13, 4)))
+            inventory = int(rng.integers(-5, 400))
+            if product_id == 3 and day == last_day - 1:
+                inventory = None  # no stock category, so the product cannot be forecast
+            history.append({
+                'history_id': len(history) + 1,
+                'history_date': (today - pd.Timedelta(days=HISTORY_DAYS - day)).strftime('%Y-%m-%d'),
+                'product_id': product_id,
+                'units_sold': units,
+                'sales_revenue': units * product['unit_price'],
+                'inventory_start': inventory,
+                'inventory_end': inventory,
+                'period_type': 'daily',
+            })
+    return {'products': products, 'historical_data': history}
+
+
+@pytest.fixture(scope='session')
+def tables():
+    return synthetic_tables()
+
+
+@pytest.fixture(scope='session')
+def supabase(tables):
+    """The in-memory database every test module shares; tests only write tables other than the history."""
+    client = FakeSupabaseClient(tables)
+    previous = set_supabase(client)
+    yield client
+    set_supabase(previous)
+
+
+@pytest.fixture(scope='session')
+def forecaster(supabase):
+    """The live forecaster (get_forecaster()), loaded from the shared in-memory database."""
+    with pytest.MonkeyPatch.context() as patch:
+        # Model and encoder paths are relative to the repository root
+        patch.chdir(REPO_ROOT)
+        patch.setattr(prediction_model, 'CONTEXT_SNAPSHOT_ENABLED', False)
+        patch.setattr(prediction_model, 'FORECASTER', None)
+        yield prediction_model.get_forecaster()
@@ -0,0 +1,78 @@
+"""
+The original forecasting code, kept as the reference the vectorized code is pinned to:
+the uncompacted float64 context and the per-product recursion that forecast one day
+at a time from a one-row DataFrame, with one model.predict call per day.
+"""
+import numpy as np
+import pandas as pd
+
+import models.prediction_model as prediction_model
+
+
+def original_context(tables) -> pd.DataFrame:
+    """The context as the original loader built it: float64 columns straight from the rows, never compacted."""
+    history = pd.DataFrame(tables['historical_data']).drop(columns=['history_id'])
+    context = prediction_model._prepare_historical_rows(history, pd.DataFrame(tables['products']))
+    context = prediction_model._encode_categoricals(context)
+    return context.sort_values('Date').reset_index(drop=True)
+
+
+def reference_forecast(forecaster, history: pd.DataFrame, product_id, horizon_days: int, anchor=None):
+    """
+    The original per-product loop, anchored at `anchor` (default: today, as the original was)
+    over the rows of `history` up to it. Returns None when the product cannot be forecast.
+    """
+    latest_date = pd.Timestamp.today().normalize() if anchor is None else pd.Timestamp(anchor)
+    rows = history[(history['Product ID'] == product_id) & (history['Date'] <= latest_date)]
+    if rows.empty:
+        return None
+    context = rows.iloc[-1]
+    lookback_start = latest_date - pd.Timedelta(days=30)
+    sales_history = rows[rows['Date'] >= lookback_start].sort_values('Date')['Units Sold'].astype(float).tolist()
+    discount = float(context['Discount']) if 'Discount' in context else 0.0
+
+    predictions = []
+    dates = pd.date_range(start=latest_date + pd.Timedelta(days=1), periods=horizon_days, freq='D')
+    for date in dates:
+        stock_category = pd.cut(
+            [float(context['Inventory Level'])], bins=[0, 50, 200, np.inf],
+            labels=['critical_low', 'medium', 'high'], right=False, include_lowest=True
+        ).astype(str)[0]
+        if pd.isna(stock_category) or stock_category == 'nan':
+            return None  # No stock category: the original loop raised and skipped the product
+
+        last_known_sale = sales_history[-1] if sales_history else 0
+        features = {
+            'Price': float(context['Price']),
+            'Inventory Level': float(context['Inventory Level']),
+            'Store ID_encoded': float(context['Store ID_encoded']),
+            'Product ID_encoded': float(context['Product ID_encoded']),
+            'Category_encoded': float(context['Category_encoded']),
+            'day_of_week': date.dayofweek,
+            'is_weekend': int(date.dayofweek >= 5),
+            'month': date.month,
+            'year': date.year,
+            'month_sin': np.sin(2 * np.pi * date.month / 12),
+            'month_cos': np.cos(2 * np.pi * date.month / 12),
+            'effective_price': float(context['Price']) * (1 - discount / 100),
+            'discount_active': int(discount > 0),
+            'stock_category_simple_encoded': ['critical_low', 'medium', 'high'].index(stock_category),
+            'sales_lag_1': sales_history[-1] if len(sales_history) >= 1 else last_known_sale,
+            'sales_lag_7': sales_history[-7] if len(sales_history) >= 7 else last_known_sale,
+            'sales_lag_30': sales_history[-30] if len(sales_history) >= 30 else last_known_sale,
+            'sales_rolling_mean_30': np.mean(sales_history[-30:]) if sales_history else last_known_sale,
+        }
+        X = pd.DataFrame([features])[forecaster.feature_columns]
+        units = max(0, forecaster.model.predict(X)[0])
+        sales_history.append(units)
+
+        predictions.append({
+            'date': date.strftime('%Y-%m-%d'),
+            'product_id': str(product_id),
+            'units': units,
+            'predicted_quantity': int(round(units)),
+            'predicted_revenue': round(units * float(context['Price']), 2),
+            'confidence_lower': None,
+            'confidence_upper': None,
+        })
+    return predictions
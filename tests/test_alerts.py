@@ -0,0 +1,95 @@
+"""
+The batch alert engine: rule evaluation across the catalog, and deduplication against
+open alerts of the same product and type, where an alert with is_resolved NULL is open.
+"""
+import numpy as np
+import pytest
+
+from database.fake_client import FakeSupabaseClient
+from models.alerts import (
+    ALERT_TYPE_DECLINING, ALERT_TYPE_DEVIATION, ALERT_TYPE_STOCKOUT, evaluate_alert_rules, run_alert_engine
+)
+
+HORIZON_DAYS = 14
+
+
+@pytest.fixture
+def client(tables):
+    """Products with reorder settings, and stock only for products 1 (nearly out) and 2 (plenty)."""
+    products = [
+        {**product, 'sku': f"SKU-{product['product_id']}", 'reorder_level': 0, 'reorder_quantity': 10, 'supplier_id': None}
+        for product in tables['products']
+    ]
+    return FakeSupabaseClient({
+        'products': products,
+        'inventory': [
+            {'inventory_id': 1, 'product_id': 1, 'quantity_on_hand': 1, 'quantity_reserved': 0, 'quantity_available': 1},
+            {'inventory_id': 2, 'product_id': 2, 'quantity_on_hand': 100000, 'quantity_reserved': 0, 'quantity_available': 100000},
+        ],
+        'suppliers': [],
+        'alerts': [],
+    })
+
+
+def open_keys(client):
+    return sorted((row['product_id'], row['alert_type']) for row in client.tables['alerts'])
+
+
+def test_rules_and_severities():
+    alerts = evaluate_alert_rules(
+        np.array([1, 2, 3]),
+        predictions=np.array([[10.0] * 7, [1.0] * 7, [2.0] * 7]),
+        days_of_cover=np.array([0.5, 2.5, np.nan]),
+        average_daily=np.array([10.0, 1.0, 1.0]),
+        trend_percent=np.array([0.0, -30.0, -12.0]),
+        stockout_days=3, deviation_percent=50, decline_percent=10
+    )
+    triggered = {(row['product_id'], row['alert_type']): row['severity'] for row in alerts.to_dict('records')}
+
+    assert triggered == {
+        (1, ALERT_TYPE_STOCKOUT): 'critical',
+        (2, ALERT_TYPE_STOCKOUT): 'medium',
+        (3, ALERT_TYPE_DEVIATION): 'high',  # 14 units forecast against 7 historically: +100%
+        (2, ALERT_TYPE_DECLINING): 'high',
+        (3, ALERT_TYPE_DECLINING): 'medium',
+    }
+
+
+def test_open_alerts_are_not_repeated(forecaster, client):
+    first = run_alert_engine(forecaster, client, HORIZON_DAYS)
+    stored = open_keys(client)
+
+    assert first['alerts_inserted'] == first['alerts_triggered'] == len(stored) > 0
+    assert (1, ALERT_TYPE_STOCKOUT) in stored
+    assert len(set(stored)) == len(stored)
+
+    second = run_alert_engine(forecaster, client, HORIZON_DAYS)
+    assert second['alerts_inserted'] == 0
+    assert second['already_open'] == second['alerts_triggered'] == first['alerts_triggered']
+    assert open_keys(client) == stored
+
+
+def test_resolved_alerts_are_raised_again(forecaster, client):
+    run_alert_engine(forecaster, client, HORIZON_DAYS)
+    for row in client.tables['alerts']:
+        if row['alert_type'] == ALERT_TYPE_STOCKOUT:
+            row['is_resolved'] = True
+
+    rerun = run_alert_engine(forecaster, client, HORIZON_DAYS)
+    stockout_alerts = [row for row in client.tables['alerts'] if row['alert_type'] == ALERT_TYPE_STOCKOUT]
+
+    assert rerun['alerts_inserted'] == len(stockout_alerts) // 2 > 0
+    assert rerun['new_alerts'].keys() == {ALERT_TYPE_STOCKOUT}
+
+
+def test_alerts_without_is_resolved_are_open(forecaster, client):
+    client.tables['alerts'] = [
+        {'alert_id': 1, 'product_id': 1, 'alert_type': ALERT_TYPE_STOCKOUT, 'is_resolved': None},
+        {'alert_id': 2, 'product_id': None, 'alert_type': ALERT_TYPE_STOCKOUT, 'is_resolved': False},
+    ]
+
+    result = run_alert_engine(forecaster, client, HORIZON_DAYS)
+    new_keys = [(row['product_id'], row['alert_type']) for row in client.tables['alerts'][2:]]
+
+    assert result['already_open'] == 1
+    assert (1, ALERT_TYPE_STOCKOUT) not in new_keys
@@ -0,0 +1,85 @@
+"""
+The rolling-origin backtest replays every (product, origin) pair in vectorized runs;
+its errors must match those of the original per-product loop anchored at each origin,
+scored against the actual sales of the days after it.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from database.fake_client import FakeSupabaseClient
+from models.backtest import backtest_origins, model_metrics_rows, run_backtest, write_backtest_metrics
+from original_forecaster import original_context, reference_forecast
+
+HORIZON_DAYS = 7
+N_ORIGINS = 2
+ORIGIN_STEP_DAYS = 7
+
+
+@pytest.fixture(scope='module')
+def backtest(forecaster):
+    return run_backtest(forecaster, horizons=(HORIZON_DAYS,), n_origins=N_ORIGINS, origin_step_days=ORIGIN_STEP_DAYS)
+
+
+@pytest.fixture(scope='module')
+def reference_errors(forecaster, tables):
+    """(product_id, forecast - actual, actual) of every forecast day of the original loop; NaN without an actual."""
+    history = original_context(tables)
+    actuals = history.set_index(['Product ID', 'Date'])['Units Sold']
+    origins = backtest_origins(history['Date'].max(), HORIZON_DAYS, N_ORIGINS, ORIGIN_STEP_DAYS)
+
+    errors = []
+    for origin in origins:
+        for product_id in forecaster.state.index.product_ids.tolist():
+            predictions = reference_forecast(forecaster, history, product_id, HORIZON_DAYS, anchor=origin)
+            for prediction in predictions or []:
+                actual = float(actuals.get((product_id, pd.Timestamp(prediction['date'])), np.nan))
+                errors.append((product_id, prediction['units'] - actual, actual))
+    return pd.DataFrame(errors, columns=['product_id', 'error', 'actual'])
+
+
+def summary(errors: pd.DataFrame) -> dict:
+    """Error metrics over the days with an actual, as the backtest leaves days without a history row out."""
+    errors = errors.dropna(subset=['actual'])
+    with_sales = errors[errors['actual'] > 0]
+    return {
+        'observations': len(errors),
+        'mae': errors['error'].abs().mean(),
+        'rmse': np.sqrt((errors['error'] ** 2).mean()),
+        'bias': errors['error'].mean(),
+        'mape': (with_sales['error'].abs() / with_sales['actual'] * 100).mean(),
+    }
+
+
+def test_overall_errors_match_per_product_loop(backtest, reference_errors):
+    overall, = [result for result in backtest['results'] if result['scope'] == 'overall']
+    expected = summary(reference_errors)
+
+    assert overall['observations'] == expected['observations']
+    assert overall['products'] == reference_errors['product_id'].nunique()
+    for metric in ('mae', 'rmse', 'bias', 'mape'):
+        assert overall[metric] == pytest.approx(expected[metric], abs=1e-3)
+
+
+def test_product_errors_match_per_product_loop(backtest, reference_errors):
+    products = {int(result['key']): result for result in backtest['results'] if result['scope'] == 'product'}
+    observed = reference_errors.dropna(subset=['actual'])
+
+    assert set(products) == set(observed['product_id'])
+    for product_id, errors in observed.groupby('product_id'):
+        expected = summary(errors)
+        assert products[product_id]['observations'] == expected['observations']
+        assert products[product_id]['mae'] == pytest.approx(expected['mae'], abs=1e-3)
+
+
+def test_metrics_are_replaced_on_a_rerun(backtest):
+    client = FakeSupabaseClient({'model_metrics': []})
+    write_backtest_metrics(client, backtest, 'v-test')
+    written = write_backtest_metrics(client, backtest, 'v-test')
+
+    rows = client.tables['model_metrics']
+    assert written['rows_written'] == len(rows) == len(model_metrics_rows(backtest, 'v-test'))
+    overall = [row for row in rows if json.loads(row['notes'])['scope'] == 'overall']
+    assert len(overall) == 1 and overall[0]['evaluation_period'] == f'{HORIZON_DAYS} Days'
@@ -0,0 +1,43 @@
+"""
+Pins the vectorized batch engine to the per-product recursion it replaced: every
+product is forecast one day at a time from a one-row DataFrame of the original,
+uncompacted float64 context, exactly as the original ForecastingManager did, and
+the rows must match forecast_batch's.
+"""
+import pytest
+
+from original_forecaster import original_context, reference_forecast
+
+
+@pytest.fixture(scope='module')
+def history(tables):
+    return original_context(tables)
+
+
+@pytest.mark.parametrize('horizon_days', [1, 7, 30, 45])
+def test_batch_matches_per_product_loop(forecaster, history, horizon_days):
+    forecaster.cache.clear()
+    expected = []
+    for product_id in forecaster.state.index.product_ids:
+        product_predictions = reference_forecast(forecaster, history, product_id, horizon_days)
+        if product_predictions is not None:
+            expected.extend({key: value for key, value in row.items() if key != 'units'} for row in product_predictions)
+
+    assert len(expected) > 0
+    assert forecaster.forecast_batch(horizon_days, workers=1) == expected
+
+
+def test_batch_skips_products_without_stock_category(forecaster, tables):
+    forecast_products = {row['product_id'] for row in forecaster.forecast_batch(7, workers=1)}
+
+    assert '3' not in forecast_products
+    assert len(forecast_products) == len(tables['products']) - 1
+
+
+def test_cached_batch_matches_fresh_batch(forecaster):
+    forecaster.cache.clear()
+    fresh = forecaster.forecast_batch(30, workers=1)
+    forecaster.cache.clear()
+    forecaster.forecast_batch(7, workers=1)  # Leaves 7-day prefixes for the 30-day run to continue from
+
+    assert forecaster.forecast_batch(30, workers=1) == fresh
@@ -0,0 +1,124 @@
+"""
+Background batch forecast jobs: a job runs every product in chunks, saves each chunk
+with the producing model's version and reports progress; a cancel stops a queued job
+before it starts and a running job after its current chunk.
+"""
+import threading
+import time
+
+import pytest
+
+from models.forecast_jobs import ForecastJobRunner, ForecastJobStore, TERMINAL_STATUSES, job_progress
+
+CHUNK_SIZE = 7
+
+
+class RecordingSave:
+    """save_chunk stand-in recording every chunk; with `hold` set, the first chunk waits for `release`."""
+    def __init__(self, hold: bool = False):
+        self.chunks = []
+        self.hold = hold
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, predictions, horizon_days, model_version=None, state=None):
+        self.chunks.append({
+            'predictions': predictions, 'horizon_days': horizon_days, 'model_version': model_version, 'state': state
+        })
+        if self.hold and len(self.chunks) == 1:
+            self.entered.set()
+            assert self.release.wait(30)
+        return {'success': True, 'records_saved': len({p['product_id'] for p in predictions})}
+
+
+def wait_for(runner: ForecastJobRunner, job_id: str, statuses=TERMINAL_STATUSES, timeout: float = 60) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} still {runner.get(job_id)['status']} after {timeout}s")
+
+
+@pytest.fixture
+def make_runner(tmp_path):
+    runners = []
+
+    def make(save_chunk):
+        runner = ForecastJobRunner(
+            save_chunk, store=ForecastJobStore(str(tmp_path / 'jobs.sqlite3')), workers=1, chunk_size=CHUNK_SIZE
+        )
+        runners.append(runner)
+        return runner
+
+    yield make
+    for runner in runners:
+        runner.shutdown()
+
+
+def test_job_forecasts_every_product_in_chunks(forecaster, make_runner):
+    save = RecordingSave()
+    runner = make_runner(save)
+
+    job = wait_for(runner, runner.submit(7)['job_id'])
+
+    product_ids = forecaster.state.index.product_ids.tolist()
+    assert job['status'] == 'completed'
+    assert job['total_products'] == job['processed_products'] == len(product_ids)
+    assert job['records_saved'] == sum(len({p['product_id'] for p in chunk['predictions']}) for chunk in save.chunks)
+    assert all(chunk['horizon_days'] == 7 and chunk['model_version'] == forecaster.model_version for chunk in save.chunks)
+    assert all(chunk['state'] is forecaster.state for chunk in save.chunks)
+
+    forecaster.cache.clear()
+    saved = [prediction for chunk in save.chunks for prediction in chunk['predictions']]
+    assert saved == forecaster.forecast_batch(7, workers=1)
+
+    progress = job_progress(job)
+    assert progress['percent_complete'] == 100.0
+    assert progress['eta_seconds'] is None
+
+
+def test_cancel_stops_a_running_job_after_its_chunk(forecaster, make_runner):
+    save = RecordingSave(hold=True)
+    runner = make_runner(save)
+    job_id = runner.submit(7)['job_id']
+    assert save.entered.wait(30)
+
+    cancelling = runner.cancel(job_id)
+    assert cancelling['status'] == 'running' and cancelling['cancel_requested'] == 1
+    save.release.set()
+
+    job = wait_for(runner, job_id)
+    assert job['status'] == 'cancelled'
+    assert job['processed_products'] == CHUNK_SIZE
+    assert len(save.chunks) == 1
+
+
+def test_cancel_of_a_queued_job_is_immediate(forecaster, make_runner):
+    save = RecordingSave(hold=True)
+    runner = make_runner(save)
+    running_id = runner.submit(7)['job_id']
+    assert save.entered.wait(30)
+
+    # The only worker is busy, so this job is still queued
+    queued_id = runner.submit(14)['job_id']
+    cancelled = runner.cancel(queued_id)
+    assert cancelled['status'] == 'cancelled'
+    assert cancelled['started_at'] is None
+
+    save.release.set()
+    assert wait_for(runner, running_id)['status'] == 'completed'
+    assert wait_for(runner, queued_id)['status'] == 'cancelled'
+    assert all(chunk['horizon_days'] == 7 for chunk in save.chunks)
+
+
+def test_jobs_of_an_exited_process_are_failed(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    store = ForecastJobStore(path)
+    job = store.create(7)
+    store.update(job['job_id'], owner='another-boot:1')
+
+    assert store.fail_orphaned_jobs() == 1
+    assert store.get(job['job_id'])['status'] == 'failed'
+    store.close()
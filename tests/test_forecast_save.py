@@ -0,0 +1,65 @@
+"""
+save_forecasts_to_database fetches the products and history of every forecast product in
+bulk; its records must be identical to those of the original per-product save, which
+queried each product's details and history separately.
+"""
+import random
+
+import pytest
+
+from routes.forecasting import (
+    enhance_prediction_with_context, forecast_period_label, generate_explanation, save_forecasts_to_database
+)
+
+
+def per_product_records(supabase, predictions: list, horizon_days: int, model_version: str) -> list:
+    """The original save loop: the final forecast of each product, enhanced and explained one product at a time."""
+    final = {}
+    for prediction in predictions:
+        if prediction['product_id'] not in final or prediction['date'] > final[prediction['product_id']]['date']:
+            final[prediction['product_id']] = prediction
+
+    records = []
+    for product_id, final_prediction in final.items():
+        enhanced = enhance_prediction_with_context(int(product_id), horizon_days, supabase)
+        quantity = enhanced['predicted_quantity'] if enhanced else final_prediction['predicted_quantity']
+        revenue = enhanced['predicted_revenue'] if enhanced else final_prediction['predicted_revenue']
+        records.append({
+            'product_id': int(product_id),
+            'forecast_date': final_prediction['date'],
+            'forecast_period': forecast_period_label(horizon_days),
+            'predicted_quantity': quantity,
+            'predicted_revenue': revenue,
+            'confidence_lower': final_prediction.get('confidence_lower'),
+            'confidence_upper': final_prediction.get('confidence_upper'),
+            'model_version': model_version,
+            'explanation': generate_explanation(int(product_id), quantity, revenue, horizon_days, supabase),
+        })
+    return records
+
+
+@pytest.mark.parametrize('horizon_days', [7, 30])
+def test_bulk_save_matches_per_product_save(supabase, forecaster, horizon_days):
+    predictions = forecaster.forecast_batch(horizon_days, workers=1)
+    # Enhancement draws from `random`; both saves start from the same seed and draw in product order
+    random.seed(horizon_days)
+    expected = per_product_records(supabase, predictions, horizon_days, forecaster.model_version)
+
+    supabase.tables['forecasts'] = []
+    random.seed(horizon_days)
+    result = save_forecasts_to_database(predictions, horizon_days, supabase=supabase, state=forecaster.state)
+
+    saved = [{key: value for key, value in record.items() if key != 'generated_at'} for record in supabase.tables['forecasts']]
+    assert result['success'] and result['records_saved'] == len(expected)
+    assert saved == [{**record, 'forecast_id': saved[i]['forecast_id']} for i, record in enumerate(expected)]
+
+
+def test_bulk_save_replaces_earlier_forecasts_of_the_period(supabase, forecaster):
+    predictions = forecaster.forecast_batch(7, workers=1)
+    supabase.tables['forecasts'] = []
+
+    save_forecasts_to_database(predictions, 7, supabase=supabase, state=forecaster.state)
+    save_forecasts_to_database(predictions, 7, supabase=supabase, state=forecaster.state)
+
+    product_ids = [record['product_id'] for record in supabase.tables['forecasts']]
+    assert sorted(product_ids) == sorted({int(prediction['product_id']) for prediction in predictions})
@@ -0,0 +1,44 @@
+"""
+Keyset paging of historical_data: every row is loaded exactly once, including rows
+that share a (history_date, product_id) key and pages that end inside such a run.
+"""
+from database.fake_client import FakeSupabaseClient
+from database.historical_loader import KEYSET_COLUMNS, fetch_historical_data, keyset_condition
+
+
+def duplicated_history():
+    """Three rows per product and day, as the table allows without the uniqueness migration."""
+    rows = []
+    for day in range(1, 6):
+        for product_id in (1, 2, 3):
+            for copy in range(3):
+                rows.append({
+                    'history_id': len(rows) + 1,
+                    'history_date': f'2026-01-0{day}',
+                    'product_id': product_id,
+                    'units_sold': copy + 1,
+                    'sales_revenue': 10.0,
+                    'inventory_start': 100,
+                    'inventory_end': 100 - copy,
+                    'period_type': 'daily',
+                })
+    return rows
+
+
+def test_keyset_condition():
+    assert keyset_condition(KEYSET_COLUMNS, ('2026-01-01', 2, 7)) == (
+        "history_date.gt.2026-01-01,"
+        "and(history_date.eq.2026-01-01,product_id.gt.2),"
+        "and(history_date.eq.2026-01-01,product_id.eq.2,history_id.gt.7)"
+    )
+
+
+def test_pages_through_duplicate_days():
+    rows = duplicated_history()
+    # A page size of 2 ends pages in the middle of every run of duplicates
+    history, stats = fetch_historical_data(FakeSupabaseClient({'historical_data': rows}), page_size=2)
+
+    assert stats['complete']
+    assert len(history) == len(rows)
+    assert history['units_sold'].sum() == sum(row['units_sold'] for row in rows)
+    assert history['inventory_end'].sum() == sum(row['inventory_end'] for row in rows)
@@ -0,0 +1,39 @@
+"""
+The native predictor checks the configured features against the names stored in the model:
+a registry model must match them, while the legacy pickle only warns.
+"""
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from models.inference import NativePredictor
+
+
+@pytest.fixture(scope='module')
+def booster():
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 3))
+    data = lgb.Dataset(X, label=X @ [1.0, 2.0, 3.0], feature_name=['Units_Sold', 'Price', 'Discount'])
+    return lgb.train({'verbose': -1, 'num_leaves': 4}, data, num_boost_round=5)
+
+
+def test_matching_names_are_accepted(booster):
+    predictor = NativePredictor(booster, ['Units Sold', 'Price', 'Discount'])
+
+    assert predictor.predict(predictor.new_buffer(2)).shape == (2,)
+
+
+def test_name_mismatch_raises(booster):
+    with pytest.raises(RuntimeError, match='do not match'):
+        NativePredictor(booster, ['Price', 'Units Sold', 'Discount'])
+
+
+def test_legacy_name_mismatch_only_warns(booster, capsys):
+    NativePredictor(booster, ['Price', 'Units Sold', 'Discount'], strict_feature_names=False)
+
+    assert 'Warning: configured feature order differs' in capsys.readouterr().out
+
+
+def test_feature_count_mismatch_always_raises(booster):
+    with pytest.raises(RuntimeError, match='expects 3 features'):
+        NativePredictor(booster, ['Units Sold', 'Price'], strict_feature_names=False)
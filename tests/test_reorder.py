@@ -0,0 +1,128 @@
+"""
+Reorder plans: days of cover interpolated inside the forecast curve, reorder points and
+lot-rounded order quantities, statuses, and the bulk read of stock and reorder settings.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.forecasting as forecasting_routes
+from database.fake_client import FakeSupabaseClient
+from models.reorder import (
+    DEFAULT_LEAD_TIME_DAYS, STATUS_NO_INVENTORY, STATUS_OK, STATUS_REORDER, STATUS_STOCKOUT_RISK,
+    fetch_reorder_inputs, reorder_plan
+)
+
+
+def plan_for(daily_demand, available, sales_std=0.0, lead_time_days=3.0, reorder_level=0.0, reorder_quantity=0.0,
+             horizon_days=10):
+    """reorder_plan of one product with a flat demand curve; returns that product's values."""
+    plan = reorder_plan(
+        np.full((1, horizon_days), float(daily_demand)),
+        np.array([available], dtype=np.float64),
+        np.array([sales_std], dtype=np.float64),
+        np.array([lead_time_days], dtype=np.float64),
+        np.array([reorder_level], dtype=np.float64),
+        np.array([reorder_quantity], dtype=np.float64),
+    )
+    return {name: values[0] for name, values in plan.items()}
+
+
+def test_stock_running_out_inside_the_horizon():
+    plan = plan_for(daily_demand=2, available=5, lead_time_days=3, reorder_quantity=10)
+
+    # Cumulative demand 2, 4, 6: the 5 units last half way into the third day
+    assert plan['days_of_cover'] == pytest.approx(2.5)
+    assert plan['stockout_day'] == 2
+    assert plan['reorder_point'] == pytest.approx(6)
+    # Up to 10 days of demand (lead time + review period) is 20, so 15 short: two lots of 10
+    assert plan['order_quantity'] == 20
+    assert plan['order_by_day'] == -1
+    assert plan['status'] == STATUS_STOCKOUT_RISK
+
+
+def test_cover_past_the_horizon_is_extrapolated():
+    plan = plan_for(daily_demand=1, available=100, lead_time_days=np.nan)
+
+    assert plan['days_of_cover'] == pytest.approx(100)
+    assert plan['stockout_day'] == -1
+    assert plan['lead_time_days'] == DEFAULT_LEAD_TIME_DAYS
+    assert plan['order_quantity'] == 0
+    assert plan['status'] == STATUS_OK
+
+
+def test_reorder_level_sets_the_reorder_point():
+    plan = plan_for(daily_demand=1, available=20, lead_time_days=7, reorder_level=25)
+
+    assert plan['reorder_point'] == pytest.approx(25)
+    assert plan['order_quantity'] == 5  # No lot size: exactly the shortfall
+    assert plan['status'] == STATUS_REORDER
+
+
+def test_safety_stock_scales_with_sales_variability_and_lead_time():
+    plan = plan_for(daily_demand=1, available=100, sales_std=2, lead_time_days=4)
+
+    assert plan['safety_stock'] == pytest.approx(NormalDist().inv_cdf(0.95) * 2 * 2)
+    assert plan['reorder_point'] == pytest.approx(4 + plan['safety_stock'])
+
+
+def test_zero_reorder_point_never_orders():
+    plan = plan_for(daily_demand=0, available=0)
+
+    assert plan['reorder_point'] == 0
+    assert np.isnan(plan['days_of_cover'])
+    assert plan['order_quantity'] == 0
+    assert plan['status'] == STATUS_OK
+
+
+def test_missing_inventory():
+    plan = plan_for(daily_demand=3, available=np.nan, reorder_quantity=10)
+
+    assert np.isnan(plan['days_of_cover'])
+    assert plan['order_quantity'] == 0
+    assert plan['status'] == STATUS_NO_INVENTORY
+
+
+def test_reorder_inputs_sum_locations_and_join_settings():
+    client = FakeSupabaseClient({
+        'inventory': [
+            {'inventory_id': 1, 'product_id': 1, 'quantity_on_hand': 10, 'quantity_reserved': 2, 'quantity_available': 8},
+            {'inventory_id': 2, 'product_id': 1, 'quantity_on_hand': 5, 'quantity_reserved': 1, 'quantity_available': None},
+        ],
+        'products': [
+            {'product_id': 1, 'product_name': 'A', 'sku': 'A-1', 'reorder_level': 4, 'reorder_quantity': 12, 'supplier_id': 7},
+            {'product_id': 2, 'product_name': 'B', 'sku': 'B-1', 'reorder_level': None, 'reorder_quantity': None, 'supplier_id': None},
+        ],
+        'suppliers': [{'supplier_id': 7, 'lead_time_days': 9}],
+    })
+    inputs = fetch_reorder_inputs(client)
+
+    assert inputs.loc[1, 'quantity_on_hand'] == 15
+    assert inputs.loc[1, 'quantity_available'] == 12  # 8 + (5 - 1) for the location without a stored value
+    assert inputs.loc[1, 'lead_time_days'] == 9
+    assert inputs.loc[1, 'reorder_quantity'] == 12
+    assert np.isnan(inputs.loc[2, 'quantity_available'])
+    assert np.isnan(inputs.loc[2, 'lead_time_days'])
+
+
+def test_plan_endpoint_ranks_the_most_urgent_first(forecaster, supabase, monkeypatch):
+    # Product 1 nearly out of stock, product 2 well stocked, product 4 without an inventory row
+    monkeypatch.setitem(supabase.tables, 'inventory', [
+        {'inventory_id': 1, 'product_id': 1, 'quantity_on_hand': 1, 'quantity_reserved': 0, 'quantity_available': 1},
+        {'inventory_id': 2, 'product_id': 2, 'quantity_on_hand': 100000, 'quantity_reserved': 0, 'quantity_available': 100000},
+    ])
+    monkeypatch.setitem(supabase.tables, 'suppliers', [])
+    app = FastAPI()
+    app.include_router(forecasting_routes.router)
+
+    response = TestClient(app).post('/forecast/reorder-plan', json={'horizon_days': 14, 'product_ids': ['4', '2', '1']})
+
+    assert response.status_code == 200
+    body = response.json()
+    statuses = {row['product_id']: row['status'] for row in body['recommendations']}
+    assert statuses == {'1': STATUS_STOCKOUT_RISK, '4': STATUS_NO_INVENTORY, '2': STATUS_OK}
+    assert [row['product_id'] for row in body['recommendations']] == ['1', '4', '2']
+    assert body['status_counts'] == {STATUS_NO_INVENTORY: 1, STATUS_OK: 1, STATUS_STOCKOUT_RISK: 1}
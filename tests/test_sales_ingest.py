@@ -0,0 +1,140 @@
+"""
+Bulk sales CSV ingest: per-product daily totals independent of how the file is chunked,
+uploads added to the stored days, and only the columns a file provides written.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from database.fake_client import FakeSupabaseClient
+from models.sales_ingest import (
+    DailySalesAggregate, add_to_existing, create_upload, daily_totals, ingest_sales_csv
+)
+
+
+def sales_lines(n_rows: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    inventory = rng.integers(0, 500, n_rows).astype(np.float64)
+    inventory[rng.random(n_rows) < 0.3] = np.nan
+    return pd.DataFrame({
+        'product_id': rng.integers(1, 6, n_rows).astype(np.float64),
+        'history_date': pd.Timestamp('2026-09-01') + pd.to_timedelta(rng.integers(0, 10, n_rows), unit='D'),
+        'units_sold': rng.integers(0, 20, n_rows).astype(np.float64),
+        'sales_revenue': np.where(rng.random(n_rows) < 0.2, np.nan, rng.uniform(0, 100, n_rows).round(2)),
+        'inventory_start': inventory,
+        'inventory_end': inventory - 1,
+    })
+
+
+def by_day(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.sort_values(['product_id', 'history_date']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 64, 1000])
+def test_aggregate_is_independent_of_chunking(chunk_rows):
+    lines = sales_lines(500)
+    aggregate = DailySalesAggregate()
+    for start in range(0, len(lines), chunk_rows):
+        aggregate.add(lines.iloc[start:start + chunk_rows])
+
+    pd.testing.assert_frame_equal(by_day(aggregate.frame()), by_day(daily_totals(lines)), check_exact=False)
+
+
+def test_empty_aggregate_has_the_totals_columns():
+    frame = DailySalesAggregate().frame()
+
+    assert frame.empty
+    assert list(frame.columns) == ['product_id', 'history_date', 'units_sold', 'sales_revenue', 'inventory_start', 'inventory_end']
+
+
+def test_totals_are_added_to_stored_days():
+    totals = pd.DataFrame({
+        'product_id': [1.0, 1.0],
+        'history_date': pd.to_datetime(['2026-09-01', '2026-09-02']),
+        'units_sold': [3.0, 4.0],
+        'sales_revenue': [30.0, np.nan],
+        'inventory_start': [50.0, np.nan],
+        'inventory_end': [np.nan, 40.0],
+    })
+    existing = pd.DataFrame({
+        'history_date': pd.to_datetime(['2026-09-01']),
+        'product_id': np.array([1], dtype=np.int32),
+        'units_sold': np.array([5], dtype=np.float32),
+        'sales_revenue': [12.5],
+        'inventory_start': np.array([60], dtype=np.float32),
+        'inventory_end': np.array([55], dtype=np.float32),
+    })
+    combined = by_day(add_to_existing(totals, existing))
+
+    assert combined['units_sold'].tolist() == [8.0, 4.0]
+    assert combined['sales_revenue'].tolist()[0] == 42.5 and np.isnan(combined['sales_revenue'].tolist()[1])
+    assert combined['inventory_start'].tolist()[0] == 60  # The stored opening stock wins
+    assert combined['inventory_end'].tolist() == [55.0, 40.0]  # The upload's closing stock, else the stored one
+
+
+def stored_day(client, product_id: int, history_date: str) -> dict:
+    rows = [
+        row for row in client.tables['historical_data']
+        if row['product_id'] == product_id and row['history_date'] == history_date
+    ]
+    assert len(rows) == 1
+    return rows[0]
+
+
+def test_ingest_adds_uploads_to_stored_days():
+    client = FakeSupabaseClient({
+        'products': [{'product_id': 1}, {'product_id': 2}],
+        'historical_data': [{
+            'history_id': 1, 'history_date': '2026-09-01', 'product_id': 1, 'period_type': 'daily',
+            'units_sold': 6, 'sales_revenue': 60.0, 'inventory_start': 43, 'inventory_end': 37,
+        }],
+        'sales_uploads': [],
+    })
+    upload_id = create_upload(client, 'sales.csv')
+    csv = (
+        b'Date,Product_ID,Quantity,Revenue,Inventory_End\n'
+        b'2026-09-01,1,2,20,35\n'
+        b'2026-09-01,1,3,30,30\n'
+        b'2026-09-01,1,oops,1,1\n'
+        b'2026-09-02,2,1,,\n'
+        b'2026-09-02,9,1,1,1\n'
+    )
+
+    # Two rows per chunk: product 1's day is split across chunks
+    summary = ingest_sales_csv(client, io.BytesIO(csv), upload_id, chunk_rows=2)
+
+    assert summary['records_processed'] == 3 and summary['records_failed'] == 2
+    assert summary['days_written'] == 2 and summary['since_date'] == '2026-09-01'
+    day = stored_day(client, 1, '2026-09-01')
+    assert day['units_sold'] == 11 and day['sales_revenue'] == 110.0
+    assert day['inventory_start'] == 43  # Not in the file, so left as stored
+    assert day['inventory_end'] == 30
+    new_day = stored_day(client, 2, '2026-09-02')
+    assert new_day['units_sold'] == 1 and new_day['sales_revenue'] is None and 'inventory_start' not in new_day
+
+    upload, = client.tables['sales_uploads']
+    assert upload['status'] == 'completed'
+    assert upload['error_log'].splitlines() == [
+        '2 row(s) failed: 1 invalid quantity (expected a whole number >= 0), 1 unknown product_id',
+        'row 3: invalid quantity (expected a whole number >= 0)',
+        'row 5: unknown product_id',
+    ]
+
+    # Uploads are additive: the same file again counts its sales again
+    ingest_sales_csv(client, io.BytesIO(csv), upload_id)
+    assert stored_day(client, 1, '2026-09-01')['units_sold'] == 16
+    assert len(client.tables['historical_data']) == 2
+
+
+def test_ingest_rejects_a_file_without_required_columns():
+    client = FakeSupabaseClient({'products': [{'product_id': 1}], 'historical_data': [], 'sales_uploads': []})
+    upload_id = create_upload(client, 'bad.csv')
+
+    with pytest.raises(ValueError, match='quantity'):
+        ingest_sales_csv(client, io.BytesIO(b'sale_date,product_id\n2026-09-01,1\n'), upload_id)
+
+    upload, = client.tables['sales_uploads']
+    assert upload['status'] == 'failed'
+    assert client.tables['historical_data'] == []
@@ -0,0 +1,108 @@
+"""
+What-if scenario grids: the grid has every combination of the overrides, the baseline
+scenario reproduces the plain forecast, and oversized or invalid grids are rejected
+before anything is forecast.
+"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.forecasting as forecasting_routes
+from models.schemas import ScenarioRequest
+from routes.forecasting import scenario_grid
+
+
+@pytest.fixture(scope='module')
+def client(forecaster):
+    app = FastAPI()
+    app.include_router(forecasting_routes.router)
+    return TestClient(app)
+
+
+def test_grid_is_every_combination_led_by_the_baseline():
+    request = ScenarioRequest(horizon_days=7, product_ids=['1'], future_price=[10, 20], future_discount=[0, 5, 10])
+    grid = scenario_grid(request)
+
+    assert grid[0] == {'price': None, 'discount': None, 'inventory': None}
+    assert grid[1:] == [
+        {'price': price, 'discount': discount, 'inventory': None}
+        for price in (10, 20) for discount in (0, 5, 10)
+    ]
+
+
+def test_grid_without_overrides_is_the_baseline_once():
+    assert scenario_grid(ScenarioRequest(horizon_days=7, product_ids=['1'])) == [
+        {'price': None, 'discount': None, 'inventory': None}
+    ]
+
+
+def test_baseline_matches_the_plain_forecast(forecaster):
+    product_ids = [str(product_id) for product_id in forecaster.state.index.product_ids.tolist()]
+    scenarios = [{'price': None, 'discount': None, 'inventory': None}, {'price': None, 'discount': 15.0, 'inventory': None}]
+    result = forecaster.forecast_scenarios(product_ids, scenarios, 14)
+
+    forecaster.cache.clear()
+    expected = {}
+    for row in forecaster.forecast_batch(14, workers=1):
+        expected.setdefault(row['product_id'], []).append(row['predicted_quantity'])
+
+    for i, product_id in enumerate(result['product_ids']):
+        baseline = result['demand'][i, 0]
+        if product_id in expected:
+            assert np.rint(baseline).astype(int).tolist() == expected[product_id]
+        else:
+            assert np.isnan(baseline).all()  # No stock category, so no forecast either
+
+
+def test_inventory_override_gives_a_stock_category(forecaster):
+    scenarios = [{'price': None, 'discount': None, 'inventory': None}, {'price': None, 'discount': None, 'inventory': 100}]
+    result = forecaster.forecast_scenarios(['3'], scenarios, 7)
+
+    assert np.isnan(result['demand'][0, 0]).all()
+    assert not np.isnan(result['demand'][0, 1]).any()
+
+
+def test_unknown_products_are_skipped(forecaster):
+    result = forecaster.forecast_scenarios(['1', '999999'], [{'price': 5.0, 'discount': None, 'inventory': None}], 7)
+
+    assert result['product_ids'] == ['1']
+    assert result['skipped_products'] == ['999999']
+
+
+def test_endpoint_returns_demand_per_product_and_scenario(client):
+    response = client.post('/forecast/scenarios', json={
+        'horizon_days': 7, 'product_ids': ['1', '2'], 'future_price': [50, 100], 'include_daily': True,
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body['scenarios']) == 3
+    assert np.shape(body['demand']) == (2, 3)
+    assert np.shape(body['daily_demand']) == (2, 3, 7)
+    assert body['demand'][0][0] == pytest.approx(sum(body['daily_demand'][0][0]), abs=0.05)
+
+
+def test_endpoint_rejects_grids_over_the_row_limit(client, monkeypatch):
+    monkeypatch.setattr(forecasting_routes, 'MAX_SCENARIO_ROWS', 10)
+    response = client.post('/forecast/scenarios', json={
+        'horizon_days': 7, 'product_ids': ['1', '2'], 'future_price': [1, 2, 3], 'future_discount': [0, 10],
+    })
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == '7 scenarios x 2 products exceeds the limit of 10 rows.'
+
+
+@pytest.mark.parametrize('override', [
+    {'future_price': [-1]}, {'future_discount': [101]}, {'future_inventory': [-5]},
+])
+def test_endpoint_rejects_invalid_overrides(client, override):
+    response = client.post('/forecast/scenarios', json={'horizon_days': 7, 'product_ids': ['1'], **override})
+
+    assert response.status_code == 422
+
+
+def test_endpoint_404s_when_no_product_is_known(client):
+    response = client.post('/forecast/scenarios', json={'horizon_days': 7, 'product_ids': ['999999']})
+
+    assert response.status_code == 404
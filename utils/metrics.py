@@ -0,0 +1,273 @@
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is then left empty
+    resource = None
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident set size of the process in MB (ru_maxrss is in KB on Linux)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are estimated at bucket upper bounds."""
+    def __init__(self, buckets_ms=HISTOGRAM_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float('inf')
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank, seen = q * self.count, 0
+        for position, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                # The open-ended bucket reports the largest value seen
+                return self.buckets_ms[position] if position < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {'count': 0}
+        cumulative, buckets = 0, []
+        for bound, bucket_count in zip(self.buckets_ms, self.counts):
+            cumulative += bucket_count
+            buckets.append({'le_ms': bound, 'count': cumulative})
+        buckets.append({'le_ms': 'inf', 'count': self.count})
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3),
+            'min_ms': round(self.min_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class DailyRollup:
+    """One day's totals in the shape of a system_metrics row."""
+    def __init__(self, metric_date: date):
+        self.metric_date = metric_date
+        self.requests = 0
+        self.response_ms = 0.0
+        self.forecasts_generated = 0
+        self.errors = 0
+        self.peak_memory_mb: Optional[float] = None
+        # Counters already added to the stored row by earlier flushes
+        self.flushed_forecasts = 0
+        self.flushed_errors = 0
+
+    def row(self) -> Dict[str, Any]:
+        return {
+            'metric_date': self.metric_date.isoformat(),
+            'avg_response_time_ms': round(self.response_ms / self.requests, 2) if self.requests else None,
+            'peak_memory_usage_mb': round(self.peak_memory_mb, 2) if self.peak_memory_mb is not None else None,
+            'total_forecasts_generated': self.forecasts_generated,
+            'errors_logged': self.errors,
+        }
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, registry: 'MetricsRegistry', name: str):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process timers, counters and per-day rollups. Every method is thread-safe;
+    recording is a dict lookup and a few additions under one lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._days: Dict[date, DailyRollup] = {}
+        self.started_at = time.time()
+
+    def _today(self) -> DailyRollup:
+        today = date.today()
+        if today not in self._days:
+            self._days[today] = DailyRollup(today)
+        return self._days[today]
+
+    def timer(self, name: str) -> _Timer:
+        """Context manager (or decorator) recording its wall time into histogram `name`."""
+        return _Timer(self, name)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds * 1000)
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_request(self, route: str, status_code: int, seconds: float):
+        """One HTTP request: its route histogram, status counters and the day's response time."""
+        self.observe(f"http {route}", seconds)
+        with self._lock:
+            status_class = f"http_responses_{status_code // 100}xx"
+            self._counters[status_class] = self._counters.get(status_class, 0) + 1
+            day = self._today()
+            day.requests += 1
+            day.response_ms += seconds * 1000
+            if status_code >= 500:
+                day.errors += 1
+
+    def record_forecasts(self, count: int):
+        self.increment('forecasts_generated', count)
+        with self._lock:
+            self._today().forecasts_generated += count
+
+    def record_error(self):
+        self.increment('errors_logged')
+        with self._lock:
+            self._today().errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            day = self._today()
+            day.peak_memory_mb = peak_memory_mb()
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'generated_at': datetime.utcnow().isoformat(),
+                'timers': {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())},
+                'counters': dict(sorted(self._counters.items())),
+                'today': day.row(),
+            }
+
+    def pending_rollups(self) -> List[Tuple[DailyRollup, Dict[str, Any], int, int]]:
+        """
+        (rollup, system_metrics row, new forecasts, new errors) for today and any unflushed
+        earlier day; the counts are what happened since the last flush.
+        """
+        with self._lock:
+            self._today().peak_memory_mb = peak_memory_mb()
+            return [
+                (day, day.row(), day.forecasts_generated - day.flushed_forecasts, day.errors - day.flushed_errors)
+                for day in sorted(self._days.values(), key=lambda day: day.metric_date)
+            ]
+
+    def mark_flushed(self, day: DailyRollup, forecasts: int, errors: int):
+        """Records what a flush added; finished days are dropped once stored."""
+        with self._lock:
+            day.flushed_forecasts += forecasts
+            day.flushed_errors += errors
+            if day.metric_date < date.today():
+                self._days.pop(day.metric_date, None)
+
+
+def flush_daily_rollups(supabase, registry: 'MetricsRegistry') -> List[Dict[str, Any]]:
+    """
+    Adds this process's daily rollups to system_metrics (one row per metric_date).
+
+    Counters are sent as deltas since the last flush to the add_system_metrics SQL
+    function, which increments the stored row in one statement, so restarts and other
+    workers accumulate rather than overwrite; peak memory keeps the maximum and the
+    average response time is this process's average for the day.
+    """
+    written = []
+    for day, row, forecasts, errors in registry.pending_rollups():
+        supabase.rpc('add_system_metrics', {
+            'p_metric_date': row['metric_date'],
+            'p_forecasts': forecasts,
+            'p_errors': errors,
+            'p_peak_memory_mb': row['peak_memory_usage_mb'],
+            'p_avg_response_time_ms': row['avg_response_time_ms'],
+        }).execute()
+
+        registry.mark_flushed(day, forecasts, errors)
+        written.append(row)
+    return written
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording every HTTP request into METRICS under its route template
+    (e.g. "POST /forecast/"), so path parameters do not create new histograms. Timing
+    ends when the last body chunk is sent, which covers streamed responses as well and
+    leaves out background tasks that run after the response.
+    """
+    def __init__(self, app, registry: Optional['MetricsRegistry'] = None):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry or METRICS
+        start = time.perf_counter()
+        status_code = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            registry.record_request(f"{scope['method']} {path}", status_code, time.perf_counter() - start)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Requests that failed before completing a response
+            record()
+
+
+# Process-wide registry used by the middleware, the named timers and /metrics
+METRICS = MetricsRegistry()
+
+
+def timed(name: str) -> _Timer:
+    """METRICS.timer(name), usable as `with timed(...)` or `@timed(...)`."""
+    return METRICS.timer(name)
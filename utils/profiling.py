@@ -0,0 +1,194 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Query builder methods that decide which kind of Supabase call a chain makes
+SUPABASE_OPERATIONS = ('select', 'insert', 'upsert', 'update', 'delete')
+
+
+class SupabaseCallCounter:
+    """Counts and times executed Supabase queries per (table, operation)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[Tuple[str, str], List[float]] = {}
+
+    def record(self, table: str, operation: str, seconds: float):
+        with self._lock:
+            totals = self.calls.setdefault((table, operation), [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = [
+                {'table': table, 'operation': operation, 'calls': count, 'total_ms': round(seconds * 1000, 3)}
+                for (table, operation), (count, seconds) in sorted(self.calls.items())
+            ]
+        return {'total_calls': sum(call['calls'] for call in calls), 'calls': calls}
+
+
+class _CountingQuery:
+    """Wraps a query builder; every builder it returns is wrapped too, and execute() is counted."""
+    def __init__(self, counter: SupabaseCallCounter, table: str, builder, operation: Optional[str] = None):
+        self._counter = counter
+        self._table = table
+        self._builder = builder
+        self._operation = operation
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._builder, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            if name == 'execute':
+                start = time.perf_counter()
+                try:
+                    return attribute(*args, **kwargs)
+                finally:
+                    self._counter.record(self._table, self._operation or 'select', time.perf_counter() - start)
+
+            result = attribute(*args, **kwargs)
+            if not hasattr(result, 'execute'):
+                return result
+            operation = name if name in SUPABASE_OPERATIONS else self._operation
+            return _CountingQuery(self._counter, self._table, result, operation)
+        return call
+
+
+class CountingSupabaseClient:
+    """Supabase client proxy counting the queries made through it; only table() queries are counted."""
+    def __init__(self, client, counter: Optional[SupabaseCallCounter] = None):
+        self._client = client
+        self.counter = counter or SupabaseCallCounter()
+
+    def table(self, name: str) -> _CountingQuery:
+        return _CountingQuery(self.counter, name, self._client.table(name))
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread every `interval` seconds from a background
+    thread and counts collapsed stacks ("root;caller;callee"), the input format of
+    flamegraph.pl and speedscope. Wall-clock: time blocked on I/O is sampled too.
+    """
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def top_cumulative(profiler: cProfile.Profile, top_n: int) -> List[Dict[str, Any]]:
+    """The `top_n` functions with the highest cumulative time."""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top_n]
+    return [
+        {
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': total_calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (_, total_calls, tottime, cumtime, _) in rows
+    ]
+
+
+class ProfilerBusyError(RuntimeError):
+    """Another profiled call is already running."""
+
+
+# cProfile hooks are per thread, but one profiled request at a time keeps reports readable and cheap
+_PROFILE_LOCK = threading.Lock()
+
+
+def profile_call(
+    func: Callable[..., Any],
+    *args,
+    label: str = 'profile',
+    top_n: int = 30,
+    sample_interval: float = 0.001,
+    output_dir: Optional[str] = None,
+    **kwargs
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Runs `func(*args, **kwargs)` in the calling thread under cProfile (deterministic,
+    for the top-N cumulative report) and a StackSampler (for the collapsed stacks).
+    With `output_dir`, the pstats text report and the collapsed-stack file are written
+    there. Raises ProfilerBusyError if another profiled call is running.
+    Returns (result, report).
+    """
+    if not _PROFILE_LOCK.acquire(blocking=False):
+        raise ProfilerBusyError("Another profiled request is already running.")
+    try:
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), sample_interval)
+        sampler.start()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            wall_seconds = time.perf_counter() - start
+            sampler.stop()
+    finally:
+        _PROFILE_LOCK.release()
+
+    report = {
+        'wall_seconds': round(wall_seconds, 4),
+        'samples': sum(sampler.stacks.values()),
+        'top_cumulative': top_cumulative(profiler, top_n),
+    }
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        base_path = os.path.join(output_dir, f"{label}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}")
+
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(top_n)
+        with open(base_path + '.txt', 'w') as f:
+            f.write(text.getvalue())
+        with open(base_path + '.collapsed', 'w') as f:
+            f.write(sampler.collapsed())
+
+        report['report_file'] = base_path + '.txt'
+        report['collapsed_stack_file'] = base_path + '.collapsed'
+    else:
+        report['collapsed_stacks'] = sampler.collapsed()
+
+    return result, report